@@ -125,9 +125,15 @@ export async function cleanData(
   return response.json();
 }
 
-export async function downloadCleanedFile(filepath: string, originalFilename: string): Promise<void> {
+export async function downloadCleanedFile(
+  filepath: string,
+  originalFilename: string,
+  format?: 'csv' | 'xlsx' | 'parquet'
+): Promise<void> {
+  // The CSV comes gzip/zstd-encoded when the browser accepts it; fetch decodes it transparently
+  const formatParam = format ? `&format=${format}` : '';
   const response = await fetch(
-    `${API_BASE_URL}/clean/download?filepath=${encodeURIComponent(filepath)}`
+    `${API_BASE_URL}/clean/download?filepath=${encodeURIComponent(filepath)}${formatParam}`
   );
 
   if (!response.ok) {
@@ -138,7 +144,9 @@ export async function downloadCleanedFile(filepath: string, originalFilename: st
   const url = window.URL.createObjectURL(blob);
   const a = document.createElement('a');
   a.href = url;
-  a.download = `cleaned_${originalFilename}`;
+  a.download = format
+    ? `cleaned_${originalFilename.replace(/\.[^.]+$/, '')}.${format}`
+    : `cleaned_${originalFilename}`;
   document.body.appendChild(a);
   a.click();
   window.URL.revokeObjectURL(url);
@@ -0,0 +1 @@
+"""Benchmarks for the ml_service hot paths — run with ``python -m benchmarks.run``"""
@@ -0,0 +1,94 @@
+"""Benchmark cases — utility functions called directly, endpoints through the ASGI app.
+
+A function case is ``setup(ctx) -> args`` (untimed) plus ``run(*args)``
+(timed). ``ctx`` holds the generated frame, its feature columns and the path of
+the same data written as CSV. ``max_rows`` skips shapes a case can't run in
+reasonable time (e.g. a 300-tree forest on 1e7 rows).
+"""
+import os
+import shutil
+from typing import Any, Callable, ContextManager, Dict
+
+from benchmarks.datasets import TARGET_COLUMN
+from routes.clean import calculate_quality_report
+from utils.cleaning import apply_cleaning_method
+from utils.data_processing import (
+    analyze_distribution,
+    analyze_missing_values,
+    detect_outliers,
+    get_data_summary,
+    profile_dataset,
+    row_hashes,
+)
+from utils.dataset_cache import dataset_cache, parse_raw
+from utils.models import train_model
+
+
+def _frame(ctx: Dict[str, Any]):
+    return (ctx['df'],)
+
+
+def _fresh_copy(ctx: Dict[str, Any]):
+    return (ctx['df'].copy(),)
+
+
+def _cleaned_pair(ctx: Dict[str, Any]):
+    cleaned, _, _, touched = apply_cleaning_method(ctx['df'].copy(), 'fill_mean')
+    return ctx['df'], cleaned, None, touched
+
+
+def _training(ctx: Dict[str, Any]):
+    return ctx['df'], ctx['features'], TARGET_COLUMN
+
+
+def _train(model_type: str) -> Callable[..., Any]:
+    return lambda df, features, target: train_model(df, model_type, features, target)
+
+
+FUNCTION_CASES: Dict[str, Dict[str, Any]] = {
+    'parse_csv':           {'setup': lambda ctx: (ctx['csv_path'],), 'run': parse_raw},
+    'summary':             {'setup': _frame, 'run': get_data_summary},
+    'missing_values':      {'setup': _frame, 'run': analyze_missing_values},
+    'outliers_iqr':        {'setup': _frame, 'run': lambda df: detect_outliers(df, 'iqr')},
+    'distribution':        {'setup': _frame, 'run': analyze_distribution},
+    'profile_dataset':     {'setup': _frame, 'run': profile_dataset},
+    'row_hashes':          {'setup': _frame, 'run': row_hashes},
+    'clean_fill_mean':     {'setup': _fresh_copy, 'run': lambda df: apply_cleaning_method(df, 'fill_mean')},
+    'quality_report':      {'setup': _cleaned_pair, 'run': calculate_quality_report},
+    'train_linear':        {'setup': _training, 'run': _train('linear_regression')},
+    'train_random_forest': {'setup': _training, 'run': _train('random_forest'), 'max_rows': 1_000_000},
+    'train_svm':           {'setup': _training, 'run': _train('svm'), 'max_rows': 1_000_000},
+}
+
+
+def reset_service_state(workdir: str) -> None:
+    """Drop every upload, model and cached result so each endpoint run starts cold"""
+    dataset_cache.clear()
+    for name in ('uploads', 'models', 'cache'):
+        shutil.rmtree(os.path.join(workdir, name), ignore_errors=True)
+    os.makedirs(os.path.join(workdir, 'uploads'), exist_ok=True)
+
+
+def run_endpoint_flow(client, ctx: Dict[str, Any], measure: Callable[[str], ContextManager]) -> None:
+    """Upload -> analyze -> clean -> train -> predict/file, each request wrapped in ``measure(step)``"""
+    def call(step: str, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        with measure(step):
+            response = client.request(method, url, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    with open(ctx['csv_path'], 'rb') as f:
+        upload = call('upload', 'POST', '/upload', files={'file': ('bench.csv', f, 'text/csv')})
+    filepath = upload['filepath']
+
+    call('analyze', 'POST', '/analyze', json={'filepath': filepath})
+    call('clean', 'POST', '/clean', json={'filepath': filepath, 'cleaningMethod': 'fill_mean'})
+    trained = call('train', 'POST', '/train', json={
+        'filepath':  filepath,
+        'modelType': 'linear_regression',
+        'features':  ctx['features'],
+        'target':    TARGET_COLUMN,
+    })
+    call('predict_file', 'POST', '/predict/file', json={'filepath': filepath, 'modelId': trained['model_id']})
+
@@ -0,0 +1,101 @@
+"""Deterministic synthetic datasets for benchmarking.
+
+Columns cycle through a fixed mix of dtypes so every shape exercises the same
+code paths. The mix is float, int, low- and high-cardinality strings, bool
+and date strings. A numeric ``target`` column depends on the first few float
+columns, so training has signal to find.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Column kinds in the order they are assigned — six of every eleven columns are floats
+COLUMN_MIX = ('float', 'int', 'float', 'category', 'float', 'bool', 'float', 'text', 'float', 'date', 'float')
+
+TARGET_COLUMN = 'target'
+
+# Standard deviations an injected outlier sits from its column's mean
+OUTLIER_SIGMAS = 25.0
+
+Shape = Tuple[int, int]
+
+
+def parse_shape(text: str) -> Shape:
+    """'100000x20' -> (100000, 20); accepts 1e5x20 too"""
+    rows, _, cols = text.lower().partition('x')
+    if not cols:
+        raise ValueError(f"Shape must look like ROWSxCOLUMNS, got '{text}'")
+    return int(float(rows)), int(float(cols))
+
+
+def _column(kind: str, rows: int, rng: np.random.Generator) -> np.ndarray:
+    if kind == 'float':
+        return rng.normal(rng.uniform(-100, 100), rng.uniform(1, 50), rows)
+    if kind == 'int':
+        return rng.integers(0, 1000, rows)
+    if kind == 'category':
+        labels = np.array([f'cat_{i}' for i in range(12)], dtype=object)
+        return labels[rng.integers(0, len(labels), rows)]
+    if kind == 'text':
+        # High cardinality — roughly one distinct value per 20 rows
+        labels = np.array([f'id_{i:07d}' for i in range(max(rows // 20, 1))], dtype=object)
+        return labels[rng.integers(0, len(labels), rows)]
+    if kind == 'bool':
+        return rng.random(rows) < 0.3
+    if kind == 'date':
+        days = rng.integers(0, 3650, rows)
+        return (np.datetime64('2015-01-01') + days).astype(str).astype(object)
+    raise ValueError(f"Unknown column kind: {kind}")
+
+
+def column_kinds(n_columns: int) -> Dict[str, str]:
+    """Feature column name -> kind for a dataset with ``n_columns`` features"""
+    return {f'{COLUMN_MIX[i % len(COLUMN_MIX)]}_{i}': COLUMN_MIX[i % len(COLUMN_MIX)] for i in range(n_columns)}
+
+
+def generate_dataset(rows: int, columns: int, missing: float = 0.05, duplicates: float = 0.02,
+                     outliers: float = 0.01, seed: int = 42) -> pd.DataFrame:
+    """``rows`` x (``columns`` + target) frame with controlled data quality problems.
+
+    ``missing`` is the fraction of feature cells set to NaN. ``duplicates`` is
+    the fraction of rows that copy an earlier row. ``outliers`` is the fraction
+    of float cells pushed OUTLIER_SIGMAS standard deviations out.
+    """
+    rng = np.random.default_rng(seed)
+    kinds = column_kinds(columns)
+    data = {name: _column(kind, rows, rng) for name, kind in kinds.items()}
+
+    floats = [name for name, kind in kinds.items() if kind == 'float']
+    signal = sum(data[name] * w for name, w in zip(floats[:5], (1.5, -2.0, 0.5, 1.0, -0.7)))
+    data[TARGET_COLUMN] = signal + rng.normal(0, 10, rows)
+
+    for name in floats:
+        values = data[name]
+        hit = rng.random(rows) < outliers
+        values[hit] = values.mean() + OUTLIER_SIGMAS * values.std() * rng.choice([-1, 1], int(hit.sum()))
+
+    if missing > 0:
+        for name, kind in kinds.items():
+            # NaN needs a float/object column — the same dtypes a CSV parse ends up with
+            if kind == 'int':
+                data[name] = data[name].astype(float)
+            elif kind == 'bool':
+                data[name] = data[name].astype(object)
+            data[name][rng.random(rows) < missing] = np.nan
+
+    n_duplicates = int(rows * duplicates)
+    if n_duplicates:
+        targets = rng.choice(np.arange(1, rows), n_duplicates, replace=False)
+        sources = rng.integers(0, targets)
+        for values in data.values():
+            values[targets] = values[sources]
+
+    return pd.DataFrame(data)
+
+
+def feature_columns(df: pd.DataFrame, limit: int = 20) -> List[str]:
+    """A bounded set of features for training benchmarks — numeric ones first"""
+    numeric = [c for c in df.columns if c != TARGET_COLUMN and pd.api.types.is_numeric_dtype(df[c])]
+    other = [c for c in df.columns if c != TARGET_COLUMN and c not in numeric and not c.startswith('text')]
+    return (numeric + other)[:limit]
@@ -0,0 +1,310 @@
+"""Run the benchmark suite and compare it against a stored baseline.
+
+    cd ml_service
+    python -m benchmarks.run --suite smoke                  # quick check
+    python -m benchmarks.run --suite standard --save-baseline
+    python -m benchmarks.run --suite standard               # fails on regressions
+    python -m benchmarks.run --shape 2e6x40 --case profile_dataset --case quality_report
+
+Every case is timed ``--repeats`` times after ``--warmup`` untimed runs; the
+median is compared with the baseline. Peak memory comes from one extra run
+under tracemalloc (numpy and pandas report their buffers to it), so tracing
+overhead never leaks into the timings. It is the memory allocated on top of
+what was live when the case started.
+
+Endpoint benchmarks drive the ASGI app in-process through FastAPI's
+TestClient (needs httpx). They run from a throwaway working directory and
+start cold each repeat: no uploads, cached frames or memoized results.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from benchmarks.datasets import Shape, feature_columns, generate_dataset, parse_shape
+
+# Shapes per suite — (rows, feature columns). 'large' needs tens of GB of RAM.
+SUITES: Dict[str, List[Shape]] = {
+    'smoke':    [(1_000, 5), (10_000, 20)],
+    'standard': [(100_000, 20), (1_000_000, 10), (10_000, 500)],
+    'large':    [(1_000_000, 100), (10_000_000, 5), (100_000, 500)],
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Relative slowdown / memory growth over the baseline that counts as a regression
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.25
+
+# Differences below these are noise, whatever the ratio
+MIN_TIME_DELTA_SECONDS = 0.01
+MIN_MEMORY_DELTA_MB = 2.0
+
+
+def environment() -> Dict[str, Any]:
+    import numpy
+    import pandas
+    import sklearn
+
+    return {
+        'python':    platform.python_version(),
+        'pandas':    pandas.__version__,
+        'numpy':     numpy.__version__,
+        'sklearn':   sklearn.__version__,
+        'platform':  platform.platform(),
+        'cpus':      os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def _traced_peak_mb(fn) -> float:
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (peak - start) / 1024 / 1024
+
+
+def _entry(seconds: List[float], rows: int, frame_mb: float, peak_mb: float) -> Dict[str, Any]:
+    median = statistics.median(seconds)
+    return {
+        'seconds':      round(median, 6),
+        'seconds_min':  round(min(seconds), 6),
+        'repeats':      len(seconds),
+        'rows':         rows,
+        'rows_per_sec': round(rows / median, 1) if median > 0 else None,
+        'mb_per_sec':   round(frame_mb / median, 2) if median > 0 else None,
+        'peak_mb':      round(peak_mb, 2),
+    }
+
+
+def bench_function(case: Dict[str, Any], ctx: Dict[str, Any], repeats: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        case['run'](*case['setup'](ctx))
+
+    seconds = []
+    for _ in range(repeats):
+        args = case['setup'](ctx)
+        start = time.perf_counter()
+        case['run'](*args)
+        seconds.append(time.perf_counter() - start)
+
+    args = case['setup'](ctx)
+    peak_mb = _traced_peak_mb(lambda: case['run'](*args))
+    return _entry(seconds, ctx['rows'], ctx['frame_mb'], peak_mb)
+
+
+def bench_endpoints(ctx: Dict[str, Any], workdir: str, repeats: int, warmup: int) -> Dict[str, Dict[str, Any]]:
+    """Time each step of the upload -> predict flow through the ASGI app"""
+    try:
+        from fastapi.testclient import TestClient
+    except RuntimeError as e:
+        # Starlette raises RuntimeError when httpx is missing
+        raise SystemExit(f"Endpoint benchmarks need httpx: {e}")
+
+    from benchmarks.cases import reset_service_state, run_endpoint_flow
+    import main
+
+    client = TestClient(main.app)
+    seconds: Dict[str, List[float]] = {}
+    peaks: Dict[str, float] = {}
+
+    @contextmanager
+    def timed(step: str) -> Iterator[None]:
+        start = time.perf_counter()
+        yield
+        seconds.setdefault(step, []).append(time.perf_counter() - start)
+
+    @contextmanager
+    def untimed(step: str) -> Iterator[None]:
+        yield
+
+    @contextmanager
+    def traced(step: str) -> Iterator[None]:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        yield
+        peaks[step] = (tracemalloc.get_traced_memory()[1] - start) / 1024 / 1024
+
+    for _ in range(warmup):
+        reset_service_state(workdir)
+        run_endpoint_flow(client, ctx, untimed)
+
+    for _ in range(repeats):
+        reset_service_state(workdir)
+        run_endpoint_flow(client, ctx, timed)
+
+    reset_service_state(workdir)
+    tracemalloc.start()
+    try:
+        run_endpoint_flow(client, ctx, traced)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        step: _entry(step_seconds, ctx['rows'], ctx['frame_mb'], peaks.get(step, 0.0))
+        for step, step_seconds in seconds.items()
+    }
+
+
+def run_suite(shapes: List[Shape], cases: Optional[List[str]], endpoints: bool, repeats: int, warmup: int,
+              workdir: str, missing: float, duplicates: float, outliers: float) -> Dict[str, Dict[str, Any]]:
+    from benchmarks.cases import FUNCTION_CASES
+
+    selected = cases or list(FUNCTION_CASES)
+    unknown = [name for name in selected if name not in FUNCTION_CASES]
+    if unknown:
+        raise SystemExit(f"Unknown case(s): {', '.join(unknown)}. Available: {', '.join(FUNCTION_CASES)}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for rows, columns in shapes:
+        shape = f'{rows}x{columns}'
+        print(f"-- {shape}: generating", flush=True)
+        df = generate_dataset(rows, columns, missing=missing, duplicates=duplicates, outliers=outliers)
+        csv_path = os.path.join(workdir, f'bench_{shape}.csv')
+        df.to_csv(csv_path, index=False)
+        ctx = {
+            'df':       df,
+            'rows':     rows,
+            'features': feature_columns(df),
+            'csv_path': csv_path,
+            'frame_mb': df.memory_usage(deep=True).sum() / 1024 / 1024,
+        }
+
+        for name in selected:
+            case = FUNCTION_CASES[name]
+            if rows > case.get('max_rows', rows):
+                continue
+            key = f'{name}@{shape}'
+            results[key] = bench_function(case, ctx, repeats, warmup)
+            print(f"   {key:<40} {results[key]['seconds']:>10.4f}s  {results[key]['peak_mb']:>9.1f} MB", flush=True)
+
+        if endpoints:
+            for step, entry in bench_endpoints(ctx, workdir, repeats, warmup).items():
+                key = f'endpoint:{step}@{shape}'
+                results[key] = entry
+                print(f"   {key:<40} {entry['seconds']:>10.4f}s  {entry['peak_mb']:>9.1f} MB", flush=True)
+
+        os.remove(csv_path)
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            time_threshold: float, memory_threshold: float) -> List[Dict[str, Any]]:
+    """One row per result: its ratios to the baseline and a status"""
+    rows = []
+    for key, entry in results.items():
+        base = baseline.get(key)
+        if base is None:
+            rows.append({'key': key, 'status': 'new', 'time_ratio': None, 'memory_ratio': None})
+            continue
+
+        time_ratio = entry['seconds'] / base['seconds'] if base['seconds'] else None
+        memory_ratio = entry['peak_mb'] / base['peak_mb'] if base['peak_mb'] else None
+        slower = (time_ratio is not None and time_ratio > 1 + time_threshold
+                  and entry['seconds'] - base['seconds'] > MIN_TIME_DELTA_SECONDS)
+        heavier = (memory_ratio is not None and memory_ratio > 1 + memory_threshold
+                   and entry['peak_mb'] - base['peak_mb'] > MIN_MEMORY_DELTA_MB)
+
+        if slower or heavier:
+            status = 'REGRESSED'
+        elif time_ratio is not None and time_ratio < 1 / (1 + time_threshold):
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append({'key': key, 'status': status, 'time_ratio': time_ratio, 'memory_ratio': memory_ratio})
+    return rows
+
+
+def _ratio(value: Optional[float]) -> str:
+    return f'{value:.2f}x' if value is not None else '-'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ml_service hot paths")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='smoke')
+    parser.add_argument('--shape', action='append', type=parse_shape,
+                        help="ROWSxCOLUMNS, repeatable — replaces the suite's shapes")
+    parser.add_argument('--case', action='append', help="Function case to run, repeatable (default: all)")
+    parser.add_argument('--no-endpoints', action='store_true', help="Skip the ASGI endpoint flow")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--missing', type=float, default=0.05, help="Fraction of feature cells set to NaN")
+    parser.add_argument('--duplicates', type=float, default=0.02, help="Fraction of duplicated rows")
+    parser.add_argument('--outliers', type=float, default=0.01, help="Fraction of float cells made outliers")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Merge these results into the baseline")
+    parser.add_argument('--output', help="Also write the results as JSON here")
+    parser.add_argument('--time-threshold', type=float, default=TIME_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = os.path.abspath(args.output) if args.output else None
+    shapes = args.shape or SUITES[args.suite]
+
+    # The service writes uploads/, models/ and cache/ relative to the working directory
+    workdir = tempfile.mkdtemp(prefix='ml-bench-')
+    previous_cwd = os.getcwd()
+    # Time /upload on its own — no full parse queued behind the response
+    os.environ.setdefault('ML_BACKGROUND_PARSE_MAX_MB', '0')
+    os.chdir(workdir)
+    try:
+        results = run_suite(shapes, args.case, not args.no_endpoints, args.repeats, args.warmup, workdir,
+                            args.missing, args.duplicates, args.outliers)
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {'environment': environment(), 'results': results}
+    if output_path:
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    stored: Dict[str, Any] = {'environment': None, 'results': {}}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            stored = json.load(f)
+
+    if args.save_baseline:
+        merged = {'environment': report['environment'], 'results': {**stored['results'], **results}}
+        with open(baseline_path, 'w') as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print(f"\nSaved {len(results)} results to {baseline_path}")
+        return 0
+
+    if not stored['results']:
+        print(f"\nNo baseline at {baseline_path} — run with --save-baseline to create one")
+        return 0
+
+    if stored['environment']:
+        env = stored['environment']
+        print(f"\nBaseline: python {env['python']}, pandas {env['pandas']}, numpy {env['numpy']}, "
+              f"sklearn {env['sklearn']}, {env['cpus']} CPUs, {env['timestamp']}")
+
+    rows = compare(results, stored['results'], args.time_threshold, args.memory_threshold)
+    print(f"{'case':<40} {'time':>8} {'memory':>8}  status")
+    for row in rows:
+        print(f"{row['key']:<40} {_ratio(row['time_ratio']):>8} {_ratio(row['memory_ratio']):>8}  {row['status']}")
+
+    regressed = [row['key'] for row in rows if row['status'] == 'REGRESSED']
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) beyond +{args.time_threshold:.0%} time "
+              f"/ +{args.memory_threshold:.0%} memory")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,26 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-import shutil
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel
+from typing import Dict, Any, Optional
 import os
-import pandas as pd
 import uuid
 
 from routes.analyze import router as analyze_router
 from routes.clean import router as clean_router
 from routes.train import router as train_router
+from routes.jobs import router as jobs_router
+from routes.predict import router as predict_router
+from routes.rows import router as rows_router
+from routes.outliers import router as outliers_router
+from utils.content import derive_upload, link_shared_working_copy, original_upload, store_upload
+from utils.dataset_cache import dataset_cache, DATASET_CACHE_MAX_MB
+from utils.excel import is_excel, resolve_sheet, select_sheet
+from utils.ingest import stream_to_disk, sniff_csv, sniff_excel
+from utils.jobs import job_store
+from utils import metrics
+from utils.result_cache import result_cache
+from utils.workers import PoolSaturated, cpu_budget, run_in_worker, worker_pool
 
 app = FastAPI(
     title="DataClean ML Service",
@@ -15,6 +28,9 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Routes declared below record their JSON serialization time as a stage
+app.router.route_class = metrics.TimedRoute
+
 # CORS — allow all origins for development
 app.add_middleware(
     CORSMiddleware,
@@ -28,15 +44,74 @@ app.add_middleware(
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Uploads up to this size get a full typed parse in the background after /upload returns
+BACKGROUND_PARSE_MAX_MB = float(os.environ.get('ML_BACKGROUND_PARSE_MAX_MB', str(DATASET_CACHE_MAX_MB)))
+
 # Include routers — no /api prefix since frontend calls http://localhost:8000 directly
 app.include_router(analyze_router)
 app.include_router(clean_router)
 app.include_router(train_router)
+app.include_router(jobs_router)
+app.include_router(predict_router)
+app.include_router(rows_router)
+app.include_router(outliers_router)
+
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Per-request latency, stage breakdown and peak RSS — also returned as Server-Timing"""
+    timings, token = metrics.begin_request()
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.observe_request(request.method, _endpoint_label(request), 500, timings)
+        raise
+    finally:
+        metrics.end_request(token)
+
+    total = metrics.observe_request(request.method, _endpoint_label(request), response.status_code, timings)
+    response.headers['Server-Timing'] = timings.server_timing(total)
+    return response
+
+
+def _endpoint_label(request: Request) -> str:
+    # Route template (/jobs/{job_id}), not the raw path, to keep label cardinality bounded
+    route = request.scope.get('route')
+    return route.path if route is not None else 'unmatched'
+
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    """Backpressure — tell clients to retry instead of queueing unbounded work"""
+    return JSONResponse(
+        status_code=503,
+        content={'detail': str(exc)},
+        headers={'Retry-After': str(exc.retry_after)},
+    )
 
 
 @app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload a CSV or Excel file and return its metadata"""
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                      sheet: Optional[str] = Form(None)):
+    """Upload a CSV or Excel file and return its metadata — ``sheet`` picks a workbook sheet"""
+    result = await run_in_worker('upload', _upload_file, file, sheet)
+
+    # Full typed parse (Parquet working copy + cache) after the response is sent
+    if result['size'] <= BACKGROUND_PARSE_MAX_MB * 1024 * 1024:
+        background_tasks.add_task(_parse_in_background, result['filepath'])
+    return result
+
+
+async def _parse_in_background(filepath: str) -> None:
+    try:
+        await run_in_worker('ingest', dataset_cache.get, filepath)
+    except PoolSaturated:
+        # Not fatal — the first route that needs the data parses it instead
+        pass
+
+
+def _upload_file(file: UploadFile, sheet: Optional[str] = None) -> Dict[str, Any]:
+    """Blocking part of /upload — runs in the worker pool"""
     try:
         # Validate file type
         ext = os.path.splitext(file.filename)[1].lower()
@@ -47,28 +122,94 @@ async def upload_file(file: UploadFile = File(...)):
         unique_name = f"{uuid.uuid4().hex}{ext}"
         filepath = os.path.join(UPLOAD_DIR, unique_name)
 
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Stream to disk, hashing, counting lines and keeping the head for sniffing
+        tmp_path = f"{filepath}.upload"
+        try:
+            with metrics.span('ingest'):
+                stats = stream_to_disk(file.file, tmp_path)
+            metrics.count('ingest', nbytes=stats['size'])
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
-        file_size = os.path.getsize(filepath)
+        # Store by content — an identical earlier upload is linked instead of kept twice
+        deduplicated = store_upload(tmp_path, filepath, stats['sha256'])
 
-        # Read to get columns and row count
-        if ext == '.csv':
-            df = pd.read_csv(filepath)
-        else:
-            df = pd.read_excel(filepath)
+        # A dataset is one sheet of a workbook — the first unless another is picked
+        if sheet is not None and ext != '.csv':
+            try:
+                sheet = resolve_sheet(filepath, sheet)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            select_sheet(filepath, sheet)
+            link_shared_working_copy(filepath)
 
-        # Preview — first 5 rows, convert to JSON-safe format
-        preview = df.head(5).where(pd.notnull(df.head(5)), None).to_dict(orient='records')
+        # Metadata without a full parse — columns, row count, 5-row JSON-safe preview
+        meta = sniff_csv(stats, filepath) if ext == '.csv' else sniff_excel(filepath, sheet)
 
-        return {
+        result = {
             'success': True,
             'filename': file.filename,
             'filepath': filepath,
-            'size': file_size,
-            'columns': list(df.columns),
-            'rowCount': len(df),
-            'preview': preview,
+            'size': stats['size'],
+            'contentHash': stats['sha256'],
+            'deduplicated': deduplicated,
+            'columns': meta['columns'],
+            'rowCount': meta['rowCount'],
+            'preview': meta['preview'],
+        }
+        if 'rowCountEstimated' in meta:
+            result['rowCountEstimated'] = meta['rowCountEstimated']
+        if 'sheets' in meta:
+            result['sheet'] = sheet or meta['sheets'][0]
+            result['sheets'] = meta['sheets']
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+class SheetRequest(BaseModel):
+    filepath: str
+    sheet: str
+
+
+@app.post("/upload/sheet")
+async def select_upload_sheet(request: SheetRequest):
+    """Open another sheet of an uploaded workbook as its own dataset"""
+    return await run_in_worker('upload', _select_upload_sheet, request)
+
+
+def _select_upload_sheet(request: SheetRequest) -> Dict[str, Any]:
+    """Blocking part of /upload/sheet — runs in the worker pool"""
+    try:
+        if not os.path.exists(request.filepath):
+            raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
+        if not is_excel(request.filepath):
+            raise HTTPException(status_code=400, detail="Only Excel uploads have sheets")
+
+        # Sheets are read from the original workbook — cleaning rewrites only the dataset's own sheet
+        try:
+            sheet = resolve_sheet(original_upload(request.filepath), request.sheet)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        ext = os.path.splitext(request.filepath)[1].lower()
+        filepath = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}")
+        derive_upload(request.filepath, filepath, sheet)
+        meta = sniff_excel(filepath, sheet)
+
+        return {
+            'success':  True,
+            'filepath': filepath,
+            'sheet':    sheet or meta['sheets'][0],
+            'sheets':   meta['sheets'],
+            'columns':  meta['columns'],
+            'rowCount': meta['rowCount'],
+            'preview':  meta['preview'],
         }
 
     except HTTPException:
@@ -82,17 +223,68 @@ async def health_check():
     return {"status": "ok", "service": "dataclean-ml-service"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Dataset cache hit/miss/eviction counters for sizing DATASET_CACHE_MAX_MB, plus the result memo"""
+    return {**dataset_cache.stats(), 'results': result_cache.stats()}
+
+
+@app.get("/workers/stats")
+async def workers_stats():
+    """Running/waiting/rejected counts per job type, plus estimator CPU budget usage"""
+    return {**worker_pool.stats(), 'cpu_budget': cpu_budget.stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Request/stage timings, rows and bytes processed, RSS and queue depths in Prometheus text format"""
+    pool = worker_pool.stats()['jobs']
+    cache = dataset_cache.stats()
+    jobs = job_store.stats()['jobs']
+    budget = cpu_budget.stats()
+    body = metrics.render([
+        metrics.gauge('ml_worker_running', 'Requests running in the worker pool',
+                      [({'kind': kind}, entry['running']) for kind, entry in pool.items()]),
+        metrics.gauge('ml_worker_queue_depth', 'Requests waiting for a worker slot',
+                      [({'kind': kind}, entry['waiting']) for kind, entry in pool.items()]),
+        metrics.gauge('ml_background_jobs', 'Background jobs by state',
+                      [({'state': state}, n) for state, n in sorted(jobs.items())]),
+        metrics.gauge('ml_cpu_budget_threads', 'Estimator threads in use and in total',
+                      [({'state': 'in_use'}, budget['in_use']), ({'state': 'total'}, budget['total'])]),
+        metrics.gauge('ml_dataset_cache_bytes', 'Memory held by the dataset cache', [({}, cache['bytes'])]),
+        metrics.gauge('ml_dataset_cache_entries', 'Datasets held by the dataset cache', [({}, cache['entries'])]),
+    ])
+    return PlainTextResponse(body, media_type='text/plain; version=0.0.4')
+
+
 @app.get("/")
 async def root():
     return {
         "name": "DataClean ML Service",
         "version": "1.0.0",
         "endpoints": {
-            "upload":  "POST /upload",
-            "analyze": "POST /analyze",
-            "clean":   "POST /clean",
-            "train":   "POST /train",
-            "health":  "GET  /health",
+            "upload":        "POST /upload",
+            "uploadSheet":   "POST /upload/sheet",
+            "analyze":       "POST /analyze",
+            "clean":         "POST /clean",
+            "cleanPipeline": "POST /clean/pipeline",
+            "cleanUndo":     "POST /clean/undo",
+            "cleanHistory":  "GET  /clean/history",
+            "train":         "POST /train",
+            "trainJob":      "POST /train/jobs",
+            "compare":       "POST /train/compare",
+            "compareJob":    "POST /train/compare/jobs",
+            "job":           "GET  /jobs/{id}",
+            "cancelJob":     "DELETE /jobs/{id}",
+            "predict":       "POST /predict",
+            "predictFile":   "POST /predict/file",
+            "rows":          "POST /rows",
+            "outliers":      "POST /outliers",
+            "models":        "GET  /models",
+            "health":        "GET  /health",
+            "cache":         "GET  /cache/stats",
+            "workers":       "GET  /workers/stats",
+            "metrics":       "GET  /metrics",
         }
     }
 
@@ -1,55 +1,95 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-import pandas as pd
 import os
 
-from utils.data_processing import (
-    get_data_summary,
-    analyze_missing_values,
-    detect_outliers,
-    analyze_distribution
-)
+from utils.compact import COMPACT_LOAD, memory_report
+from utils.data_processing import profile_dataset
+from utils.dataset_cache import load_dataset, source_path, SUPPORTED_EXTENSIONS
+from utils.metrics import TimedRoute, count, span
+from utils.result_cache import result_cache
+from utils.sampling import quick_profile, QUICK_SAMPLE_ROWS
+from utils.snapshots import dataset_identity
+from utils.storage import iter_dataset_chunks, DEFAULT_CHUNK_ROWS
+from utils.streaming import analyze_streaming
+from utils.workers import run_in_worker
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Files above this size are analyzed in streaming mode even when 'full' is requested
+STREAMING_THRESHOLD_MB = float(os.environ.get('ML_STREAMING_THRESHOLD_MB', '2048'))
 
 
 class AnalyzeRequest(BaseModel):
     filepath: str
     analysisType: str = 'full'
+    chunkSize: int = DEFAULT_CHUNK_ROWS
+    compact: bool = COMPACT_LOAD
+    sampleSize: int = QUICK_SAMPLE_ROWS
+    seed: int = 0
 
 
 @router.post("/analyze")
 async def analyze(request: AnalyzeRequest):
     """Analyze uploaded data and return statistical insights"""
+    return await run_in_worker('analyze', _analyze, request)
+
+
+def _analyze(request: AnalyzeRequest) -> Dict[str, Any]:
+    """Blocking part of /analyze — runs in the worker pool"""
     try:
-        # Read file from disk — same pattern as clean.py and train.py
+        # Read through the shared dataset cache — same pattern as clean.py and train.py
         if not os.path.exists(request.filepath):
             raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
 
         ext = os.path.splitext(request.filepath)[1].lower()
-        if ext == '.csv':
-            df = pd.read_csv(request.filepath)
-        elif ext in ('.xlsx', '.xls'):
-            df = pd.read_excel(request.filepath)
-        else:
+        if ext not in SUPPORTED_EXTENSIONS:
             raise HTTPException(status_code=400, detail="Unsupported file type. Only CSV and Excel are allowed.")
 
-        # Get summary statistics
-        summary = get_data_summary(df)
-
-        # Analyze missing values
-        missing_values = analyze_missing_values(df)
+        if request.analysisType == 'quick' and request.sampleSize < 1:
+            raise HTTPException(status_code=400, detail="sampleSize must be at least 1")
+        if request.chunkSize < 1:
+            raise HTTPException(status_code=400, detail="chunkSize must be positive")
+
+        size_mb = os.path.getsize(source_path(request.filepath)) / 1024 / 1024
+        quick = request.analysisType == 'quick'
+        streaming = not quick and (request.analysisType == 'streaming' or size_mb > STREAMING_THRESHOLD_MB)
+
+        # Same content analyzed the same way before — answer from the result memo
+        identity = dataset_identity(request.filepath)
+        compact = request.compact and not (streaming or quick)
+        memo_key = ['analyze', identity, streaming, request.chunkSize if streaming else None, compact,
+                    (request.sampleSize, request.seed) if quick else None]
+        if identity is not None:
+            cached = result_cache.get(memo_key)
+            if cached is not None:
+                return {**cached, 'cached': True}
+
+        if quick:
+            # Seeded uniform sample, scaled to the full row count (see utils.sampling)
+            with span('sample'):
+                profile = quick_profile(request.filepath, request.sampleSize, request.seed)
+        elif streaming:
+            # Chunked scan with mergeable accumulators — never loads the whole file
+            with span('profile'):
+                profile = analyze_streaming(iter_dataset_chunks(request.filepath, chunksize=request.chunkSize))
+        else:
+            # Compact mode — narrow numerics, category and Arrow strings (see utils.compact)
+            df = load_dataset(request.filepath, compact=compact)
 
-        # Detect outliers (both IQR and Z-Score)
-        outliers_iqr = detect_outliers(df, method='iqr')
-        outliers_zscore = detect_outliers(df, method='zscore')
+            # Summary, missing values, outliers (IQR + Z-Score) and distributions in one pass
+            with span('profile'):
+                profile = profile_dataset(df)
 
-        # Analyze distribution
-        distributions = analyze_distribution(df)
+        summary = profile['summary']
+        count('profile', rows=summary['rows'])
+        missing_values = profile['missing_values']
+        outliers_iqr = profile['outliers_iqr']
+        outliers_zscore = profile['outliers_zscore']
+        distributions = profile['distributions']
 
         # Return directly — no wrapper object
-        return {
+        result = {
             'summary': summary,
             'missing_values': missing_values,
             'outliers': {
@@ -60,6 +100,28 @@ async def analyze(request: AnalyzeRequest):
             'recommendations': generate_recommendations(summary, missing_values, outliers_iqr)
         }
 
+        if compact:
+            result['memory'] = memory_report(df)
+
+        if streaming:
+            # Quantile-based figures (medians, outlier counts, histograms) are sketch estimates
+            result['approximate'] = True
+            result['streaming'] = {
+                'chunks':           profile['chunks'],
+                'chunk_size':       request.chunkSize,
+                'duplicates_exact': profile['duplicates_exact'],
+            }
+
+        if quick:
+            # Counts are scaled from the sample — intervals say how far they can be off
+            result['approximate'] = True
+            result['sample'] = profile['sample']
+            result['confidence_intervals'] = profile['confidence_intervals']
+
+        if identity is not None:
+            result_cache.put(memo_key, result)
+        return result
+
     except HTTPException:
         raise
     except Exception as e:
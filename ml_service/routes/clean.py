@@ -1,49 +1,201 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 import os
 
-router = APIRouter()
+from utils.cleaning import CLEANING_METHODS, apply_cleaning_method
+from utils.compact import COMPACT_LOAD, expand_frame
+from utils.data_processing import column_hash_terms, count_duplicates_by_hash, row_hashes
+from utils.dataset_cache import dataset_cache, load_dataset, SUPPORTED_EXTENSIONS
+from utils.excel import selected_sheet
+from utils.imputation import KNN_NEIGHBORS
+from utils.multivariate import OUTLIER_CONTAMINATION, OUTLIER_METHODS
+from utils.export import (
+    EXPORT_FORMATS,
+    XLSX_MAX_ROWS,
+    compress_stream,
+    iter_csv,
+    iter_file,
+    iter_xlsx,
+    negotiate_encoding,
+    parse_range,
+    zstd_available,
+)
+from utils.metrics import TimedRoute, count, span
+from utils.snapshots import load_history, record_version, restore_version, snapshot_original, write_lock
+from utils.storage import (
+    has_working_copy,
+    is_raw_stale,
+    materialize_raw,
+    save_dataset,
+    working_path,
+    working_rows,
+)
+from utils.workers import run_in_worker
+
+router = APIRouter(route_class=TimedRoute)
+
+# 'auto' picks zstd or gzip from Accept-Encoding (CSV only); 'none' never compresses
+DOWNLOAD_COMPRESSIONS = ('auto', 'none', 'gzip', 'zstd')
 
 
 class CleanRequest(BaseModel):
     filepath: str
     cleaningMethod: str
     columns: Optional[List[str]] = None
+    groupBy: Optional[List[str]] = None
+    neighbors: int = KNN_NEIGHBORS
+    outlierMethod: str = 'isolation_forest'
+    contamination: float = OUTLIER_CONTAMINATION
+    compact: bool = COMPACT_LOAD
 
 
-def calculate_quality_report(df_before: pd.DataFrame, df_after: pd.DataFrame) -> Dict[str, Any]:
-    """Calculate cleaning quality metrics comparing before and after"""
+class CleanStep(BaseModel):
+    method: str
+    columns: Optional[List[str]] = None
+    groupBy: Optional[List[str]] = None
+    neighbors: int = KNN_NEIGHBORS
+    outlierMethod: str = 'isolation_forest'
+    contamination: float = OUTLIER_CONTAMINATION
+
+
+class CleanPipelineRequest(BaseModel):
+    filepath: str
+    steps: List[CleanStep]
+    compact: bool = COMPACT_LOAD
+
+
+class UndoRequest(BaseModel):
+    filepath: str
+    version: Optional[int] = None
+
+
+# Aggregates of the last cleaned frame per file, reused as the "before" side of
+# the next report while the dataset cache still hands out that same frame.
+# Each holds a per-row hash array, so only the most recently cleaned files are kept
+REPORT_AGGREGATES_MAX = int(os.environ.get('ML_REPORT_AGGREGATES_MAX', '16'))
+
+_report_aggregates: 'OrderedDict[str, Tuple[Any, Dict[str, Any]]]' = OrderedDict()
+_report_aggregates_lock = threading.Lock()
+
+
+def quality_aggregates(df: pd.DataFrame) -> Dict[str, Any]:
+    """Column-wise aggregates the quality report diffs — one vectorized pass per statistic"""
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    row_hash     = row_hashes(df)
+    return {
+        'rows':     len(df),
+        'columns':  list(df.columns),
+        'missing':  df.isnull().sum(),
+        'numeric':  numeric_cols,
+        'mean':     df[numeric_cols].mean(),
+        'std':      df[numeric_cols].std(),
+        'row_hash': row_hash,
+        'dups':     count_duplicates_by_hash(df, row_hash),
+    }
+
+
+def _after_aggregates(df_before: pd.DataFrame, df_after: pd.DataFrame,
+                      before: Dict[str, Any], touched: Optional[List[str]]) -> Dict[str, Any]:
+    """Update ``before`` for the cleaned frame, recomputing only what changed.
+
+    Dropped rows are located through the index (cleaning keeps the original
+    labels), so untouched columns are never rehashed; only the touched ones are.
+    """
+    if touched is None or list(df_after.columns) != before['columns'] or not df_before.index.is_unique:
+        return quality_aggregates(df_after)
+
+    rows_dropped = len(df_after) != before['rows']
+    positions    = None
+    if rows_dropped:
+        positions = df_before.index.get_indexer(df_after.index)
+        if (positions < 0).any():
+            return quality_aggregates(df_after)
+
+    touched_set = set(touched)
+    touched     = [col for col in before['columns'] if col in touched_set]
+    col_index   = {col: i for i, col in enumerate(before['columns'])}
+
+    # Missing counts only move in touched columns, or in gappy columns when rows were dropped
+    missing = before['missing'].copy()
+    recount = [col for col in before['columns']
+               if col in touched_set or (rows_dropped and missing[col] > 0)]
+    if recount:
+        missing[recount] = df_after[recount].isnull().sum()
+
+    numeric = before['numeric']
+    mean    = before['mean'].copy()
+    std     = before['std'].copy()
+    restat  = numeric if rows_dropped else [col for col in numeric if col in touched_set]
+    if restat:
+        mean[restat] = df_after[restat].mean()
+        std[restat]  = df_after[restat].std()
+
+    row_hash = before['row_hash'] if positions is None else before['row_hash'][positions]
+    if touched:
+        old_terms = column_hash_terms(df_before, touched, col_index)
+        if positions is not None:
+            old_terms = old_terms[positions]
+        row_hash = row_hash - old_terms + column_hash_terms(df_after, touched, col_index)
+
+    return {
+        'rows':     len(df_after),
+        'columns':  before['columns'],
+        'missing':  missing,
+        'numeric':  numeric,
+        'mean':     mean,
+        'std':      std,
+        'row_hash': row_hash,
+        'dups':     count_duplicates_by_hash(df_after, row_hash),
+    }
+
 
+def calculate_quality_report(df_before: pd.DataFrame, df_after: pd.DataFrame,
+                             before: Optional[Dict[str, Any]] = None,
+                             touched: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Calculate cleaning quality metrics comparing before and after.
+
+    Pass ``before`` (from ``quality_aggregates``) and the ``touched`` columns to
+    avoid rescanning the frames; without them everything is computed from scratch.
+    """
+    if before is None:
+        before = quality_aggregates(df_before)
+    return _report_from_aggregates(before, _after_aggregates(df_before, df_after, before, touched))
+
+
+def _report_from_aggregates(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
     # 1. Completeness
-    missing_before    = int(df_before.isnull().sum().sum())
-    missing_after     = int(df_after.isnull().sum().sum())
+    missing_before    = int(before['missing'].sum())
+    missing_after     = int(after['missing'].sum())
     completeness_score = round(
         (1 - missing_after / max(missing_before, 1)) * 100, 1
     ) if missing_before > 0 else 100.0
 
     # 2. Row retention
-    rows_before   = len(df_before)
-    rows_after    = len(df_after)
+    rows_before   = before['rows']
+    rows_after    = after['rows']
     rows_removed  = rows_before - rows_after
     retention_pct = round((rows_after / max(rows_before, 1)) * 100, 1)
 
     # 3. Consistency — mean/std shift per numeric column
-    numeric_cols       = df_before.select_dtypes(include=[np.number]).columns.tolist()
     consistency_checks = []
     overall_consistent = True
 
-    for col in numeric_cols:
-        if col not in df_after.columns:
+    for col in before['numeric']:
+        if col not in after['mean'].index:
             continue
 
-        mean_before = df_before[col].mean()
-        mean_after  = df_after[col].mean()
-        std_before  = df_before[col].std()
-        std_after   = df_after[col].std()
+        mean_before = before['mean'][col]
+        mean_after  = after['mean'][col]
+        std_before  = before['std'][col]
+        std_after   = after['std'][col]
 
         mean_shift = abs(mean_after - mean_before) / max(abs(mean_before), 0.001) * 100
         std_shift  = abs(std_after  - std_before)  / max(abs(std_before),  0.001) * 100
@@ -67,14 +219,14 @@ def calculate_quality_report(df_before: pd.DataFrame, df_after: pd.DataFrame) ->
         })
 
     # 4. Duplicate check
-    dups_before = int(df_before.duplicated().sum())
-    dups_after  = int(df_after.duplicated().sum())
+    dups_before = before['dups']
+    dups_after  = after['dups']
 
     # 5. Per-column missing summary
     column_summary = []
-    for col in df_before.columns:
-        before_missing = int(df_before[col].isnull().sum())
-        after_missing  = int(df_after[col].isnull().sum())
+    for col in before['columns']:
+        before_missing = int(before['missing'][col])
+        after_missing  = int(after['missing'][col])
         if before_missing > 0:
             column_summary.append({
                 'column':         col,
@@ -131,96 +283,259 @@ def calculate_quality_report(df_before: pd.DataFrame, df_after: pd.DataFrame) ->
 
 @router.post("/clean")
 async def clean_data(request: CleanRequest):
-    try:
-        if not os.path.exists(request.filepath):
-            raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
-
-        ext = os.path.splitext(request.filepath)[1].lower()
-        if ext == '.csv':
-            df = pd.read_csv(request.filepath)
-        elif ext in ('.xlsx', '.xls'):
-            df = pd.read_excel(request.filepath)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type.")
-
-        df_before     = df.copy()
-        original_rows = len(df)
-        df_cleaned    = df.copy()
-        target_cols   = request.columns if request.columns else None
-
-        if request.cleaningMethod == 'drop_missing':
-            df_cleaned   = df_cleaned.dropna(subset=target_cols) if target_cols else df_cleaned.dropna()
-            removed_rows = original_rows - len(df_cleaned)
-            summary      = f"Dropped {removed_rows} rows with missing values"
-
-        elif request.cleaningMethod == 'fill_mean':
-            cols = target_cols or list(df_cleaned.select_dtypes(include=[np.number]).columns)
-            for col in cols:
-                if col in df_cleaned.columns and pd.api.types.is_numeric_dtype(df_cleaned[col]):
-                    df_cleaned[col] = df_cleaned[col].fillna(df_cleaned[col].mean())
-            removed_rows = 0
-            summary = f"Filled missing values with mean"
-
-        elif request.cleaningMethod == 'fill_median':
-            cols = target_cols or list(df_cleaned.select_dtypes(include=[np.number]).columns)
-            for col in cols:
-                if col in df_cleaned.columns and pd.api.types.is_numeric_dtype(df_cleaned[col]):
-                    df_cleaned[col] = df_cleaned[col].fillna(df_cleaned[col].median())
-            removed_rows = 0
-            summary = f"Filled missing values with median"
-
-        elif request.cleaningMethod == 'fill_mode':
-            cols = target_cols or list(df_cleaned.columns)
-            for col in cols:
-                if col in df_cleaned.columns and df_cleaned[col].isnull().any():
-                    mode_val = df_cleaned[col].mode()
-                    if len(mode_val) > 0:
-                        df_cleaned[col] = df_cleaned[col].fillna(mode_val[0])
-            removed_rows = 0
-            summary = f"Filled missing values with mode"
-
-        elif request.cleaningMethod == 'forward_fill':
-            cols = target_cols or list(df_cleaned.columns)
-            for col in cols:
-                if col in df_cleaned.columns:
-                    df_cleaned[col] = df_cleaned[col].ffill().bfill()
-            removed_rows = 0
-            summary = f"Applied forward/backward fill"
-
-        elif request.cleaningMethod == 'drop_duplicates':
-            df_cleaned   = df_cleaned.drop_duplicates()
-            removed_rows = original_rows - len(df_cleaned)
-            summary      = f"Removed {removed_rows} duplicate rows"
-
-        elif request.cleaningMethod == 'interpolate':
-            cols = target_cols or list(df_cleaned.select_dtypes(include=[np.number]).columns)
-            for col in cols:
-                if col in df_cleaned.columns and pd.api.types.is_numeric_dtype(df_cleaned[col]):
-                    df_cleaned[col] = df_cleaned[col].interpolate(method='linear')
-            removed_rows = 0
-            summary = f"Interpolated missing values"
+    return await run_in_worker('clean', _clean_data, request)
+
+
+def _check_clean_file(filepath: str) -> None:
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
+
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported file type.")
+
+
+def _check_step(step: CleanStep) -> None:
+    if step.method not in CLEANING_METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown cleaning method: {step.method}")
+    if step.method == 'fill_group_median' and not step.groupBy:
+        raise HTTPException(status_code=400, detail="fill_group_median requires groupBy columns")
+    if step.method == 'fill_knn' and step.neighbors < 1:
+        raise HTTPException(status_code=400, detail="neighbors must be at least 1")
+    if step.method in ('drop_outliers', 'flag_outliers'):
+        if step.outlierMethod not in OUTLIER_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown outlierMethod '{step.outlierMethod}'. Use one of: {', '.join(OUTLIER_METHODS)}")
+        if not 0 < step.contamination < 0.5:
+            raise HTTPException(status_code=400, detail="contamination must be between 0 and 0.5")
+
+
+def _step_record(step: CleanStep) -> Dict[str, Any]:
+    """A step as stored in the version history — only the options its method uses"""
+    record = {'method': step.method, 'columns': step.columns}
+    if step.method == 'fill_group_median':
+        record['groupBy'] = step.groupBy
+    elif step.method == 'fill_knn':
+        record['neighbors'] = step.neighbors
+    elif step.method in ('drop_outliers', 'flag_outliers'):
+        record['outlierMethod'] = step.outlierMethod
+        record['contamination'] = step.contamination
+    return record
+
+
+def _before_aggregates(filepath: str, df: pd.DataFrame) -> Dict[str, Any]:
+    """Aggregates of ``df``, reused from the previous clean when it produced this frame"""
+    key = os.path.abspath(filepath)
+    with _report_aggregates_lock:
+        entry = _report_aggregates.get(key)
+        if entry is not None and entry[0]() is df:
+            _report_aggregates.move_to_end(key)
+            return entry[1]
+    return quality_aggregates(df)
+
+
+def _remember_aggregates(filepath: str, df: pd.DataFrame, aggregates: Dict[str, Any]) -> None:
+    with _report_aggregates_lock:
+        # Entries whose frame left the dataset cache can never match again
+        for key in [key for key, entry in _report_aggregates.items() if entry[0]() is None]:
+            del _report_aggregates[key]
+        key = os.path.abspath(filepath)
+        _report_aggregates[key] = (weakref.ref(df), aggregates)
+        _report_aggregates.move_to_end(key)
+        while len(_report_aggregates) > REPORT_AGGREGATES_MAX:
+            _report_aggregates.popitem(last=False)
+
+
+def _forget_aggregates(filepath: str) -> None:
+    with _report_aggregates_lock:
+        _report_aggregates.pop(os.path.abspath(filepath), None)
+
+
+def _run_steps(filepath: str, steps: List[CleanStep], compact: bool = False) -> Dict[str, Any]:
+    """Apply ``steps`` to one copy of the dataset, persist the result once and report on it"""
+    # One writer per file — another clean or undo must not interleave with load, save and record_version
+    with write_lock(filepath):
+        # The cached frame is read-only and doubles as the "before" side of the report
+        df_before = load_dataset(filepath, compact=compact)
+        df        = df_before.copy()
+
+        step_results = []
+        touched      = []
+        with span('clean'):
+            for step in steps:
+                rows_in = len(df)
+                try:
+                    df, removed_rows, summary, step_touched = apply_cleaning_method(
+                        df, step.method, step.columns, step.groupBy, step.neighbors,
+                        step.outlierMethod, step.contamination,
+                    )
+                except ValueError as e:
+                    # Options that only the data can validate, e.g. an unknown groupBy column
+                    raise HTTPException(status_code=400, detail=str(e))
+                touched.extend(step_touched)
+                count('clean', rows=rows_in)
+                step_results.append({
+                    'method':      step.method,
+                    'columns':     step.columns,
+                    'summary':     summary,
+                    'rowsBefore':  rows_in,
+                    'rowsAfter':   len(df),
+                    'removedRows': removed_rows,
+                })
+
+        # Keep the pre-cleaning data around before the first write replaces it
+        snapshot_original(filepath, len(df_before))
+
+        # Save cleaned data — only the Parquet working copy is rewritten;
+        # /download regenerates the CSV/XLSX when it is actually requested
+        with span('save'):
+            # Compact dtypes are an in-memory mode — the working copy keeps the parse dtypes
+            save_dataset(filepath, expand_frame(df) if compact else df)
+        version = record_version(
+            filepath,
+            ' -> '.join(step.method for step in steps),
+            len(df),
+            [_step_record(step) for step in steps],
+        )
 
-        else:
-            raise HTTPException(status_code=400, detail=f"Unknown cleaning method: {request.cleaningMethod}")
+        # New dataset version — drop the stale parse and seed the cache with the result
+        dataset_cache.bump_version(filepath)
+        dataset_cache.put(filepath, df, compact)
+
+        # Calculate quality report — the "after" aggregates become the next clean's "before"
+        with span('quality_report'):
+            before = _before_aggregates(filepath, df_before)
+            after  = _after_aggregates(df_before, df, before, touched)
+        _remember_aggregates(filepath, df, after)
+
+        return {
+            'df_before': df_before,
+            'df_after':  df,
+            'steps':     step_results,
+            'version':   version,
+            'quality':   _report_from_aggregates(before, after),
+        }
 
-        # Save cleaned file
-        if ext == '.csv':
-            df_cleaned.to_csv(request.filepath, index=False)
-        elif ext in ('.xlsx', '.xls'):
-            df_cleaned.to_excel(request.filepath, index=False)
 
-        # Calculate quality report
-        quality_report = calculate_quality_report(df_before, df_cleaned)
+def _clean_data(request: CleanRequest) -> Dict[str, Any]:
+    """Blocking part of /clean — runs in the worker pool"""
+    try:
+        _check_clean_file(request.filepath)
+        clean_step = CleanStep(
+            method=request.cleaningMethod,
+            columns=request.columns,
+            groupBy=request.groupBy,
+            neighbors=request.neighbors,
+            outlierMethod=request.outlierMethod,
+            contamination=request.contamination,
+        )
+        _check_step(clean_step)
+
+        outcome = _run_steps(request.filepath, [clean_step], compact=request.compact)
+        step = outcome['steps'][0]
 
         return {
             'success':      True,
-            'summary':      summary,
-            'originalRows': original_rows,
-            'cleanedRows':  len(df_cleaned),
-            'removedRows':  removed_rows,
+            'summary':      step['summary'],
+            'originalRows': step['rowsBefore'],
+            'cleanedRows':  step['rowsAfter'],
+            'removedRows':  step['removedRows'],
             'method':       request.cleaningMethod,
             'filepath':     request.filepath,
-            'quality':      quality_report,
+            'version':      outcome['version'],
+            'quality':      outcome['quality'],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/clean/pipeline")
+async def clean_pipeline(request: CleanPipelineRequest):
+    return await run_in_worker('clean', _clean_pipeline, request)
+
+
+def _clean_pipeline(request: CleanPipelineRequest) -> Dict[str, Any]:
+    """Run several cleaning steps in memory and write the dataset once"""
+    try:
+        _check_clean_file(request.filepath)
+        if not request.steps:
+            raise HTTPException(status_code=400, detail="At least one cleaning step is required")
+        for step in request.steps:
+            _check_step(step)
+
+        outcome   = _run_steps(request.filepath, request.steps, request.compact)
+        df_before = outcome['df_before']
+        df_after  = outcome['df_after']
+
+        return {
+            'success':      True,
+            'steps':        outcome['steps'],
+            'originalRows': len(df_before),
+            'cleanedRows':  len(df_after),
+            'removedRows':  len(df_before) - len(df_after),
+            'filepath':     request.filepath,
+            'version':      outcome['version'],
+            'quality':      outcome['quality'],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/clean/history")
+async def clean_history(filepath: str):
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
+
+    history = load_history(filepath)
+    return {
+        'filepath':       filepath,
+        'currentVersion': history['current'],
+        'versions':       [
+            {k: v for k, v in entry.items() if k != 'file'} for entry in history['versions']
+        ],
+    }
+
+
+@router.post("/clean/undo")
+async def clean_undo(request: UndoRequest):
+    return await run_in_worker('clean', _clean_undo, request)
+
+
+def _clean_undo(request: UndoRequest) -> Dict[str, Any]:
+    """Restore an earlier snapshot — defaults to the one before the current version"""
+    try:
+        _check_clean_file(request.filepath)
+
+        # Same per-file lock as /clean — the history read here must still be current when restoring
+        with write_lock(request.filepath):
+            history = load_history(request.filepath)
+            current = history['current']
+            if current is None:
+                raise HTTPException(status_code=400, detail="No cleaning history for this file")
+
+            version = request.version if request.version is not None else current - 1
+            if version < 0:
+                raise HTTPException(status_code=400, detail="Already at the original version")
+
+            try:
+                entry = restore_version(request.filepath, version)
+            except KeyError:
+                raise HTTPException(status_code=404, detail=f"Version not found: {version}")
+
+            dataset_cache.bump_version(request.filepath)
+            _forget_aggregates(request.filepath)
+
+        return {
+            'success':         True,
+            'filepath':        request.filepath,
+            'restoredVersion': version,
+            'label':           entry['label'],
+            'rows':            entry['rows'],
         }
 
     except HTTPException:
@@ -230,22 +545,97 @@ async def clean_data(request: CleanRequest):
 
 
 @router.get("/download")
-async def download_cleaned_file(filepath: str):
+async def download_cleaned_file(request: Request, filepath: str, format: Optional[str] = None,
+                                compression: str = 'auto'):
+    """Download the dataset — optionally converted, compressed, or as a byte range"""
+    return await run_in_worker(
+        'download', _download_cleaned_file, filepath, format, compression,
+        request.headers.get('accept-encoding', ''), request.headers.get('range'), request.headers.get('if-range'),
+    )
+
+
+def _download_cleaned_file(filepath: str, format: Optional[str] = None, compression: str = 'auto',
+                           accept_encoding: str = '', range_header: Optional[str] = None,
+                           if_range: Optional[str] = None) -> Response:
     try:
         if not filepath:
             raise HTTPException(status_code=400, detail="filepath query param is required")
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="File not found")
 
-        ext           = os.path.splitext(filepath)[1].lower()
-        original_name = os.path.basename(filepath)
-        download_name = f"cleaned_{original_name}"
-        media_type    = (
-            'text/csv' if ext == '.csv'
-            else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        ext = os.path.splitext(filepath)[1].lower()
+        own = 'csv' if ext == '.csv' else 'xlsx'
+        fmt = format or own
+        if fmt not in EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+        if compression not in DOWNLOAD_COMPRESSIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown compression '{compression}'. Use one of: {', '.join(DOWNLOAD_COMPRESSIONS)}")
+        if compression == 'zstd' and not zstd_available():
+            raise HTTPException(status_code=400, detail="zstd compression is not available on this server")
+
+        if fmt == 'parquet' and not has_working_copy(filepath):
+            # First touch converts the raw upload; mixed-type Excel columns can't be stored as Parquet
+            dataset_cache.get(filepath)
+            if not has_working_copy(filepath):
+                raise HTTPException(status_code=400, detail="This dataset can't be represented as Parquet")
+        if fmt == 'xlsx' and has_working_copy(filepath) and working_rows(filepath) >= XLSX_MAX_ROWS:
+            raise HTTPException(status_code=400, detail=f"Too many rows for an XLSX sheet (max {XLSX_MAX_ROWS - 1})")
+
+        # Same data in the same format -> same bytes, so the ETag lets clients resume safely
+        etag = '"' + hashlib.sha1(repr((dataset_cache.signature(filepath), fmt)).encode()).hexdigest() + '"'
+        # The raw upload is only served as-is in its own format — an .xls is converted for xlsx
+        raw_matches = ext == EXPORT_FORMATS[fmt][1]
+        # Byte ranges need the bytes on disk: the working copy, or the raw file in its own format
+        rangeable = fmt == 'parquet' or raw_matches
+        wants_range = rangeable and range_header is not None and (if_range is None or if_range == etag)
+
+        media_type, suffix = EXPORT_FORMATS[fmt]
+        headers = {
+            'Content-Disposition': f'attachment; filename="cleaned_{os.path.splitext(os.path.basename(filepath))[0]}{suffix}"',
+            'ETag':                etag,
+            'Accept-Ranges':       'bytes' if rangeable else 'none',
+        }
+
+        path = None
+        if fmt == 'parquet':
+            path = working_path(filepath)
+        elif raw_matches and (wants_range or not is_raw_stale(filepath)):
+            # Bring the raw file up to date with any cleaning applied since upload
+            materialize_raw(filepath)
+            path = filepath
+
+        if wants_range:
+            size = os.path.getsize(path)
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={'Content-Range': f"bytes */{size}"})
+            if byte_range is not None:
+                start, end = byte_range
+                headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+                headers['Content-Length'] = str(end - start + 1)
+                return StreamingResponse(iter_file(path, start, end), status_code=206, media_type=media_type, headers=headers)
+
+        if compression == 'auto':
+            headers['Vary'] = 'Accept-Encoding'
+            # XLSX and Parquet are compressed already
+            encoding = negotiate_encoding(accept_encoding) if fmt == 'csv' else None
+        else:
+            encoding = None if compression == 'none' else compression
+
+        if path is not None:
+            body = iter_file(path)
+            if encoding is None:
+                headers['Content-Length'] = str(os.path.getsize(path))
+        elif fmt == 'xlsx':
+            # Cleaned data not yet written back — generated straight from the working copy
+            body = iter_xlsx(filepath, selected_sheet(filepath) or 'Sheet1')
+        else:
+            body = iter_csv(filepath)
 
-        return FileResponse(path=filepath, media_type=media_type, filename=download_name)
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return StreamingResponse(compress_stream(body, encoding), media_type=media_type, headers=headers)
 
     except HTTPException:
         raise
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, HTTPException
+
+from utils.jobs import job_store
+from utils.metrics import TimedRoute
+
+router = APIRouter(route_class=TimedRoute)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job state, progress and — once finished — its result or error"""
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found or expired: {job_id}")
+    return job.to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Request cancellation — running jobs stop at their next progress checkpoint"""
+    job = job_store.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found or expired: {job_id}")
+    return job.to_dict()
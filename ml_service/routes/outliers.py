@@ -0,0 +1,79 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+import os
+
+from utils.dataset_cache import SUPPORTED_EXTENSIONS
+from utils.metrics import TimedRoute, count, span
+from utils.multivariate import OUTLIER_CONTAMINATION, OUTLIER_METHODS, OUTLIER_TOP_K, detect_multivariate
+from utils.result_cache import result_cache
+from utils.rows import ROWS_MAX_LIMIT
+from utils.snapshots import dataset_identity
+from utils.workers import run_in_worker
+
+router = APIRouter(route_class=TimedRoute)
+
+
+class OutliersRequest(BaseModel):
+    filepath: str
+    method: str = 'isolation_forest'
+    columns: Optional[List[str]] = None
+    contamination: float = OUTLIER_CONTAMINATION
+    topK: int = OUTLIER_TOP_K
+    seed: int = 0
+    offset: int = 0
+    limit: int = 1000
+
+
+@router.post("/outliers")
+async def outliers(request: OutliersRequest):
+    """Multivariate outliers — per-row anomaly scores and the top-k most anomalous rows"""
+    return await run_in_worker('outliers', _outliers, request)
+
+
+def _outliers(request: OutliersRequest) -> Dict[str, Any]:
+    """Blocking part of /outliers — runs in the worker pool"""
+    try:
+        if not os.path.exists(request.filepath):
+            raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
+
+        ext = os.path.splitext(request.filepath)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail="Unsupported file type. Only CSV and Excel are allowed.")
+
+        if request.method not in OUTLIER_METHODS:
+            raise HTTPException(status_code=400, detail=f"Unknown method '{request.method}'. Use one of: {', '.join(OUTLIER_METHODS)}")
+        if not 0 < request.contamination < 0.5:
+            raise HTTPException(status_code=400, detail="contamination must be between 0 and 0.5")
+        if request.topK < 1 or request.offset < 0:
+            raise HTTPException(status_code=400, detail="topK must be >= 1 and offset >= 0")
+        if not 0 <= request.limit <= ROWS_MAX_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 0 and {ROWS_MAX_LIMIT}")
+
+        # Same content scored the same way before — answer from the result memo
+        identity = dataset_identity(request.filepath)
+        memo_key = ['outliers', identity, request.method, request.columns, request.contamination,
+                    request.topK, request.seed, request.offset, request.limit]
+        if identity is not None:
+            cached = result_cache.get(memo_key)
+            if cached is not None:
+                return {**cached, 'cached': True}
+
+        with span('outliers'):
+            try:
+                result = detect_multivariate(
+                    request.filepath, request.method, request.columns, request.contamination,
+                    request.topK, request.seed, request.offset, request.limit,
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        count('outliers', rows=result['rows'])
+
+        if identity is not None:
+            result_cache.put(memo_key, result)
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
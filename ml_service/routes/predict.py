@@ -0,0 +1,129 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List, Dict, Any
+import numpy as np
+import pandas as pd
+import os
+
+from utils.dataset_cache import dataset_columns, load_dataset, SUPPORTED_EXTENSIONS
+from utils.metrics import TimedRoute
+from utils.registry import get_model_meta, list_models, load_model, predict
+from utils.workers import run_in_worker
+
+router = APIRouter(route_class=TimedRoute)
+
+# Rows accepted inline by /predict — whole datasets go through /predict/file
+PREDICT_MAX_ROWS = int(os.environ.get('ML_PREDICT_MAX_ROWS', '10000'))
+
+
+class PredictRequest(BaseModel):
+    modelId: str
+    rows: List[Dict[str, Any]]
+
+
+class PredictFileRequest(BaseModel):
+    modelId: str
+    filepath: str
+
+
+def _get_pipeline(model_id: str) -> Dict[str, Any]:
+    pipeline = load_model(model_id)
+    if pipeline is None:
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_id}")
+    return pipeline
+
+
+def _to_json(predictions: np.ndarray) -> List:
+    # Rows that couldn't be encoded come back as null
+    return [None if np.isnan(p) else float(p) for p in predictions]
+
+
+@router.post("/predict")
+async def predict_rows(request: PredictRequest):
+    """Score JSON rows with a stored model"""
+    # Cheap size check before queueing; model loading and scoring run in the pool
+    if len(request.rows) > PREDICT_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {PREDICT_MAX_ROWS} rows per request — use /predict/file for larger batches",
+        )
+    return await run_in_worker('predict', _predict_rows, request)
+
+
+def _predict_rows(request: PredictRequest) -> Dict[str, Any]:
+    """Blocking part of /predict — runs in the worker pool"""
+    try:
+        pipeline = _get_pipeline(request.modelId)
+        if not request.rows:
+            raise HTTPException(status_code=400, detail="rows must contain at least one record")
+
+        df = pd.DataFrame.from_records(request.rows)
+        missing_cols = [col for col in pipeline['features'] if col not in df.columns]
+        if missing_cols:
+            raise HTTPException(status_code=400, detail=f"Missing feature columns: {missing_cols}")
+
+        predictions = predict(pipeline, df)
+        return {
+            'modelId':     request.modelId,
+            'target':      pipeline['target'],
+            'predictions': _to_json(predictions),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/predict/file")
+async def predict_file(request: PredictFileRequest):
+    """Score every row of an uploaded dataset with a stored model"""
+    return await run_in_worker('predict', _predict_file, request)
+
+
+def _predict_file(request: PredictFileRequest) -> Dict[str, Any]:
+    try:
+        pipeline = _get_pipeline(request.modelId)
+
+        if not os.path.exists(request.filepath):
+            raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
+
+        ext = os.path.splitext(request.filepath)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail="Unsupported file type. Only CSV and Excel are allowed.")
+
+        available_cols = set(dataset_columns(request.filepath))
+        missing_cols = [col for col in pipeline['features'] if col not in available_cols]
+        if missing_cols:
+            raise HTTPException(status_code=400, detail=f"Missing feature columns: {missing_cols}")
+
+        df = load_dataset(request.filepath, columns=pipeline['features'])
+        predictions = predict(pipeline, df)
+
+        return {
+            'modelId':     request.modelId,
+            'target':      pipeline['target'],
+            'rows':        len(predictions),
+            # Rows with unparseable values or unseen categories come back null and aren't counted
+            'scored':      int((~np.isnan(predictions)).sum()),
+            'predictions': _to_json(predictions),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/models")
+async def get_models():
+    """Stored models, newest first"""
+    return {'models': list_models()}
+
+
+@router.get("/models/{model_id}")
+async def get_model(model_id: str):
+    meta = get_model_meta(model_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail=f"Model not found: {model_id}")
+    return meta
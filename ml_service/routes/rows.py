@@ -0,0 +1,125 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+from typing import List, Any, Optional
+import json
+import os
+
+import pandas as pd
+
+from utils.dataset_cache import SUPPORTED_EXTENSIONS
+from utils.metrics import TimedRoute
+from utils.rows import FILTER_OPS, ROWS_MAX_LIMIT, read_page
+from utils.workers import run_in_worker
+
+router = APIRouter(route_class=TimedRoute)
+
+ROW_FORMATS = {
+    'json':   'application/json',
+    'ndjson': 'application/x-ndjson',
+    'arrow':  'application/vnd.apache.arrow.stream',
+}
+
+
+class RowFilter(BaseModel):
+    column: str
+    op: str = 'eq'
+    value: Any = None
+
+
+class RowsRequest(BaseModel):
+    filepath: str
+    offset: int = 0
+    limit: int = 100
+    columns: Optional[List[str]] = None
+    sortBy: Optional[str] = None
+    descending: bool = False
+    filters: List[RowFilter] = []
+    format: str = 'json'
+
+
+@router.post("/rows")
+async def get_rows(request: RowsRequest):
+    """One page of the dataset — read from the row groups that hold it, not the whole file"""
+    return await run_in_worker('rows', _get_rows, request)
+
+
+def _get_rows(request: RowsRequest) -> Response:
+    """Blocking part of /rows — runs in the worker pool"""
+    try:
+        if not os.path.exists(request.filepath):
+            raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
+
+        ext = os.path.splitext(request.filepath)[1].lower()
+        if ext not in SUPPORTED_EXTENSIONS:
+            raise HTTPException(status_code=400, detail="Unsupported file type. Only CSV and Excel are allowed.")
+
+        if request.format not in ROW_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unknown format '{request.format}'. Use one of: {', '.join(ROW_FORMATS)}")
+        if request.offset < 0:
+            raise HTTPException(status_code=400, detail="offset must be >= 0")
+        if not 1 <= request.limit <= ROWS_MAX_LIMIT:
+            raise HTTPException(status_code=400, detail=f"limit must be between 1 and {ROWS_MAX_LIMIT}")
+        bad_ops = [f.op for f in request.filters if f.op not in FILTER_OPS]
+        if bad_ops:
+            raise HTTPException(status_code=400, detail=f"Unknown filter op {bad_ops[0]!r}. Use one of: {', '.join(FILTER_OPS)}")
+
+        try:
+            page = read_page(
+                request.filepath,
+                offset=request.offset,
+                limit=request.limit,
+                columns=request.columns,
+                filters=[f.model_dump() for f in request.filters],
+                sort_by=request.sortBy,
+                descending=request.descending,
+            )
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=str(e.args[0]))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        frame = page['frame']
+        headers = {
+            'X-Total-Rows':   str(page['total_rows']),
+            'X-Matched-Rows': str(page['matched_rows']),
+            'X-Offset':       str(request.offset),
+        }
+        media_type = ROW_FORMATS[request.format]
+
+        if request.format == 'arrow':
+            return Response(content=_arrow_stream(frame), media_type=media_type, headers=headers)
+
+        if request.format == 'ndjson':
+            body = _records_json(frame, lines=True) if len(frame) else ''
+            return Response(content=body, media_type=media_type, headers=headers)
+
+        # Rows are serialized by pandas in one go; only the small envelope goes through json
+        envelope = json.dumps({
+            'offset':       request.offset,
+            'limit':        request.limit,
+            'total_rows':   page['total_rows'],
+            'matched_rows': page['matched_rows'],
+            'columns':      page['columns'],
+        })
+        body = f'{envelope[:-1]}, "rows": {_records_json(frame)}}}'
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _records_json(frame: pd.DataFrame, lines: bool = False) -> str:
+    # double_precision=15 — pandas' default of 10 digits would round values on the way out
+    return frame.to_json(orient='records', lines=lines, date_format='iso', double_precision=15, default_handler=str)
+
+
+def _arrow_stream(frame: pd.DataFrame) -> bytes:
+    import pyarrow as pa
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
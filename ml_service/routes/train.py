@@ -1,12 +1,28 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List
-import pandas as pd
+from typing import List, Dict, Any, Optional
 import os
 
-from utils.models import train_model
+from utils.compact import COMPACT_LOAD
+from utils.compare import compare_models, DEFAULT_FOLDS, MAX_FOLDS, PARAM_GRIDS
+from utils.jobs import job_store
+from utils.incremental import STREAMING_MODEL_TYPES, train_streaming
+from utils.models import prepare_features, train_model, ProgressCallback
+from utils.registry import get_model_meta, save_model
+from utils.result_cache import result_cache
+from utils.schema import feature_schema
+from utils.snapshots import dataset_identity
+from utils.dataset_cache import dataset_columns, load_dataset, source_path, SUPPORTED_EXTENSIONS
+from utils.metrics import TimedRoute
+from utils.storage import iter_dataset_chunks, DEFAULT_CHUNK_ROWS
+from utils.workers import run_in_worker
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+TRAINING_MODES = ('auto', 'memory', 'streaming')
+
+# In 'auto' mode, linear-family models train out-of-core on files above this size
+TRAIN_STREAMING_THRESHOLD_MB = float(os.environ.get('ML_TRAIN_STREAMING_THRESHOLD_MB', '1024'))
 
 
 class TrainRequest(BaseModel):
@@ -14,50 +30,140 @@ class TrainRequest(BaseModel):
     modelType: str
     features: List[str]
     target: str
+    trainingMode: str = 'auto'
+    chunkSize: int = DEFAULT_CHUNK_ROWS
+    compact: bool = COMPACT_LOAD
+
+
+class CompareRequest(BaseModel):
+    filepath: str
+    features: List[str]
+    target: str
+    models: Optional[List[str]] = None
+    folds: int = DEFAULT_FOLDS
+    compact: bool = COMPACT_LOAD
+
+
+def _validate_dataset_request(filepath: str, features: List[str], target: str) -> None:
+    if not features or not target:
+        raise HTTPException(status_code=400, detail="Features and target must be specified")
+
+    if target in features:
+        raise HTTPException(status_code=400, detail="Target variable cannot be in features")
+
+    if not os.path.exists(filepath):
+        raise HTTPException(status_code=404, detail=f"File not found: {filepath}")
+
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Only CSV and Excel are allowed.")
+
+
+def _check_columns(filepath: str, required_cols: List[str]) -> None:
+    # Read from the schema, not the data
+    available_cols = set(dataset_columns(filepath))
+    missing_cols = [col for col in required_cols if col not in available_cols]
+    if missing_cols:
+        raise HTTPException(status_code=400, detail=f"Missing columns in dataset: {missing_cols}")
+
+
+def validate_train_request(request: TrainRequest) -> None:
+    """Cheap request checks shared by /train and /train/jobs"""
+    _validate_dataset_request(request.filepath, request.features, request.target)
+
+    if request.trainingMode not in TRAINING_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown training mode: {request.trainingMode}")
+
+    if request.trainingMode == 'streaming' and request.modelType not in STREAMING_MODEL_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Streaming training supports {', '.join(STREAMING_MODEL_TYPES)} only"
+        )
+
+    if request.chunkSize < 1:
+        raise HTTPException(status_code=400, detail="chunkSize must be positive")
+
+
+def use_streaming(request: TrainRequest) -> bool:
+    """Whether this request trains out-of-core"""
+    if request.trainingMode != 'auto':
+        return request.trainingMode == 'streaming'
+    if request.modelType not in STREAMING_MODEL_TYPES:
+        return False
+    size_mb = os.path.getsize(source_path(request.filepath)) / 1024 / 1024
+    return size_mb > TRAIN_STREAMING_THRESHOLD_MB
 
 
 @router.post("/train")
 async def train(request: TrainRequest):
-    """Train an ML model — reads file directly from disk"""
+    """Train an ML model — reads the dataset through the shared cache"""
+    return await run_in_worker('train', _train, request)
+
+
+@router.post("/train/jobs", status_code=202)
+async def submit_train_job(request: TrainRequest):
+    """Start training in the background and return a job ID to poll at GET /jobs/{id}"""
+    validate_train_request(request)
+    job = job_store.submit('train', lambda job: _train(request, progress=job.report))
+    return {
+        'jobId':     job.id,
+        'state':     job.state,
+        'statusUrl': f"/jobs/{job.id}",
+    }
+
+
+def _train(request: TrainRequest, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Blocking part of /train — runs in the worker pool or as a background job"""
     try:
-        # Validate inputs
-        if not request.features or not request.target:
-            raise HTTPException(status_code=400, detail="Features and target must be specified")
-
-        if request.target in request.features:
-            raise HTTPException(status_code=400, detail="Target variable cannot be in features")
-
-        # Read file from disk
-        if not os.path.exists(request.filepath):
-            raise HTTPException(status_code=404, detail=f"File not found: {request.filepath}")
-
-        ext = os.path.splitext(request.filepath)[1].lower()
-        if ext == '.csv':
-            df = pd.read_csv(request.filepath)
-        elif ext in ('.xlsx', '.xls'):
-            df = pd.read_excel(request.filepath)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type. Only CSV and Excel are allowed.")
-
-        # Warn user if SVM is chosen on large dataset — it will be very slow
-        if request.modelType == 'svm' and len(df) > 2000:
-            raise HTTPException(
-                status_code=400,
-                detail=(
-                    f"SVM is too slow for datasets with {len(df)} rows (limit: 2,000). "
-                    "Please use Random Forest instead — it handles large datasets much better."
-                )
-            )
+        validate_train_request(request)
 
         # Verify all required columns exist
         required_cols = request.features + [request.target]
-        missing_cols = [col for col in required_cols if col not in df.columns]
-        if missing_cols:
-            raise HTTPException(status_code=400, detail=f"Missing columns in dataset: {missing_cols}")
+        _check_columns(request.filepath, required_cols)
+        streaming = use_streaming(request)
+
+        # Same content, columns and model trained before — reuse its result and stored model
+        identity = dataset_identity(request.filepath)
+        memo_key = [
+            'train', identity, request.modelType, request.features, request.target,
+            streaming, request.chunkSize if streaming else None,
+            # Compact dtypes only apply in memory — like /analyze, they're part of the key
+            request.compact and not streaming,
+        ]
+        if identity is not None:
+            cached = result_cache.get(memo_key)
+            if cached is not None and get_model_meta(cached['model_id']) is not None:
+                return {**cached, 'cached': True}
+
+        if streaming:
+            # Out-of-core — each pass re-reads the projected columns chunk by chunk
+            result, pipeline = train_streaming(
+                lambda: iter_dataset_chunks(request.filepath, columns=required_cols, chunksize=request.chunkSize),
+                request.modelType, request.features, request.target,
+                progress=progress, return_pipeline=True
+            )
+        else:
+            # Column projection — only features + target are loaded from the working copy
+            df = load_dataset(request.filepath, columns=required_cols, compact=request.compact)
+
+            # Column encoders are inferred once per dataset version and reused across calls
+            schema = feature_schema(request.filepath, df, required_cols)
+
+            # Train model
+            result, pipeline = train_model(
+                df, request.modelType, request.features, request.target,
+                progress=progress, return_pipeline=True, schema=schema
+            )
+            result['mode'] = 'memory'
 
-        # Train model
-        result = train_model(df, request.modelType, request.features, request.target)
+        # Persist encoders, scaler and estimator so /predict can score new rows
+        result['model_id'] = save_model(pipeline, {
+            'filepath': request.filepath,
+            'metrics':  result['metrics'],
+        })
 
+        if identity is not None:
+            result_cache.put(memo_key, result)
         return result
 
     except HTTPException:
@@ -66,4 +172,65 @@ async def train(request: TrainRequest):
         # Catch data validation errors from prepare_features
         raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def validate_compare_request(request: CompareRequest) -> None:
+    """Cheap request checks shared by /train/compare and /train/compare/jobs"""
+    _validate_dataset_request(request.filepath, request.features, request.target)
+
+    unknown = [m for m in (request.models or []) if m not in PARAM_GRIDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown model types: {unknown}")
+
+    if not 2 <= request.folds <= MAX_FOLDS:
+        raise HTTPException(status_code=400, detail=f"folds must be between 2 and {MAX_FOLDS}")
+
+
+@router.post("/train/compare")
+async def compare(request: CompareRequest):
+    """Cross-validate every model type and grid point on one prepared copy of the data"""
+    return await run_in_worker('train', _compare, request)
+
+
+@router.post("/train/compare/jobs", status_code=202)
+async def submit_compare_job(request: CompareRequest):
+    """Run /train/compare in the background — poll GET /jobs/{id}"""
+    validate_compare_request(request)
+    job = job_store.submit('compare', lambda job: _compare(request, progress=job.report))
+    return {
+        'jobId':     job.id,
+        'state':     job.state,
+        'statusUrl': f"/jobs/{job.id}",
+    }
+
+
+def _compare(request: CompareRequest, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Blocking part of /train/compare — features are prepared once for every candidate"""
+    try:
+        validate_compare_request(request)
+
+        required_cols = request.features + [request.target]
+        _check_columns(request.filepath, required_cols)
+
+        if progress:
+            progress(0, 1, 'preparing')
+
+        df = load_dataset(request.filepath, columns=required_cols, compact=request.compact)
+        schema = feature_schema(request.filepath, df, required_cols)
+        X, y = prepare_features(df, request.features, request.target, schema=schema)
+
+        if len(X) < request.folds * 2:
+            raise ValueError(f"Not enough valid rows ({len(X)}) for {request.folds}-fold cross-validation")
+
+        result = compare_models(X, y, request.models or list(PARAM_GRIDS), request.folds, progress)
+        result['features'] = request.features
+        result['target'] = request.target
+        return result
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
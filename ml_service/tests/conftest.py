@@ -0,0 +1,37 @@
+"""Shared fixtures — every test runs the service in its own working directory"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Modules import each other as top-level packages (utils.*, routes.*), as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """uploads/, models/ and cache/ are relative to the working directory — a fresh one per test"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'uploads').mkdir()
+
+    from utils.dataset_cache import dataset_cache
+    dataset_cache.clear()
+    return tmp_path
+
+
+@pytest.fixture
+def client(workdir):
+    from fastapi.testclient import TestClient
+    from main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def write_csv(workdir):
+    """Write a frame as an upload and return its filepath"""
+    def write(name: str, df: pd.DataFrame) -> str:
+        path = os.path.join('uploads', name)
+        df.to_csv(path, index=False)
+        return path
+    return write
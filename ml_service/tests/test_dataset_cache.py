@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+import utils.dataset_cache
+from utils.dataset_cache import LOAD_LOCK_STRIPES, DatasetCache, dataset_columns
+from utils.storage import write_working_copy
+
+
+def test_rewritten_file_is_reloaded(write_csv):
+    cache = DatasetCache(10 ** 9)
+    path = write_csv('data.csv', pd.DataFrame({'a': [1, 2]}))
+    assert cache.get(path)['a'].tolist() == [1, 2]
+    assert cache.get(path)['a'].tolist() == [1, 2]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The first read converted the upload — later writes replace the working copy
+    write_working_copy(path, pd.DataFrame({'a': [10, 20, 30]}))
+    assert cache.get(path)['a'].tolist() == [10, 20, 30]
+    assert cache.invalidations == 1
+
+
+def test_bump_version_invalidates(write_csv):
+    cache = DatasetCache(10 ** 9)
+    path = write_csv('data.csv', pd.DataFrame({'a': [1, 2]}))
+    first = cache.get(path)
+    cache.bump_version(path)
+    assert cache.peek(path) is None
+    assert cache.get(path) is not first
+
+
+def test_concurrent_misses_parse_once(write_csv):
+    cache = DatasetCache(10 ** 9)
+    path = write_csv('data.csv', pd.DataFrame({'a': range(1000)}))
+    threads = [threading.Thread(target=cache.get, args=(path,)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.misses == 1
+
+
+def test_hit_does_not_wait_for_another_files_parse(write_csv, monkeypatch):
+    cache = DatasetCache(10 ** 9)
+    paths = [write_csv(f'f{i}.csv', pd.DataFrame({'a': [i]})) for i in range(4 * LOAD_LOCK_STRIPES)]
+    stripes = {}
+    for path in paths:
+        stripes.setdefault(hash(os.path.abspath(path)) % LOAD_LOCK_STRIPES, []).append(path)
+    slow, cached = next(group for group in stripes.values() if len(group) > 1)[:2]
+    cache.get(cached)
+
+    read_dataset = utils.dataset_cache.read_dataset
+
+    def slow_read(key):
+        time.sleep(1.0)
+        return read_dataset(key)
+
+    monkeypatch.setattr(utils.dataset_cache, 'read_dataset', slow_read)
+    loader = threading.Thread(target=cache.get, args=(slow,))
+    loader.start()
+    time.sleep(0.1)
+
+    start = time.perf_counter()
+    cache.get(cached)
+    assert time.perf_counter() - start < 0.5
+    loader.join()
+
+
+def test_dataset_columns_without_parsing(write_csv):
+    path = write_csv('data.csv', pd.DataFrame({'a': [1], 'b': [2]}))
+    assert dataset_columns(path) == ['a', 'b']
+    assert utils.dataset_cache.dataset_cache.peek(path) is None
@@ -0,0 +1,95 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.storage import materialize_raw, save_dataset, write_working_copy
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({'a': [1.5, np.nan, 3.0, 3.0], 'b': ['x', 'y', np.nan, 'z']})
+
+
+def _download(client, path, **params):
+    return client.get('/download', params={'filepath': path, 'compression': 'none', **params})
+
+
+def test_download_reflects_cleaning(client, write_csv, frame):
+    path = write_csv('data.csv', frame)
+    client.post('/clean', json={'filepath': path, 'cleaningMethod': 'drop_missing'})
+
+    response = _download(client, path)
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(response.content)), frame.dropna().reset_index(drop=True))
+
+
+def test_download_xlsx(client, write_csv, frame):
+    path = write_csv('data.csv', frame)
+
+    response = _download(client, path, format='xlsx')
+    assert response.status_code == 200
+    pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(response.content)), frame)
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'xlsx'])
+def test_zero_row_export_keeps_header(client, write_csv, fmt):
+    path = write_csv('data.csv', pd.DataFrame({'a': [1.0], 'b': ['x']}))
+    # What drop_missing leaves behind when it removes every row
+    save_dataset(path, pd.DataFrame({'a': pd.Series([], dtype=float), 'b': pd.Series([], dtype=object)}))
+
+    response = _download(client, path, format=fmt)
+    assert response.status_code == 200
+    if fmt == 'csv':
+        assert response.content == b'a,b\n'
+    else:
+        assert list(pd.read_excel(io.BytesIO(response.content)).columns) == ['a', 'b']
+
+
+def test_materialize_zero_rows_keeps_header(client, write_csv, frame):
+    path = write_csv('data.csv', frame)
+    save_dataset(path, frame.iloc[0:0])
+
+    materialize_raw(path)
+    with open(path) as f:
+        assert f.read() == 'a,b\n'
+
+
+def test_byte_range(client, write_csv, frame):
+    path = write_csv('data.csv', frame)
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    response = _download(client, path)
+    etag = response.headers['etag']
+    assert response.headers['accept-ranges'] == 'bytes'
+
+    response = client.get('/download', params={'filepath': path}, headers={'Range': 'bytes=2-9'})
+    assert response.status_code == 206
+    assert response.headers['content-range'] == f"bytes 2-9/{len(raw)}"
+    assert response.content == raw[2:10]
+
+    # A stale validator gets the whole file instead
+    response = client.get('/download', params={'filepath': path}, headers={'Range': 'bytes=2-9', 'If-Range': '"old"'})
+    assert response.status_code == 200
+    assert etag == response.headers['etag']
+
+    response = client.get('/download', params={'filepath': path}, headers={'Range': f"bytes={len(raw) + 5}-"})
+    assert response.status_code == 416
+
+
+def test_xls_is_converted_not_relabelled(client, workdir, frame):
+    path = os.path.join('uploads', 'legacy.xls')
+    with open(path, 'wb') as f:
+        f.write(b'\xd0\xcf\x11\xe0 legacy workbook bytes')
+    write_working_copy(path, frame)
+
+    response = _download(client, path, format='xlsx')
+    assert response.status_code == 200
+    assert response.headers['accept-ranges'] == 'none'
+    # A real xlsx (zip) generated from the data, not the .xls bytes under an .xlsx name
+    assert response.content[:2] == b'PK'
+    pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(response.content)), frame)
@@ -0,0 +1,86 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import routes.predict
+import utils.registry
+
+
+def _training_frame(seed: int = 0, n: int = 300) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    group = rng.choice(['north', 'south', 'east'], n)
+    y = 3 * x + rng.normal(scale=0.1, size=n)
+    return pd.DataFrame({'x': x, 'group': group, 'y': y})
+
+
+def _train(client, path, model_type='linear_regression'):
+    response = client.post('/train', json={
+        'filepath': path, 'modelType': model_type, 'features': ['x', 'group'], 'target': 'y',
+    })
+    assert response.status_code == 200, response.text
+    return response.json()['model_id']
+
+
+def test_predict_round_trip(client, write_csv):
+    df = _training_frame()
+    path = write_csv('train.csv', df)
+    model_id = _train(client, path)
+
+    rows = df[['x', 'group']].head(20).to_dict(orient='records')
+    by_rows = client.post('/predict', json={'modelId': model_id, 'rows': rows})
+    by_file = client.post('/predict/file', json={'modelId': model_id, 'filepath': path})
+    assert by_rows.status_code == 200 and by_file.status_code == 200
+
+    assert by_file.json()['rows'] == len(df)
+    assert by_file.json()['scored'] == len(df)
+    np.testing.assert_allclose(by_rows.json()['predictions'], by_file.json()['predictions'][:20])
+    # The model learned the relationship
+    np.testing.assert_allclose(by_rows.json()['predictions'], df['y'].head(20), atol=0.5)
+
+
+def test_predict_unseen_category_is_null(client, write_csv):
+    model_id = _train(client, write_csv('train.csv', _training_frame()))
+
+    response = client.post('/predict', json={'modelId': model_id, 'rows': [
+        {'x': 0.5, 'group': 'north'},
+        {'x': 0.5, 'group': 'west'},
+        {'x': 'n/a', 'group': 'south'},
+    ]})
+    predictions = response.json()['predictions']
+    assert predictions[0] is not None
+    assert predictions[1:] == [None, None]
+
+
+def test_predict_errors(client, write_csv, monkeypatch):
+    model_id = _train(client, write_csv('train.csv', _training_frame()))
+
+    assert client.post('/predict', json={'modelId': 'f' * 32, 'rows': [{'x': 1}]}).status_code == 404
+    assert client.post('/predict', json={'modelId': model_id, 'rows': [{'x': 1}]}).status_code == 400
+
+    monkeypatch.setattr(routes.predict, 'PREDICT_MAX_ROWS', 2)
+    rows = [{'x': 1.0, 'group': 'north'}] * 3
+    assert client.post('/predict', json={'modelId': model_id, 'rows': rows}).status_code == 413
+
+
+def test_model_store_evicts_least_recently_used(client, write_csv, monkeypatch):
+    ids = []
+    for seed in range(3):
+        # Different content each time, so /train doesn't answer from its memo
+        ids.append(_train(client, write_csv(f'train{seed}.csv', _training_frame(seed))))
+        time.sleep(0.05)
+
+    model_bytes = sum(os.path.getsize(os.path.join('models', ids[0], f)) for f in os.listdir(os.path.join('models', ids[0])))
+    monkeypatch.setattr(utils.registry, 'MODEL_STORE_MAX_MB', 3.5 * model_bytes / 1024 / 1024)
+
+    # Using the oldest model makes the second one the least recently used
+    assert client.post('/predict', json={'modelId': ids[0], 'rows': [{'x': 1.0, 'group': 'north'}]}).status_code == 200
+    time.sleep(0.05)
+    newest = _train(client, write_csv('train3.csv', _training_frame(3)))
+
+    assert set(os.listdir('models')) == {ids[0], ids[2], newest}
+    assert client.get(f'/models/{ids[1]}').status_code == 404
+    assert client.post('/predict', json={'modelId': ids[1], 'rows': [{'x': 1.0, 'group': 'north'}]}).status_code == 404
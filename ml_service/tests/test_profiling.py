@@ -0,0 +1,85 @@
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_processing import (
+    analyze_distribution,
+    analyze_missing_values,
+    detect_outliers,
+    get_data_summary,
+    profile_dataset,
+)
+from utils.storage import write_working_copy
+
+
+def _individual(df: pd.DataFrame):
+    return {
+        'summary':         get_data_summary(df),
+        'missing_values':  analyze_missing_values(df),
+        'outliers_iqr':    detect_outliers(df, 'iqr'),
+        'outliers_zscore': detect_outliers(df, 'zscore'),
+        'distributions':   analyze_distribution(df),
+    }
+
+
+@pytest.fixture
+def mixed_frame():
+    rng = np.random.default_rng(7)
+    n = 5000
+    df = pd.DataFrame({
+        'skewed':   rng.lognormal(6, 1, n),
+        'normal':   rng.normal(100, 15, n),
+        'ints':     rng.integers(0, 50, n),
+        'narrow':   rng.normal(size=n).astype(np.float32),
+        'constant': 3.0,
+        'text':     rng.choice(['a', 'b', 'c'], n),
+    })
+    df.loc[rng.random(n) < 0.1, 'skewed'] = np.nan
+    df.loc[rng.random(n) < 0.02, 'normal'] = np.nan
+    return df
+
+
+def test_profile_matches_individual_functions(mixed_frame):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        expected = _individual(mixed_frame)
+        profile = profile_dataset(mixed_frame)
+
+    # Same JSON, digit for digit
+    assert json.dumps(profile, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+
+def test_profile_zero_rows():
+    df = pd.DataFrame({'a': pd.Series([], dtype=float), 'b': pd.Series([], dtype='int64'),
+                       'c': pd.Series([], dtype=object)})
+    profile = profile_dataset(df)
+
+    assert profile['distributions'] == {}
+    assert profile['outliers_iqr'] == {'method': 'iqr', 'columns': {}, 'total_outliers': 0}
+    assert profile['outliers_zscore'] == {'method': 'zscore', 'columns': {}, 'total_outliers': 0}
+    assert profile['summary']['rows'] == 0
+    assert profile['summary']['duplicate_percentage'] == 0.0
+
+
+@pytest.mark.parametrize('analysis_type', ['full', 'streaming', 'quick'])
+def test_analyze_dataset_with_no_rows(client, write_csv, analysis_type):
+    path = write_csv('empty.csv', pd.DataFrame({'a': [1.0], 'b': ['x']}))
+    # What drop_missing leaves behind: a working copy with the float dtypes but no rows
+    write_working_copy(path, pd.DataFrame({'a': pd.Series([], dtype=float), 'b': pd.Series([], dtype=object)}))
+
+    response = client.post('/analyze', json={'filepath': path, 'analysisType': analysis_type})
+
+    assert response.status_code == 200
+    assert response.json()['distributions'] == {}
+    assert response.json()['summary']['rows'] == 0
+
+
+def test_analyze_rejects_non_positive_chunk_size(client, write_csv):
+    path = write_csv('data.csv', pd.DataFrame({'a': [1, 2, 3]}))
+
+    response = client.post('/analyze', json={'filepath': path, 'analysisType': 'streaming', 'chunkSize': 0})
+
+    assert response.status_code == 400
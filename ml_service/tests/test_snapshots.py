@@ -0,0 +1,92 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from routes.clean import CleanStep, _run_steps
+from utils.dataset_cache import load_dataset
+from utils.snapshots import load_history, versions_dir
+
+
+@pytest.fixture
+def dataset(write_csv):
+    return write_csv('data.csv', pd.DataFrame({
+        'a': [1.0, 2.0, np.nan, 4.0, 4.0, 6.0],
+        'b': ['x', 'y', 'z', 'w', 'w', 'v'],
+    }))
+
+
+def _clean(client, path, method):
+    response = client.post('/clean', json={'filepath': path, 'cleaningMethod': method})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_clean_records_versions(client, dataset):
+    assert _clean(client, dataset, 'drop_duplicates')['version'] == 1
+    assert _clean(client, dataset, 'fill_mean')['version'] == 2
+
+    history = client.get('/clean/history', params={'filepath': dataset}).json()
+    assert history['currentVersion'] == 2
+    assert [v['label'] for v in history['versions']] == ['original', 'drop_duplicates', 'fill_mean']
+
+
+def test_undo_restores_previous_version(client, dataset):
+    _clean(client, dataset, 'drop_duplicates')
+    _clean(client, dataset, 'fill_mean')
+
+    response = client.post('/clean/undo', json={'filepath': dataset})
+    assert response.status_code == 200
+    assert response.json()['restoredVersion'] == 1
+
+    # Duplicates gone, gap back
+    df = load_dataset(dataset)
+    assert len(df) == 5
+    assert df['a'].isna().sum() == 1
+
+    response = client.post('/clean/undo', json={'filepath': dataset, 'version': 0})
+    assert response.json()['rows'] == 6
+    assert len(load_dataset(dataset)) == 6
+
+
+def test_clean_after_undo_discards_redo_versions(client, dataset):
+    _clean(client, dataset, 'drop_duplicates')
+    _clean(client, dataset, 'fill_mean')
+    client.post('/clean/undo', json={'filepath': dataset})
+
+    assert _clean(client, dataset, 'fill_median')['version'] == 2
+    history = load_history(dataset)
+    assert [v['label'] for v in history['versions']] == ['original', 'drop_duplicates', 'fill_median']
+    assert sorted(os.listdir(versions_dir(dataset))) == sorted(
+        ['history.json'] + [v['file'] for v in history['versions']]
+    )
+
+
+def test_undo_without_history(client, dataset):
+    response = client.post('/clean/undo', json={'filepath': dataset})
+    assert response.status_code == 400
+
+
+def test_concurrent_cleans_keep_history_consistent(dataset):
+    errors = []
+
+    def clean(method):
+        try:
+            _run_steps(dataset, [CleanStep(method=method)])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=clean, args=(m,)) for m in ['fill_mean', 'drop_duplicates'] * 4]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    history = load_history(dataset)
+    assert [v['version'] for v in history['versions']] == list(range(9))
+    assert history['current'] == 8
+    for entry in history['versions']:
+        assert os.path.exists(os.path.join(versions_dir(dataset), entry['file']))
@@ -0,0 +1,133 @@
+"""Cleaning methods shared by /clean and /clean/pipeline"""
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Tuple
+
+from utils.imputation import KNN_NEIGHBORS, fill_group_median, knn_impute
+from utils.multivariate import FLAG_COLUMN, OUTLIER_CONTAMINATION, score_frame
+
+CLEANING_METHODS = (
+    'drop_missing',
+    'fill_mean',
+    'fill_median',
+    'fill_group_median',
+    'fill_knn',
+    'fill_mode',
+    'forward_fill',
+    'drop_duplicates',
+    'drop_outliers',
+    'flag_outliers',
+    'interpolate',
+)
+
+
+def apply_cleaning_method(df: pd.DataFrame, method: str,
+                          columns: Optional[List[str]] = None,
+                          group_by: Optional[List[str]] = None,
+                          neighbors: int = KNN_NEIGHBORS,
+                          outlier_method: str = 'isolation_forest',
+                          contamination: float = OUTLIER_CONTAMINATION) -> Tuple[pd.DataFrame, int, str, List[str]]:
+    """Apply one cleaning method and return (cleaned frame, removed rows, summary, touched).
+
+    ``touched`` lists the columns whose values may have changed; drop methods
+    only remove whole rows and leave it empty. Fill methods assign columns on
+    ``df`` itself, so pass a frame you own — a pipeline copies the cached
+    dataset once and threads it through every step.
+
+    ``group_by`` is required by ``fill_group_median``; ``neighbors`` is the k
+    of ``fill_knn``. ``drop_outliers``/``flag_outliers`` score rows with
+    ``outlier_method`` on ``columns`` (default: every numeric column) and
+    treat the ``contamination`` share as outliers.
+    """
+    original_rows = len(df)
+    target_cols   = columns if columns else None
+    touched: List[str] = []
+
+    if method == 'drop_missing':
+        df           = df.dropna(subset=target_cols) if target_cols else df.dropna()
+        removed_rows = original_rows - len(df)
+        summary      = f"Dropped {removed_rows} rows with missing values"
+
+    elif method == 'fill_mean':
+        cols = target_cols or list(df.select_dtypes(include=[np.number]).columns)
+        for col in cols:
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].hasnans:
+                df[col] = df[col].fillna(df[col].mean())
+                touched.append(col)
+        removed_rows = 0
+        summary = "Filled missing values with mean"
+
+    elif method == 'fill_median':
+        cols = target_cols or list(df.select_dtypes(include=[np.number]).columns)
+        for col in cols:
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].hasnans:
+                df[col] = df[col].fillna(df[col].median())
+                touched.append(col)
+        removed_rows = 0
+        summary = "Filled missing values with median"
+
+    elif method == 'fill_group_median':
+        if not group_by:
+            raise ValueError("fill_group_median requires groupBy columns")
+        touched      = fill_group_median(df, group_by, target_cols)
+        removed_rows = 0
+        summary      = f"Filled missing values with the median per {', '.join(group_by)}"
+
+    elif method == 'fill_knn':
+        touched      = knn_impute(df, target_cols, k=neighbors)
+        removed_rows = 0
+        summary      = f"Filled missing values from the {neighbors} nearest complete rows"
+
+    elif method == 'fill_mode':
+        cols = target_cols or list(df.columns)
+        for col in cols:
+            if col in df.columns and df[col].isnull().any():
+                mode_val = df[col].mode()
+                if len(mode_val) > 0:
+                    df[col] = df[col].fillna(mode_val[0])
+                    touched.append(col)
+        removed_rows = 0
+        summary = "Filled missing values with mode"
+
+    elif method == 'forward_fill':
+        cols = target_cols or list(df.columns)
+        for col in cols:
+            if col in df.columns and df[col].isnull().any():
+                df[col] = df[col].ffill().bfill()
+                touched.append(col)
+        removed_rows = 0
+        summary = "Applied forward/backward fill"
+
+    elif method == 'drop_duplicates':
+        df           = df.drop_duplicates()
+        removed_rows = original_rows - len(df)
+        summary      = f"Removed {removed_rows} duplicate rows"
+
+    elif method in ('drop_outliers', 'flag_outliers'):
+        # A previous run's boolean flag is never a feature
+        features = [col for col in target_cols if col != FLAG_COLUMN] if target_cols else None
+        scores, scorer = score_frame(df, outlier_method, features or None, contamination)
+        flagged = scores > scorer.threshold
+        if method == 'drop_outliers':
+            df           = df[~flagged]
+            removed_rows = original_rows - len(df)
+            summary      = f"Removed {removed_rows} outlier rows ({outlier_method})"
+        else:
+            df[FLAG_COLUMN] = flagged
+            touched         = [FLAG_COLUMN]
+            removed_rows    = 0
+            summary         = f"Flagged {int(flagged.sum())} outlier rows in '{FLAG_COLUMN}' ({outlier_method})"
+
+    elif method == 'interpolate':
+        cols = target_cols or list(df.select_dtypes(include=[np.number]).columns)
+        for col in cols:
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].hasnans:
+                df[col] = df[col].interpolate(method='linear')
+                touched.append(col)
+        removed_rows = 0
+        summary = "Interpolated missing values"
+
+    else:
+        raise ValueError(f"Unknown cleaning method: {method}")
+
+    return df, removed_rows, summary, touched
@@ -0,0 +1,139 @@
+"""Compact in-memory dtypes for parsed datasets.
+
+Parsing yields int64/float64 numbers and Python-object strings.
+``compact_frame`` converts every column to the narrowest dtype that still
+holds each of its values:
+
+- integers  — the smallest (unsigned) width that holds the column's min and max
+- floats    — float32 when every value round-trips exactly; columns with gaps
+              stay float64 so values filled in by cleaning aren't rounded
+- strings   — ``category`` when few values are distinct, Arrow-backed
+              ``string[pyarrow]`` otherwise
+
+Object columns that aren't purely strings (mixed numbers and text, bools)
+are left alone. ``expand_frame`` converts back to the parse dtypes, so
+datasets are persisted the same way whichever mode loaded them.
+"""
+import os
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+from utils.storage import HAS_PYARROW
+
+# Default for requests that don't set ``compact`` themselves
+COMPACT_LOAD = os.environ.get('ML_COMPACT_LOAD', '0') == '1'
+
+# String columns whose distinct values are at most this share of their non-null values become category
+CATEGORY_MAX_RATIO = float(os.environ.get('ML_CATEGORY_MAX_RATIO', '0.5'))
+
+_SIGNED = (np.int8, np.int16, np.int32)
+_UNSIGNED = (np.uint8, np.uint16, np.uint32)
+
+
+def _compact_integers(values: pd.Series) -> pd.Series:
+    if len(values) == 0:
+        return values
+    low, high = values.min(), values.max()
+    for candidate in (_UNSIGNED if low >= 0 else _SIGNED):
+        limits = np.iinfo(candidate)
+        if limits.min <= low and high <= limits.max:
+            return values.astype(candidate)
+    return values
+
+
+def _compact_floats(values: pd.Series) -> pd.Series:
+    if values.hasnans:
+        return values
+    wide = values.to_numpy()
+    narrow = wide.astype(np.float32)
+    if np.array_equal(narrow, wide, equal_nan=True):
+        return pd.Series(narrow, index=values.index, name=values.name)
+    return values
+
+
+def _compact_strings(values: pd.Series) -> pd.Series:
+    if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        return values
+
+    codes, uniques = pd.factorize(values)
+    non_null = int((codes >= 0).sum())
+    if len(uniques) <= CATEGORY_MAX_RATIO * max(non_null, 1):
+        # Reuse the codes — no second pass over the strings
+        categorical = pd.Categorical.from_codes(codes, categories=uniques)
+        return pd.Series(categorical, index=values.index, name=values.name)
+    if HAS_PYARROW:
+        return values.astype('string[pyarrow]')
+    return values
+
+
+def compact_column(values: pd.Series) -> pd.Series:
+    """``values`` in the narrowest dtype that keeps every value"""
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return values
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return _compact_integers(values)
+    if dtype == np.float64:
+        return _compact_floats(values)
+    if dtype == object:
+        return _compact_strings(values)
+    return values
+
+
+def expand_column(values: pd.Series) -> pd.Series:
+    """``values`` back in the dtype a CSV parse would have produced"""
+    dtype = values.dtype
+    if isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
+        expanded = values.astype(object)
+        # Parsed text columns hold NaN for missing values, not pd.NA
+        return expanded.where(values.notna(), np.nan)
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype) and dtype != np.int64:
+        return values.astype(np.int64)
+    if dtype == np.float32:
+        return values.astype(np.float64)
+    return values
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """A new frame with every column compacted — ``df`` itself is left untouched"""
+    return pd.DataFrame({col: compact_column(df[col]) for col in df.columns}, index=df.index)
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Undo ``compact_frame`` — returns ``df`` itself when nothing needs expanding"""
+    expanded = {}
+    changed = False
+    for col in df.columns:
+        values = df[col]
+        expanded[col] = expand_column(values)
+        changed = changed or expanded[col] is not values
+    return pd.DataFrame(expanded, index=df.index) if changed else df
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, Any]:
+    """Deep memory of ``df`` now and as it would be with parse dtypes.
+
+    The parse-dtype size is measured one expanded column at a time, so it never
+    needs a second copy of the whole frame.
+    """
+    before = after = int(df.index.memory_usage(deep=True))
+    compacted: Dict[str, str] = {}
+    for col in df.columns:
+        values = df[col]
+        size = int(values.memory_usage(deep=True, index=False))
+        expanded = expand_column(values)
+        after += size
+        if expanded is values:
+            before += size
+            continue
+        before += int(expanded.memory_usage(deep=True, index=False))
+        compacted[col] = f"{expanded.dtype} -> {values.dtype}"
+
+    return {
+        'before_mb':         round(before / 1024 / 1024, 3),
+        'after_mb':          round(after / 1024 / 1024, 3),
+        'saved_percentage':  round((1 - after / before) * 100, 1) if before else 0.0,
+        'compacted_columns': compacted,
+    }
@@ -0,0 +1,160 @@
+"""Cross-validated comparison of model types and small hyperparameter grids.
+
+Features are prepared once; every (candidate, fold) pair is then an
+independent task run on a loky process pool. ``X``/``y`` are written to a
+temporary .npy file and opened as read-only memory maps, which joblib passes
+to the workers by filename — every process shares one copy in the page cache.
+"""
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from utils.metrics import span
+from utils.models import ProgressCallback, build_svm, predict_in_batches, stratified_subsample, svm_training_plan
+from utils.workers import cpu_budget
+
+# Hyperparameter grids evaluated per model type
+PARAM_GRIDS: Dict[str, List[Dict[str, Any]]] = {
+    'linear_regression': [{}],
+    'random_forest': [
+        {'n_estimators': 100, 'max_depth': 10, 'min_samples_leaf': 2},
+        {'n_estimators': 100, 'max_depth': 15, 'min_samples_leaf': 2},
+        {'n_estimators': 100, 'max_depth': None, 'min_samples_leaf': 5},
+    ],
+    'svm': [{'C': 1}, {'C': 10}, {'C': 100}],
+}
+
+DEFAULT_FOLDS = 5
+MAX_FOLDS = 10
+
+
+def build_candidate(model_type: str, params: Dict[str, Any], n_rows: int, n_features: int):
+    """Estimator for one grid point — scaling happens inside the pipeline, per fold"""
+    if model_type == 'linear_regression':
+        return make_pipeline(StandardScaler(), LinearRegression())
+
+    if model_type == 'random_forest':
+        # Parallelism comes from running folds side by side, not from the forest
+        return RandomForestRegressor(max_features='sqrt', random_state=42, n_jobs=1, **params)
+
+    if model_type == 'svm':
+        path, fit_rows = svm_training_plan(n_rows)
+        return make_pipeline(StandardScaler(), build_svm(path, n_features, fit_rows, 1.0, C=params['C']))
+
+    raise ValueError(f"Unknown model type: {model_type}")
+
+
+def _fold_indices(n_rows: int, n_folds: int, fold: int):
+    # Recomputed in each worker — cheaper than shipping index arrays per task
+    splits = KFold(n_splits=n_folds, shuffle=True, random_state=42).split(np.arange(n_rows))
+    for i, (train_idx, test_idx) in enumerate(splits):
+        if i == fold:
+            return train_idx, test_idx
+    raise IndexError(fold)
+
+
+def _evaluate_fold(model_type: str, params: Dict[str, Any], X: np.ndarray, y: np.ndarray,
+                   n_folds: int, fold: int) -> Dict[str, float]:
+    """Fit one candidate on one fold's training rows and score its held-out rows"""
+    train_idx, test_idx = _fold_indices(len(y), n_folds, fold)
+    X_train, y_train = X[train_idx], y[train_idx]
+
+    model = build_candidate(model_type, params, len(train_idx), X.shape[1])
+    if model_type == 'svm':
+        path, fit_rows = svm_training_plan(len(train_idx))
+        if path == 'nystroem_subsample':
+            X_train, y_train = stratified_subsample(X_train, y_train, fit_rows)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    y_test = y[test_idx]
+    y_pred = predict_in_batches(model, X[test_idx])
+    mse = mean_squared_error(y_test, y_pred)
+    return {
+        'mse':      float(mse),
+        'rmse':     float(np.sqrt(mse)),
+        'mae':      float(mean_absolute_error(y_test, y_pred)),
+        'r2':       float(r2_score(y_test, y_pred)),
+        'fit_time': fit_time,
+    }
+
+
+def _share(values: np.ndarray, directory: str, name: str) -> np.ndarray:
+    """Write ``values`` to disk and reopen it as a read-only memory map"""
+    path = os.path.join(directory, f'{name}.npy')
+    np.save(path, values)
+    return np.load(path, mmap_mode='r')
+
+
+def compare_models(X: pd.DataFrame, y: pd.Series, model_types: List[str], n_folds: int = DEFAULT_FOLDS,
+                   progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """K-fold CV of every grid point of ``model_types`` — returns a leaderboard ranked by mean R²"""
+    wall_start = time.perf_counter()
+    candidates = [(model_type, params) for model_type in model_types for params in PARAM_GRIDS[model_type]]
+    tasks = [(c, fold) for c in range(len(candidates)) for fold in range(n_folds)]
+
+    shared_dir = tempfile.mkdtemp(prefix='ml-compare-')
+    try:
+        X_shared = _share(X.to_numpy(dtype=np.float64), shared_dir, 'X')
+        y_shared = _share(y.to_numpy(dtype=np.float64), shared_dir, 'y')
+
+        scores: List[Dict[str, float]] = []
+        with span('cross_validate'), cpu_budget.reserve(len(tasks)) as n_jobs:
+            # Waves of tasks so progress can be reported between them; the pool is reused
+            wave = max(n_jobs * 2, n_folds)
+            with Parallel(n_jobs=n_jobs, backend='loky') as parallel:
+                for start in range(0, len(tasks), wave):
+                    scores.extend(parallel(
+                        delayed(_evaluate_fold)(*candidates[c], X_shared, y_shared, n_folds, fold)
+                        for c, fold in tasks[start:start + wave]
+                    ))
+                    if progress:
+                        progress(len(scores), len(tasks), 'cross-validating')
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+    leaderboard = []
+    for c, (model_type, params) in enumerate(candidates):
+        folds = [scores[i] for i, (candidate, _) in enumerate(tasks) if candidate == c]
+        r2 = np.array([f['r2'] for f in folds])
+        rmse = np.array([f['rmse'] for f in folds])
+        leaderboard.append({
+            'model_type': model_type,
+            'params':     params,
+            'cv': {
+                'r2_mean':   float(r2.mean()),
+                'r2_std':    float(r2.std()),
+                'rmse_mean': float(rmse.mean()),
+                'rmse_std':  float(rmse.std()),
+                'mae_mean':  float(np.mean([f['mae'] for f in folds])),
+            },
+            'fit_time_mean': round(float(np.mean([f['fit_time'] for f in folds])), 3),
+        })
+
+    leaderboard.sort(key=lambda entry: (-entry['cv']['r2_mean'], entry['cv']['rmse_mean']))
+    for rank, entry in enumerate(leaderboard, start=1):
+        entry['rank'] = rank
+
+    return {
+        'folds':       n_folds,
+        'samples':     len(y),
+        'candidates':  len(candidates),
+        'workers':     n_jobs,
+        'leaderboard': leaderboard,
+        'best':        leaderboard[0],
+        'wall_time':   round(time.perf_counter() - wall_start, 3),
+    }
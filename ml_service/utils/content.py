@@ -0,0 +1,112 @@
+"""Content-addressed storage for uploads.
+
+Every upload is hashed while it streams to disk and stored once as
+``BLOB_DIR/<sha256><ext>``. The path handed to the client is a hard link to
+that blob, so identical uploads share disk space — and the Parquet working
+copy converted for the first of them — while each still gets its own path to
+clean and version independently. Workbooks keep one shared working copy per
+sheet, so each sheet is decoded once however many uploads select it.
+"""
+import os
+from typing import Optional
+
+from utils.excel import select_sheet, selected_sheet, sheet_key
+from utils.storage import link_or_copy, working_path, WORKING_SUFFIX
+
+BLOB_DIR = os.environ.get('ML_BLOB_DIR', os.path.join('uploads', 'blobs'))
+
+# Sidecar next to each upload holding the SHA-256 of its original bytes
+HASH_SUFFIX = '.sha256'
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    return os.path.join(BLOB_DIR, f"{sha256}{ext}")
+
+
+def shared_working_path(blob: str, sheet: Optional[str] = None) -> str:
+    """The working copy converted from ``blob`` (from ``sheet`` for workbooks)"""
+    return working_path(blob) if sheet is None else f"{blob}.{sheet_key(sheet)}{WORKING_SUFFIX}"
+
+
+def original_upload(filepath: str) -> str:
+    """The upload's original bytes — its blob, or the file itself when it has none"""
+    sha256 = content_hash(filepath)
+    if sha256 is not None:
+        blob = blob_path(sha256, os.path.splitext(filepath)[1].lower())
+        if os.path.exists(blob):
+            return blob
+    return filepath
+
+
+def store_upload(tmp_path: str, filepath: str, sha256: str) -> bool:
+    """Move a freshly streamed upload into the blob store and link it at ``filepath``.
+
+    Returns True when the same content was already stored — the new bytes are
+    then discarded and the existing blob (and its working copy) reused.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    blob = blob_path(sha256, os.path.splitext(filepath)[1].lower())
+
+    deduplicated = os.path.exists(blob)
+    if deduplicated:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, blob)
+
+    link_or_copy(blob, filepath)
+    with open(filepath + HASH_SUFFIX, 'w') as f:
+        f.write(sha256)
+
+    link_shared_working_copy(filepath)
+    return deduplicated
+
+
+def derive_upload(filepath: str, new_filepath: str, sheet: Optional[str]) -> None:
+    """A new dataset at ``new_filepath`` reading ``sheet`` of the same original workbook"""
+    link_or_copy(original_upload(filepath), new_filepath)
+    sha256 = content_hash(filepath)
+    if sha256 is not None:
+        with open(new_filepath + HASH_SUFFIX, 'w') as f:
+            f.write(sha256)
+    select_sheet(new_filepath, sheet)
+    link_shared_working_copy(new_filepath)
+
+
+def link_shared_working_copy(filepath: str) -> None:
+    """Reuse the working copy already converted from the same content and sheet, if any"""
+    sha256 = content_hash(filepath)
+    if sha256 is None:
+        return
+
+    shared = shared_working_path(blob_path(sha256, os.path.splitext(filepath)[1].lower()), selected_sheet(filepath))
+    target = working_path(filepath)
+    if os.path.exists(target):
+        os.remove(target)
+    if os.path.exists(shared):
+        link_or_copy(shared, target)
+
+
+def content_hash(filepath: str) -> Optional[str]:
+    """SHA-256 of the upload's original bytes, or None for files that didn't come through /upload"""
+    try:
+        with open(filepath + HASH_SUFFIX) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def share_working_copy(filepath: str) -> None:
+    """Publish a just-converted working copy so later identical uploads skip the parse"""
+    sha256 = content_hash(filepath)
+    if sha256 is None:
+        return
+
+    blob = blob_path(sha256, os.path.splitext(filepath)[1].lower())
+    shared = shared_working_path(blob, selected_sheet(filepath))
+    # Only while the raw file is still the untouched blob the working copy was parsed from
+    if os.path.exists(shared) or not os.path.exists(blob) or not os.path.samefile(blob, filepath):
+        return
+    try:
+        link_or_copy(working_path(filepath), shared)
+    except OSError:
+        pass
@@ -25,7 +25,12 @@ def analyze_missing_values(df: pd.DataFrame) -> Dict[str, Any]:
     return missing_data
 
 def detect_outliers(df: pd.DataFrame, method: str = 'iqr') -> Dict[str, Any]:
-    """Detect outliers using IQR or Z-Score method"""
+    """Detect outliers using IQR or Z-Score method, or multivariate ('isolation_forest', 'mcd')"""
+    if method in ('isolation_forest', 'mcd'):
+        # Whole rows rather than single values — outlier count and top-k rows (see utils.multivariate)
+        from utils.multivariate import outlier_report
+        return outlier_report(df, method)
+
     outliers = {
         'method': method,
         'columns': {},
@@ -78,7 +83,8 @@ def analyze_distribution(df: pd.DataFrame) -> Dict[str, Any]:
     distributions = {}
     
     for col in numeric_cols:
-        data = df[col].dropna()
+        # float64 so compact (float32/int8) columns give the same statistics
+        data = df[col].dropna().astype(np.float64)
         
         if len(data) == 0:
             continue
@@ -129,4 +135,295 @@ def get_data_summary(df: pd.DataFrame) -> Dict[str, Any]:
         'memory_usage': float(df.memory_usage(deep=True).sum() / 1024 / 1024),  # MB
         'duplicates': int(df.duplicated().sum()),
         'duplicate_percentage': float((df.duplicated().sum() / len(df)) * 100)
-    }
\ No newline at end of file
+    }
+
+# ---------------------------------------------------------------------------
+# Single-pass profiling engine
+#
+# profile_dataset() produces exactly what get_data_summary, analyze_missing_values,
+# detect_outliers (IQR + Z-Score) and analyze_distribution return, but from one
+# null mask, one duplicate pass and a column-batched float64 block per numeric
+# group. Quantiles, min/max, histograms and IQR bounds come from one sort of
+# the block. Moments use the per-column reductions the individual functions
+# use, so every float in the JSON matches theirs bit for bit.
+# ---------------------------------------------------------------------------
+
+HISTOGRAM_BINS = 10
+ZSCORE_THRESHOLD = 3.0
+
+# Upper bound for one numeric block — wide/long frames are profiled in column batches
+PROFILE_BLOCK_BYTES = 256 * 1024 * 1024
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation exactly as numpy's 'linear' quantile method does it"""
+    diff = b - a
+    out = a + diff * t
+    return np.where(t >= 0.5, b - diff * (1 - t), out)
+
+
+def _sorted_quantile(sorted_block: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Per-column quantile of a column-sorted block whose NaNs sit at the bottom"""
+    # numpy's 'linear' method (alpha = beta = 1) puts quantile q at 0-based rank q * (n - 1)
+    virtual = q * (counts - 1)
+    lower = np.floor(virtual)
+    gamma = virtual - lower
+    lo_idx = np.clip(lower.astype(np.intp), 0, None)
+    hi_idx = np.minimum(lo_idx + 1, np.maximum(counts - 1, 0))
+    cols = np.arange(sorted_block.shape[1])
+    return _lerp(sorted_block[lo_idx, cols], sorted_block[hi_idx, cols], gamma)
+
+
+def _batched_histogram(block: np.ndarray, mask: np.ndarray, mins: np.ndarray, maxs: np.ndarray,
+                       bins: int = HISTOGRAM_BINS):
+    """np.histogram(col, bins) for every column at once — same edges, same bin assignment"""
+    first = mins.copy()
+    last = maxs.copy()
+    flat = first == last
+    first[flat] -= 0.5
+    last[flat] += 0.5
+
+    edges = np.linspace(first, last, bins + 1, endpoint=True, axis=1)
+    denom = last - first
+
+    with np.errstate(invalid='ignore'):
+        f_idx = ((block - first) / denom) * bins
+    f_idx[mask] = 0
+    idx = f_idx.astype(np.intp)
+    idx[idx == bins] -= 1
+
+    # Gather each element's bin edges from the flattened (n_cols, bins + 1) edge table
+    flat_edges = edges.ravel()
+    offsets = np.arange(block.shape[1]) * (bins + 1)
+    decrement = block < flat_edges.take(idx + offsets)
+    idx[decrement] -= 1
+    increment = (block >= flat_edges.take(idx + offsets + 1)) & (idx != bins - 1)
+    idx[increment] += 1
+
+    flat_idx = (idx + np.arange(block.shape[1]) * bins)[~mask]
+    counts = np.bincount(flat_idx, minlength=block.shape[1] * bins).reshape(block.shape[1], bins)
+    return counts, edges
+
+
+def _profile_numeric_block(block: np.ndarray) -> Dict[str, np.ndarray]:
+    """All per-column numeric statistics for an (n_rows, n_cols) Fortran-ordered block"""
+    mask = np.isnan(block)
+    counts = (~mask).sum(axis=0)
+    n_cols = block.shape[1]
+
+    # Moments with the same reductions as analyze_distribution/detect_outliers —
+    # a shared vectorized pass sums in a different order and drifts in the last ulps
+    mean, std, skewness, kurtosis = (np.full(n_cols, np.nan) for _ in range(4))
+    z_counts = np.zeros(n_cols, dtype=np.int64)
+    for j in range(n_cols):
+        data = block[~mask[:, j], j]
+        if len(data) == 0:
+            continue
+        series = pd.Series(data, copy=False)
+        mean[j] = series.mean()
+        std[j] = series.std()
+        skewness[j] = stats.skew(data)
+        kurtosis[j] = stats.kurtosis(data)
+        z_counts[j] = (np.abs(stats.zscore(data)) > ZSCORE_THRESHOLD).sum()
+
+    # One sort gives min/max, quartiles and the median for every column
+    sorted_block = np.sort(block, axis=0)
+    cols = np.arange(n_cols)
+    last_idx = np.maximum(counts - 1, 0)
+    mins = sorted_block[0, :]
+    maxs = sorted_block[last_idx, cols]
+    q1 = _sorted_quantile(sorted_block, counts, 0.25)
+    q3 = _sorted_quantile(sorted_block, counts, 0.75)
+    mid_lo = sorted_block[np.maximum((counts - 1) // 2, 0), cols]
+    mid_hi = sorted_block[np.minimum(counts // 2, last_idx), cols]
+    median = np.where(counts % 2 == 1, mid_hi, (mid_lo + mid_hi) / 2)
+    del sorted_block
+
+    iqr = q3 - q1
+    lower = q1 - 1.5 * iqr
+    upper = q3 + 1.5 * iqr
+    iqr_counts = ((block < lower) | (block > upper)).sum(axis=0)
+
+    hist_counts, hist_edges = _batched_histogram(block, mask, mins, maxs)
+
+    return {
+        'count': counts, 'mean': mean, 'std': std, 'min': mins, 'max': maxs,
+        'median': median, 'skewness': skewness, 'kurtosis': kurtosis,
+        'lower_bound': lower, 'upper_bound': upper,
+        'iqr_count': iqr_counts, 'z_count': z_counts,
+        'hist_counts': hist_counts, 'hist_edges': hist_edges,
+    }
+
+
+def _iter_numeric_blocks(df: pd.DataFrame, numeric_cols: List[str]):
+    """Yield (columns, block) pairs sized to stay under PROFILE_BLOCK_BYTES"""
+    n_rows = len(df)
+    per_batch = max(1, PROFILE_BLOCK_BYTES // max(n_rows * 8, 1))
+    for start in range(0, len(numeric_cols), per_batch):
+        batch = numeric_cols[start:start + per_batch]
+        # Fortran order keeps each column contiguous so reductions match per-Series results
+        block = np.empty((n_rows, len(batch)), dtype=np.float64, order='F')
+        for j, col in enumerate(batch):
+            block[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        yield batch, block
+
+
+def count_duplicate_rows(df: pd.DataFrame) -> int:
+    """Exact ``df.duplicated().sum()`` via one row-hash pass.
+
+    Rows whose 64-bit hash is unique can't be duplicates; only the (usually
+    tiny) set of rows sharing a hash is compared exactly.
+    """
+    if len(df) == 0 or len(df.columns) == 0:
+        return int(df.duplicated().sum())
+    row_hash = pd.util.hash_pandas_object(df, index=False)
+    candidates = row_hash.duplicated(keep=False).to_numpy()
+    if not candidates.any():
+        return 0
+    return int(df[candidates].duplicated().sum())
+
+
+def _column_weight(position: int) -> np.uint64:
+    # Distinct odd multipliers so swapped values in different columns don't cancel out
+    return np.uint64(((position + 1) * 0x9E3779B97F4A7C15 | 1) & 0xFFFFFFFFFFFFFFFF)
+
+
+def column_hash_terms(df: pd.DataFrame, columns: List[str], positions: Dict[str, int]) -> np.ndarray:
+    """Sum of weighted per-column hashes for ``columns`` — one term of ``row_hashes``"""
+    total = np.zeros(len(df), dtype=np.uint64)
+    for col in columns:
+        hashed = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+        total += hashed * _column_weight(positions[col])
+    return total
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit row hashes that are a plain (wrapping) sum of per-column terms.
+
+    Because the combination is linear, the hash of a row whose columns were
+    partly rewritten can be updated by swapping only those columns' terms
+    instead of rehashing the whole frame.
+    """
+    positions = {col: i for i, col in enumerate(df.columns)}
+    return column_hash_terms(df, list(df.columns), positions)
+
+
+def count_duplicates_by_hash(df: pd.DataFrame, row_hash: np.ndarray) -> int:
+    """Exact ``df.duplicated().sum()`` given precomputed row hashes"""
+    if len(df) == 0 or len(df.columns) == 0:
+        return int(df.duplicated().sum())
+    candidates = pd.Series(row_hash).duplicated(keep=False).to_numpy()
+    if not candidates.any():
+        return 0
+    return int(df[candidates].duplicated().sum())
+
+
+def _skew_category(skewness: float) -> str:
+    if abs(skewness) < 0.5:
+        return 'Normal'
+    if abs(skewness) < 1:
+        return 'Moderately Skewed'
+    return 'Highly Skewed'
+
+
+def profile_dataset(df: pd.DataFrame) -> Dict[str, Any]:
+    """Summary, missing values, IQR/Z-Score outliers and distributions in one pass.
+
+    Returns the same structures as the individual functions above under the
+    keys 'summary', 'missing_values', 'outliers_iqr', 'outliers_zscore' and
+    'distributions'.
+    """
+    n_rows = len(df)
+
+    # Summary — one duplicate pass
+    dup_count = count_duplicate_rows(df)
+    summary = {
+        'rows': n_rows,
+        'columns': len(df.columns),
+        'column_names': list(df.columns),
+        'column_types': {col: str(df[col].dtype) for col in df.columns},
+        'memory_usage': float(df.memory_usage(deep=True).sum() / 1024 / 1024),  # MB
+        'duplicates': dup_count,
+        'duplicate_percentage': float((dup_count / n_rows) * 100) if n_rows else 0.0,
+    }
+
+    # Missing values — one null mask
+    null_counts = df.isnull().sum()
+    missing_values = {
+        'columns': [],
+        'missing_count': {},
+        'missing_percentage': {},
+        'total_cells': n_rows * len(df.columns),
+        'total_missing': int(null_counts.sum()),
+    }
+    for column, missing_count in null_counts.items():
+        if missing_count > 0:
+            missing_values['columns'].append(column)
+            missing_values['missing_count'][column] = int(missing_count)
+            missing_values['missing_percentage'][column] = float((missing_count / n_rows) * 100)
+
+    outliers_iqr = {'method': 'iqr', 'columns': {}, 'total_outliers': 0}
+    outliers_zscore = {'method': 'zscore', 'columns': {}, 'total_outliers': 0}
+    distributions = {}
+
+    # No rows means no values — every numeric column is skipped, as analyze_distribution does
+    numeric_cols = list(df.select_dtypes(include=[np.number]).columns) if n_rows else []
+    for batch, block in _iter_numeric_blocks(df, numeric_cols):
+        stats_ = _profile_numeric_block(block)
+
+        for j, col in enumerate(batch):
+            count = int(stats_['count'][j])
+            if count == 0:
+                continue
+
+            iqr_count = int(stats_['iqr_count'][j])
+            if iqr_count > 0:
+                outliers_iqr['columns'][col] = {
+                    'count': iqr_count,
+                    'percentage': float((iqr_count / count) * 100),
+                    'lower_bound': float(stats_['lower_bound'][j]),
+                    'upper_bound': float(stats_['upper_bound'][j]),
+                    'method': 'IQR'
+                }
+
+            z_count = int(stats_['z_count'][j])
+            if z_count > 0:
+                outliers_zscore['columns'][col] = {
+                    'count': z_count,
+                    'percentage': float((z_count / count) * 100),
+                    'threshold': ZSCORE_THRESHOLD,
+                    'method': 'Z-Score'
+                }
+
+            edges = stats_['hist_edges'][j]
+            hist = stats_['hist_counts'][j]
+            skewness = float(stats_['skewness'][j])
+            distributions[col] = {
+                'mean': float(stats_['mean'][j]),
+                'median': float(stats_['median'][j]),
+                'std': float(stats_['std'][j]),
+                'min': float(stats_['min'][j]),
+                'max': float(stats_['max'][j]),
+                'skewness': skewness,
+                'skew_category': _skew_category(skewness),
+                'kurtosis': float(stats_['kurtosis'][j]),
+                'count': count,
+                'histogram': [
+                    {
+                        'range': f"{edges[i]:.1f}-{edges[i+1]:.1f}",
+                        'frequency': int(hist[i])
+                    }
+                    for i in range(len(hist))
+                ],
+            }
+
+    outliers_iqr['total_outliers'] = sum(v['count'] for v in outliers_iqr['columns'].values())
+    outliers_zscore['total_outliers'] = sum(v['count'] for v in outliers_zscore['columns'].values())
+
+    return {
+        'summary': summary,
+        'missing_values': missing_values,
+        'outliers_iqr': outliers_iqr,
+        'outliers_zscore': outliers_zscore,
+        'distributions': distributions,
+    }
@@ -0,0 +1,258 @@
+"""Shared in-process DataFrame cache so every route parses an upload only once"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.compact import compact_frame
+from utils.content import share_working_copy
+from utils.excel import read_excel_sheet, selected_sheet, sheet_columns
+from utils.metrics import count, span
+from utils.storage import (
+    has_working_copy,
+    read_working_copy,
+    working_columns,
+    working_path,
+    write_working_copy,
+)
+
+# Total memory the cache may hold before evicting least-recently-used datasets
+DATASET_CACHE_MAX_MB = float(os.environ.get('DATASET_CACHE_MAX_MB', '1024'))
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+# Fixed pool of per-file load locks — a file hashes to one, so the pool never grows
+LOAD_LOCK_STRIPES = 64
+
+
+def parse_raw(filepath: str) -> pd.DataFrame:
+    """Parse the raw CSV or Excel upload — the one place text is parsed"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.csv':
+        return pd.read_csv(filepath)
+    if ext in ('.xlsx', '.xls'):
+        return read_excel_sheet(filepath, selected_sheet(filepath))
+    raise ValueError(f"Unsupported file type: {ext}")
+
+
+def read_dataset(filepath: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read the dataset from its working copy, converting the raw file on first use"""
+    if has_working_copy(filepath):
+        return _load_working_copy(filepath, columns)
+
+    with span('parse'):
+        df = parse_raw(filepath)
+    count('parse', rows=len(df), nbytes=os.path.getsize(filepath))
+
+    with span('save'):
+        written = write_working_copy(filepath, df)
+    if written:
+        share_working_copy(filepath)
+    return df[columns] if columns is not None else df
+
+
+def _load_working_copy(filepath: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    with span('load'):
+        df = read_working_copy(filepath, columns=columns)
+    count('load', rows=len(df))
+    return df
+
+
+def source_path(filepath: str) -> str:
+    """The file that actually backs the dataset right now"""
+    return working_path(filepath) if has_working_copy(filepath) else filepath
+
+
+class DatasetCache:
+    """LRU cache of parsed DataFrames bounded by their total deep memory usage.
+
+    Entries are invalidated when the file's mtime/size changes or when the
+    dataset version is bumped (e.g. by /clean). Cached frames are shared
+    between requests and must be treated as read-only — copy before mutating.
+
+    A dataset can be cached as parsed and in compact dtypes (see
+    ``utils.compact``); the two are separate entries under one budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[str, bool], Tuple[Tuple, pd.DataFrame, int]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._load_locks = [threading.Lock() for _ in range(LOAD_LOCK_STRIPES)]
+        self._lock = threading.RLock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(filepath: str) -> str:
+        return os.path.abspath(filepath)
+
+    def _signature(self, key: str) -> Tuple[int, int, int]:
+        st = os.stat(source_path(key))
+        return (st.st_mtime_ns, st.st_size, self._versions.get(key, 0))
+
+    def _drop(self, entry_key: Tuple[str, bool]) -> None:
+        _, _, nbytes = self._entries.pop(entry_key)
+        self._bytes -= nbytes
+
+    def get(self, filepath: str, compact: bool = False) -> pd.DataFrame:
+        """Return the parsed dataset, reading it from disk only on a miss"""
+        key = self._key(filepath)
+        entry_key = (key, compact)
+
+        # Hits never touch the stripe lock, so they don't wait on another file's parse
+        cached = self.peek(filepath, compact)
+        if cached is not None:
+            return cached
+
+        load_lock = self._load_locks[hash(key) % LOAD_LOCK_STRIPES]
+
+        # One parse per file at a time — concurrent misses wait for the first reader
+        # (re-checked below); misses on files sharing a stripe load one after the other
+        with load_lock:
+            with self._lock:
+                signature = self._signature(key)
+                entry = self._entries.get(entry_key)
+                if entry is not None:
+                    if entry[0] == signature:
+                        self._entries.move_to_end(entry_key)
+                        self.hits += 1
+                        return entry[1]
+                    self._drop(entry_key)
+                    self.invalidations += 1
+                self.misses += 1
+
+                # Compact from the cached parse instead of reading the file again
+                parsed = self._entries.get((key, False)) if compact else None
+                source = parsed[1] if parsed is not None and parsed[0] == signature else None
+
+            if source is None:
+                source = read_dataset(key)
+                with self._lock:
+                    # Re-stat — the first read of a raw upload creates its working copy
+                    signature = self._signature(key)
+            df = compact_frame(source) if compact else source
+            self._store(entry_key, df, signature)
+            return df
+
+    def peek(self, filepath: str, compact: bool = False) -> Optional[pd.DataFrame]:
+        """Return the cached frame if it is still current, without loading on a miss"""
+        key = self._key(filepath)
+        with self._lock:
+            entry = self._entries.get((key, compact))
+            if entry is not None and entry[0] == self._signature(key):
+                self._entries.move_to_end((key, compact))
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def put(self, filepath: str, df: pd.DataFrame, compact: bool = False) -> None:
+        """Seed the cache with a frame that matches what is now on disk"""
+        key = self._key(filepath)
+        with self._lock:
+            signature = self._signature(key)
+        self._store((key, compact), df, signature)
+
+    def _store(self, entry_key: Tuple[str, bool], df: pd.DataFrame, signature: Tuple) -> None:
+        nbytes = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if entry_key in self._entries:
+                self._drop(entry_key)
+
+            # Too large to ever fit — don't flush everything else for it
+            if nbytes > self.max_bytes:
+                return
+
+            while self._entries and self._bytes + nbytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+            self._entries[entry_key] = (signature, df, nbytes)
+            self._bytes += nbytes
+
+    def bump_version(self, filepath: str) -> int:
+        """Mark the dataset as changed so any cached copy is treated as stale"""
+        key = self._key(filepath)
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            for entry_key in ((key, False), (key, True)):
+                if entry_key in self._entries:
+                    self._drop(entry_key)
+                    self.invalidations += 1
+            return self._versions[key]
+
+    def version(self, filepath: str) -> int:
+        with self._lock:
+            return self._versions.get(self._key(filepath), 0)
+
+    def signature(self, filepath: str) -> Tuple[int, int, int]:
+        """(mtime, size, version) of the dataset — changes whenever its contents may have"""
+        with self._lock:
+            return self._signature(self._key(filepath))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries':       len(self._entries),
+                'bytes':         self._bytes,
+                'max_bytes':     self.max_bytes,
+                'hits':          self.hits,
+                'misses':        self.misses,
+                'evictions':     self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate':      round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+dataset_cache = DatasetCache(int(DATASET_CACHE_MAX_MB * 1024 * 1024))
+
+
+def load_dataset(filepath: str, columns: Optional[List[str]] = None, compact: bool = False) -> pd.DataFrame:
+    """Load an uploaded dataset through the shared cache (read-only frame).
+
+    With ``columns`` and a cold cache only those columns are read from the
+    working copy, and the partial frame is not cached. With ``compact`` the
+    frame uses the narrow dtypes of ``utils.compact``.
+    """
+    if columns is None:
+        return dataset_cache.get(filepath, compact)
+
+    cached = dataset_cache.peek(filepath, compact)
+    if cached is not None:
+        return cached[columns]
+    if compact:
+        parsed = dataset_cache.peek(filepath)
+        if parsed is not None:
+            return compact_frame(parsed[columns])
+    if has_working_copy(filepath):
+        df = _load_working_copy(filepath, columns)
+        return compact_frame(df) if compact else df
+    return dataset_cache.get(filepath, compact)[columns]
+
+
+def dataset_columns(filepath: str) -> List[str]:
+    """Column names of the dataset without parsing it — Parquet footer, CSV or sheet header"""
+    cached = dataset_cache.peek(filepath)
+    if cached is not None:
+        return list(cached.columns)
+    if has_working_copy(filepath):
+        return working_columns(filepath)
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.csv':
+        return list(pd.read_csv(filepath, nrows=0).columns)
+    if ext in ('.xlsx', '.xls'):
+        return sheet_columns(filepath, selected_sheet(filepath))
+    raise ValueError(f"Unsupported file type: {ext}")
@@ -0,0 +1,232 @@
+"""Streaming Excel ingestion.
+
+``pd.read_excel`` materializes every cell through a generic text parser. Here
+rows are streamed from the sheet — with python-calamine when it is installed,
+otherwise openpyxl in read-only mode — transposed into one buffer per column
+and typed a whole column at a time. The result matches ``pd.read_excel`` for
+the usual sheet layouts (first row as header, trailing blank rows dropped,
+integral floats as int64, Excel dates as datetime64, NA strings as missing).
+
+A dataset is one sheet of a workbook. The sheet is recorded in a
+``<upload>.sheet`` sidecar; without one the first sheet is used. Once a sheet
+has been decoded into the Parquet working copy no route decodes it again.
+"""
+import hashlib
+import itertools
+import os
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from python_calamine import CalamineWorkbook
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xls')
+
+# Sidecar next to an upload naming the sheet it was loaded from
+SHEET_SUFFIX = '.sheet'
+
+# Strings pandas' parsers read as missing by default
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+])
+
+Row = Tuple[Any, ...]
+
+
+def is_excel(filepath: str) -> bool:
+    return os.path.splitext(filepath)[1].lower() in EXCEL_EXTENSIONS
+
+
+def selected_sheet(filepath: str) -> Optional[str]:
+    """The sheet the dataset was loaded from, or None for the workbook's first sheet"""
+    try:
+        with open(filepath + SHEET_SUFFIX) as f:
+            return f.read() or None
+    except FileNotFoundError:
+        return None
+
+
+def select_sheet(filepath: str, sheet: Optional[str]) -> None:
+    """Record ``sheet`` as the dataset's sheet — None goes back to the first sheet"""
+    path = filepath + SHEET_SUFFIX
+    if sheet is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w') as f:
+        f.write(sheet)
+
+
+def sheet_key(sheet: str) -> str:
+    """Filesystem-safe token identifying a sheet name"""
+    return 'sheet-' + hashlib.sha1(sheet.encode('utf-8')).hexdigest()[:12]
+
+
+def sheet_names(filepath: str) -> List[str]:
+    if HAS_CALAMINE:
+        return list(CalamineWorkbook.from_path(filepath).sheet_names)
+    if os.path.splitext(filepath)[1].lower() == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(filepath, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    return list(pd.ExcelFile(filepath).sheet_names)
+
+
+def resolve_sheet(filepath: str, sheet: str) -> Optional[str]:
+    """Sheet name for a name or 0-based index — None when it is the first sheet.
+
+    Raises ``ValueError`` when the workbook has no such sheet.
+    """
+    names = sheet_names(filepath)
+    if sheet not in names and sheet.isdigit() and int(sheet) < len(names):
+        sheet = names[int(sheet)]
+    if sheet not in names:
+        raise ValueError(f"Sheet '{sheet}' not found. Available sheets: {names}")
+    return None if sheet == names[0] else sheet
+
+
+def iter_sheet_rows(filepath: str, sheet: Optional[str] = None) -> Iterator[Row]:
+    """Cell values of a sheet row by row, empty cells as None"""
+    if HAS_CALAMINE:
+        workbook = CalamineWorkbook.from_path(filepath)
+        name = sheet if sheet is not None else workbook.sheet_names[0]
+        for row in workbook.get_sheet_by_name(name).to_python(skip_empty_area=False):
+            # Calamine reports empty cells as ''
+            yield tuple(None if value == '' else value for value in row)
+        return
+
+    if os.path.splitext(filepath)[1].lower() != '.xlsx':
+        # Legacy .xls without calamine — only xlrd (via pandas) can read it
+        df = pd.read_excel(filepath, sheet_name=sheet or 0, header=None)
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            yield row
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _integral(value: Any) -> Any:
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def _column_names(header: Row, width: int) -> List[Any]:
+    names: List[Any] = []
+    seen: dict = {}
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        name = f"Unnamed: {i}" if value is None else _integral(value)
+        # Same de-duplication as pandas: a, a.1, a.2, ...
+        base, n = name, seen.get(name, 0)
+        while name in seen:
+            n += 1
+            name = f"{base}.{n}"
+        seen[base] = n
+        seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _typed_column(values: Sequence[Any]) -> Any:
+    """One column's cell values in the dtype ``pd.read_excel`` would give them"""
+    column = np.array(values, dtype=object)
+    kind = pd.api.types.infer_dtype(column, skipna=True)
+    missing = pd.isna(column)
+
+    if kind == 'empty':
+        return np.full(len(column), np.nan)
+
+    if kind in ('string', 'mixed', 'mixed-integer'):
+        # Text cells go through the same NA and number inference as a CSV field
+        column[pd.Series(column).isin(NA_STRINGS).to_numpy()] = None
+        try:
+            return _typed_column(pd.to_numeric(column).tolist())
+        except (TypeError, ValueError):
+            column[pd.isna(column)] = np.nan
+            return np.array([_integral(v) for v in column], dtype=object) if kind != 'string' else column
+
+    if kind in ('integer', 'floating', 'mixed-integer-float'):
+        numbers = column.astype(np.float64)
+        if not missing.any() and np.array_equal(numbers, np.floor(numbers)) and np.abs(numbers).max() < 2 ** 53:
+            return numbers.astype(np.int64)
+        return numbers
+
+    if kind == 'boolean' and not missing.any():
+        return column.astype(bool)
+
+    if kind in ('datetime', 'date', 'datetime64'):
+        return pd.to_datetime(column)
+
+    # Times, bools with gaps — object like pandas, NaN for missing
+    column[missing] = np.nan
+    return column
+
+
+def frame_from_rows(rows: Iterator[Row], columns: Optional[List[Any]] = None) -> pd.DataFrame:
+    """Build a typed frame from a header row followed by data rows"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    body = list(rows)
+    # Blank rows inside the data stay as all-missing rows; trailing ones are formatting
+    while body and all(v is None for v in body[-1]):
+        body.pop()
+
+    # Column buffers — one C-level transpose instead of per-cell appends
+    buffers = list(itertools.zip_longest(*body)) if body else []
+    width = max(len(header), len(buffers))
+    while width and (width > len(header) or header[width - 1] is None) \
+            and (width > len(buffers) or all(v is None for v in buffers[width - 1])):
+        width -= 1
+
+    names = _column_names(header, width)
+    data = {}
+    for i, name in enumerate(names):
+        if columns is not None and name not in columns:
+            continue
+        data[name] = _typed_column(buffers[i]) if i < len(buffers) else np.full(len(body), np.nan)
+    return pd.DataFrame(data, columns=[n for n in names if columns is None or n in columns])
+
+
+def sheet_columns(filepath: str, sheet: Optional[str] = None) -> List[Any]:
+    """Column names of a sheet from its header row alone — no data rows are decoded"""
+    if not HAS_CALAMINE and os.path.splitext(filepath)[1].lower() == '.xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+        try:
+            worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+            header = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+    else:
+        rows = iter_sheet_rows(filepath, sheet)
+        header = next(rows, ())
+        rows.close()
+
+    width = len(header)
+    while width and header[width - 1] is None:
+        width -= 1
+    return _column_names(header, width)
+
+
+def read_excel_sheet(filepath: str, sheet: Optional[str] = None,
+                     columns: Optional[List[Any]] = None) -> pd.DataFrame:
+    """Decode one sheet (the first by default) into a typed frame"""
+    return frame_from_rows(iter_sheet_rows(filepath, sheet), columns)
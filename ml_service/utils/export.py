@@ -0,0 +1,314 @@
+"""Streaming export of datasets for /download.
+
+Nothing here writes a full temporary file. CSV and XLSX are generated
+chunk by chunk from the working copy, and compression wraps whichever
+byte stream is being sent:
+
+- csv      — ``DataFrame.to_csv`` per chunk, header on the first only
+             (from the schema when there are no rows)
+- xlsx     — a minimal Office Open XML package written into a zip stream,
+             one row chunk at a time (inline strings, no shared string table)
+- parquet  — the Parquet working copy is already the export; it is served as a file
+
+gzip uses zlib's streaming compressor. zstd uses ``zstandard`` when
+installed and otherwise pyarrow's codec, one zstd frame per chunk —
+concatenated frames are a valid zstd stream.
+"""
+import datetime
+import math
+import os
+import re
+import zipfile
+import zlib
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset_cache import dataset_columns
+from utils.storage import iter_dataset_chunks
+
+try:
+    import zstandard
+    HAS_ZSTANDARD = True
+except ImportError:
+    HAS_ZSTANDARD = False
+
+# Rows converted per chunk while exporting
+EXPORT_CHUNK_ROWS = int(os.environ.get('ML_EXPORT_CHUNK_ROWS', '50000'))
+
+# Bytes per read when serving a file (or a byte range of one)
+FILE_CHUNK_BYTES = 1024 * 1024
+
+GZIP_LEVEL = int(os.environ.get('ML_DOWNLOAD_GZIP_LEVEL', '6'))
+ZSTD_LEVEL = int(os.environ.get('ML_DOWNLOAD_ZSTD_LEVEL', '3'))
+
+EXPORT_FORMATS = {
+    'csv':     ('text/csv', '.csv'),
+    'xlsx':    ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', '.xlsx'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+# Rows an XLSX sheet can hold, header included
+XLSX_MAX_ROWS = 1_048_576
+
+
+def zstd_available() -> bool:
+    if HAS_ZSTANDARD:
+        return True
+    try:
+        import pyarrow as pa
+        return pa.Codec.is_available('zstd')
+    except ImportError:
+        return False
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best of zstd/gzip the client accepts (q-values honoured), or None for identity"""
+    offered = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[token.strip().lower()] = quality
+
+    for encoding in ('zstd', 'gzip'):
+        if offered.get(encoding, offered.get('*', 0.0)) > 0 and (encoding != 'zstd' or zstd_available()):
+            return encoding
+    return None
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single ``bytes=`` range, None to ignore the header.
+
+    Raises ``ValueError`` when the range can't be satisfied. Multi-range
+    requests are answered with the whole file, which HTTP allows.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range — the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError(f"Range {header!r} not satisfiable for {size} bytes")
+    return start, min(end, size - 1)
+
+
+def iter_file(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Bytes ``start``..``end`` (inclusive) of a file in FILE_CHUNK_BYTES reads"""
+    remaining = (os.path.getsize(path) if end is None else end + 1) - start
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while remaining > 0:
+            block = f.read(min(FILE_CHUNK_BYTES, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def iter_csv(filepath: str, chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    header = True
+    for chunk in iter_dataset_chunks(filepath, chunksize=chunk_rows):
+        yield chunk.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+    if header:
+        # No rows, so no chunks — the column names still make a valid CSV
+        yield pd.DataFrame(columns=dataset_columns(filepath)).to_csv(index=False).encode('utf-8')
+
+
+class _Drain:
+    """Write-only sink that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+_EXCEL_EPOCH = np.datetime64('1899-12-30')
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # Style 1 is the date-time format used for datetime cells
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+
+# Characters XML 1.0 can't carry — Excel would reject the sheet
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _xlsx_text(value: Any) -> str:
+    text = escape(_XML_ILLEGAL.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_cells(values: pd.Series) -> List[str]:
+    """One column as cell XML fragments (without the row reference — Excel infers it)"""
+    if pd.api.types.is_bool_dtype(values):
+        return [f'<c t="b"><v>{int(v)}</v></c>' for v in values]
+    if pd.api.types.is_numeric_dtype(values):
+        return [f'<c><v>{v!r}</v></c>' if math.isfinite(v) else '<c/>' for v in values.astype(np.float64).tolist()]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        days = (values.to_numpy(dtype='datetime64[ns]') - _EXCEL_EPOCH) / np.timedelta64(1, 'D')
+        return ['<c/>' if np.isnan(d) else f'<c s="1"><v>{d!r}</v></c>' for d in days.tolist()]
+
+    cells = []
+    for v in values.tolist():
+        if v is None or (isinstance(v, float) and v != v) or v is pd.NA or v is pd.NaT:
+            cells.append('<c/>')
+        elif isinstance(v, (bool, np.bool_)):
+            cells.append(f'<c t="b"><v>{int(v)}</v></c>')
+        elif isinstance(v, (int, float, np.number)):
+            cells.append(f'<c><v>{float(v)!r}</v></c>' if math.isfinite(v) else '<c/>')
+        elif isinstance(v, (datetime.datetime, datetime.date)):
+            days = (np.datetime64(v, 'ns') - _EXCEL_EPOCH) / np.timedelta64(1, 'D')
+            cells.append(f'<c s="1"><v>{float(days)!r}</v></c>')
+        else:
+            cells.append(_xlsx_text(v))
+    return cells
+
+
+def _xlsx_header(columns: Iterable[Any]) -> bytes:
+    return f"<row>{''.join(_xlsx_text(c) for c in columns)}</row>".encode('utf-8')
+
+
+def _xlsx_rows(chunk: pd.DataFrame) -> str:
+    columns = [_xlsx_cells(chunk[col]) for col in chunk.columns]
+    return ''.join(f"<row>{''.join(cells)}</row>" for cells in zip(*columns))
+
+
+def iter_xlsx(filepath: str, sheet_name: str = 'Sheet1', chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """An .xlsx workbook with one sheet, produced while the rows are read"""
+    sink = _Drain()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as package:
+        for name, xml in _XLSX_STATIC.items():
+            package.writestr(name, xml)
+        package.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(sheet_name[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        yield sink.drain()
+
+        with package.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            ).encode('utf-8'))
+            header = True
+            for chunk in iter_dataset_chunks(filepath, chunksize=chunk_rows):
+                if header:
+                    sheet.write(_xlsx_header(chunk.columns))
+                    header = False
+                sheet.write(_xlsx_rows(chunk).encode('utf-8'))
+                yield sink.drain()
+            if header:
+                # No rows, so no chunks — still write the column names
+                sheet.write(_xlsx_header(dataset_columns(filepath)))
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+def write_export(filepath: str, target: str, fmt: str, sheet_name: str = 'Sheet1') -> None:
+    """Write the dataset as ``fmt`` to ``target`` atomically, with the same bytes /download streams"""
+    chunks = iter_xlsx(filepath, sheet_name) if fmt == 'xlsx' else iter_csv(filepath)
+    tmp = f"{target}.tmp"
+    with open(tmp, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, target)
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def zstd_stream(chunks: Iterable[bytes], level: int = ZSTD_LEVEL) -> Iterator[bytes]:
+    if HAS_ZSTANDARD:
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+        return
+
+    import pyarrow as pa
+    codec = pa.Codec('zstd', compression_level=level)
+    for chunk in chunks:
+        if chunk:
+            yield codec.compress(chunk, asbytes=True)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: Optional[str]) -> Iterable[bytes]:
+    if encoding == 'gzip':
+        return gzip_stream(chunks)
+    if encoding == 'zstd':
+        return zstd_stream(chunks)
+    return chunks
@@ -0,0 +1,292 @@
+"""Out-of-core training for linear-family models.
+
+The dataset is read in chunks over several passes, so memory depends on the
+chunk size rather than the file size:
+
+1. scan     — decide numeric vs categorical per feature (same 80% rule as
+              ``infer_encoder``) and collect category labels
+2. scale    — fit the feature scaler and target statistics on training rows
+3. fit      — ``partial_fit`` an SGD model, STREAM_EPOCHS times over the file
+4. evaluate — accumulate train/test metrics
+
+Rows are assigned to the test split by hashing their values, so every pass
+agrees on the split without storing it.
+"""
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.kernel_approximation import RBFSampler
+from sklearn.linear_model import SGDRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from utils.metrics import count, span
+from utils.models import ProgressCallback, factorize_labels, encode_features
+
+# Model types that can be trained incrementally
+STREAMING_MODEL_TYPES = ('linear_regression', 'svm')
+
+# Percentage of rows (by row hash) held out for testing — matches test_size=0.2
+TEST_PERCENT = 20
+
+# Passes of partial_fit over the training rows
+STREAM_EPOCHS = 3
+
+# Rows per partial_fit call — bounds the random-feature matrix for svm
+FIT_BATCH_ROWS = 10_000
+
+# Random Fourier features approximating the RBF kernel for svm
+RBF_COMPONENTS = 300
+
+# Distinct labels a categorical feature may have before streaming gives up
+MAX_CATEGORIES = 100_000
+
+ChunkSource = Callable[[], Iterator[pd.DataFrame]]
+
+
+def _scan_encoders(chunks: ChunkSource, feature_columns: List[str],
+                   target_column: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any], int]:
+    """Pass 1 — encoders for features and target, plus the number of chunks"""
+    columns = feature_columns + [target_column]
+    non_null = {col: 0 for col in columns}
+    converted = {col: 0 for col in columns}
+    labels: Dict[str, set] = {col: set() for col in columns}
+    numeric_chunks = {col: False for col in columns}
+    n_chunks = 0
+
+    for chunk in chunks():
+        n_chunks += 1
+        for col in columns:
+            values = chunk[col]
+            if pd.api.types.is_numeric_dtype(values):
+                count = int(values.notna().sum())
+                non_null[col] += count
+                converted[col] += count
+                numeric_chunks[col] = True
+                continue
+
+            # Same counting as infer_encoder, over this chunk's distinct values
+            codes, chunk_labels = factorize_labels(values)
+            parses = pd.to_numeric(chunk_labels, errors='coerce').notna().to_numpy()
+            non_null[col] += len(values)
+            converted[col] += int(np.bincount(codes, minlength=len(chunk_labels))[parses].sum())
+            if len(labels[col]) <= MAX_CATEGORIES:
+                labels[col].update(chunk_labels)
+
+    categorical = [col for col in columns if non_null[col] and converted[col] / non_null[col] < 0.8]
+
+    # A categorical column can still parse as numbers in some chunks — their labels are
+    # classes too, or those rows would encode as -1. Rare, so only then read the file again
+    late = [col for col in categorical if numeric_chunks[col]]
+    if late:
+        for chunk in chunks():
+            for col in late:
+                if pd.api.types.is_numeric_dtype(chunk[col]) and len(labels[col]) <= MAX_CATEGORIES:
+                    labels[col].update(factorize_labels(chunk[col])[1])
+
+    encoders: Dict[str, Dict[str, Any]] = {}
+    for col in columns:
+        if col not in categorical:
+            encoders[col] = {'kind': 'numeric'}
+        elif len(labels[col]) > MAX_CATEGORIES:
+            raise ValueError(f"Column '{col}' has more than {MAX_CATEGORIES} categories — too many to stream")
+        else:
+            encoders[col] = {'kind': 'categorical', 'classes': sorted(labels[col])}
+
+    target_encoder = encoders.pop(target_column)
+    return encoders, target_encoder, n_chunks
+
+
+def _encode_chunk(chunk: pd.DataFrame, feature_columns: List[str], target_column: str,
+                  encoders: Dict[str, Dict[str, Any]], target_encoder: Dict[str, Any]):
+    """Encoded (X, y, is_test) for a chunk's valid rows"""
+    X = encode_features(chunk, feature_columns, encoders)
+    y = encode_features(chunk, [target_column], {target_column: target_encoder})[target_column]
+
+    valid = X.notna().all(axis=1) & y.notna()
+    X, y = X[valid], y[valid].astype(np.float64)
+
+    row_hash = pd.util.hash_pandas_object(chunk.loc[valid, feature_columns + [target_column]], index=False)
+    is_test = (row_hash.to_numpy() % 100) < TEST_PERCENT
+    return X, y, is_test
+
+
+class _Moments:
+    """Running count / sum / sum of squares for streaming regression metrics"""
+
+    def __init__(self):
+        self.n = 0
+        self.sum_y = 0.0
+        self.sum_y2 = 0.0
+        self.sse = 0.0
+        self.sae = 0.0
+        self.y_min = np.inf
+        self.y_max = -np.inf
+
+    def add(self, y: np.ndarray, pred: np.ndarray) -> None:
+        if len(y) == 0:
+            return
+        err = y - pred
+        self.n += len(y)
+        self.sum_y += float(y.sum())
+        self.sum_y2 += float(np.square(y).sum())
+        self.sse += float(np.square(err).sum())
+        self.sae += float(np.abs(err).sum())
+        self.y_min = min(self.y_min, float(y.min()))
+        self.y_max = max(self.y_max, float(y.max()))
+
+    def metrics(self) -> Dict[str, float]:
+        n = max(self.n, 1)
+        mse = self.sse / n
+        ss_tot = self.sum_y2 - self.sum_y ** 2 / n
+        return {
+            'mse':  float(mse),
+            'rmse': float(np.sqrt(mse)),
+            'mae':  float(self.sae / n),
+            'r2':   float(1 - self.sse / ss_tot) if ss_tot > 0 else 0.0,
+        }
+
+
+def _build_streaming_model(model_type: str, n_features: int):
+    """(feature map or None, SGD regressor) for a linear-family model type"""
+    if model_type == 'linear_regression':
+        return None, SGDRegressor(alpha=1e-6, random_state=42)
+
+    # svm — random Fourier features of the RBF kernel SVR(gamma='scale') would use on scaled data
+    feature_map = RBFSampler(gamma=1.0 / n_features, n_components=RBF_COMPONENTS, random_state=42)
+    feature_map.fit(np.zeros((1, n_features)))
+    return feature_map, SGDRegressor(loss='epsilon_insensitive', epsilon=0.1, alpha=1e-6, random_state=42)
+
+
+def train_streaming(chunks: ChunkSource, model_type: str, feature_columns: List[str], target_column: str,
+                    progress: Optional[ProgressCallback] = None, return_pipeline: bool = False):
+    """Train a linear-family model over ``chunks()`` without loading the dataset.
+
+    ``chunks`` is called once per pass and must yield the same rows each time.
+    Returns the same result shape as ``train_model`` (and optionally a pipeline
+    that ``utils.registry.predict`` can score with).
+    """
+    if model_type not in STREAMING_MODEL_TYPES:
+        raise ValueError(f"Streaming training supports {', '.join(STREAMING_MODEL_TYPES)}, not {model_type}")
+
+    if progress:
+        progress(0, 1, 'scanning')
+    encoders, target_encoder, n_chunks = _scan_encoders(chunks, feature_columns, target_column)
+    total_steps = n_chunks * (STREAM_EPOCHS + 2)
+    step = 0
+
+    def encoded_chunks(stage: str):
+        nonlocal step
+        for chunk in chunks():
+            yield _encode_chunk(chunk, feature_columns, target_column, encoders, target_encoder)
+            step += 1
+            if progress:
+                progress(step, total_steps, stage)
+
+    # Pass 2 — scaler and target statistics from training rows only
+    scaler = StandardScaler()
+    y_stats = _Moments()
+    n_train = n_test = 0
+    for X, y, is_test in encoded_chunks('scaling'):
+        n_test += int(is_test.sum())
+        X_train = X[~is_test]
+        n_train += len(X_train)
+        if len(X_train):
+            scaler.partial_fit(X_train)
+            y_train = y.to_numpy()[~is_test]
+            y_stats.add(y_train, y_train)
+
+    if n_train + n_test < 10:
+        raise ValueError(f"Not enough valid data to train (got {n_train + n_test} rows, need at least 10)")
+    if n_train == 0 or n_test == 0:
+        raise ValueError("Not enough valid rows to form both a training and a test split")
+
+    # SGD converges far better on a standardized target — undone on the final coefficients
+    y_mean = y_stats.sum_y / n_train
+    y_std = float(np.sqrt(max(y_stats.sum_y2 / n_train - y_mean ** 2, 0))) or 1.0
+
+    feature_map, sgd = _build_streaming_model(model_type, len(feature_columns))
+    rng = np.random.default_rng(42)
+
+    # Pass 3 — partial_fit, shuffling rows within each chunk
+    fit_start = time.perf_counter()
+    with span('fit'):
+        for _ in range(STREAM_EPOCHS):
+            for X, y, is_test in encoded_chunks('fitting'):
+                X_train = scaler.transform(X[~is_test])
+                y_train = (y.to_numpy()[~is_test] - y_mean) / y_std
+                order = rng.permutation(len(X_train))
+                for start in range(0, len(order), FIT_BATCH_ROWS):
+                    idx = order[start:start + FIT_BATCH_ROWS]
+                    features = X_train[idx] if feature_map is None else feature_map.transform(X_train[idx])
+                    sgd.partial_fit(features, y_train[idx])
+
+    fit_time = time.perf_counter() - fit_start
+    count('fit', rows=n_train * STREAM_EPOCHS)
+
+    # Fold the target standardization into the last linear layer
+    sgd.coef_ = sgd.coef_ * y_std
+    sgd.intercept_ = sgd.intercept_ * y_std + y_mean
+    model = sgd if feature_map is None else Pipeline([('features', feature_map), ('regressor', sgd)])
+
+    # Pass 4 — metrics and a sample of test predictions
+    train_metrics, test_metrics = _Moments(), _Moments()
+    samples: List[Tuple[float, float]] = []
+    for X, y, is_test in encoded_chunks('evaluating'):
+        if not len(X):
+            continue
+        with span('predict'):
+            pred = np.concatenate([
+                model.predict(scaler.transform(X.iloc[start:start + FIT_BATCH_ROWS]))
+                for start in range(0, len(X), FIT_BATCH_ROWS)
+            ])
+        count('predict', rows=len(X))
+        y_values = y.to_numpy()
+        train_metrics.add(y_values[~is_test], pred[~is_test])
+        test_metrics.add(y_values[is_test], pred[is_test])
+        if len(samples) < 20:
+            samples.extend(zip(y_values[is_test][:20 - len(samples)], pred[is_test][:20 - len(samples)]))
+
+    y_range = test_metrics.y_max - test_metrics.y_min
+    if y_range == 0:
+        y_range = 1.0
+
+    result = {
+        'model_type':       model_type,
+        'mode':             'streaming',
+        'training_samples': n_train,
+        'test_samples':     n_test,
+        'fit_samples':      n_train,
+        'training_path':    'sgd' if feature_map is None else 'rbf_features_sgd',
+        'fit_time':         round(fit_time, 3),
+        'epochs':           STREAM_EPOCHS,
+        'chunks':           n_chunks,
+        'metrics': {
+            'train': train_metrics.metrics(),
+            'test':  test_metrics.metrics(),
+        },
+        'predictions': [
+            {
+                'actual':           float(actual),
+                'predicted':        float(pred),
+                'error':            float(actual - pred),
+                'error_percentage': float(abs(actual - pred) / y_range * 100)
+            }
+            for actual, pred in samples
+        ],
+        'feature_importance': None
+    }
+
+    if return_pipeline:
+        pipeline = {
+            'model_type': model_type,
+            'features':   list(feature_columns),
+            'target':     target_column,
+            'encoders':   encoders,
+            'scaler':     scaler,
+            'model':      model,
+        }
+        return result, pipeline
+    return result
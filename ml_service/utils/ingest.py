@@ -0,0 +1,123 @@
+"""Upload ingestion — stream the body to disk and sniff metadata without a full parse"""
+import hashlib
+import io
+import os
+from typing import Any, BinaryIO, Dict, Optional
+
+import pandas as pd
+
+from utils.excel import frame_from_rows
+
+# Bytes copied per read while streaming the upload to disk
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Leading bytes kept in memory for sniffing the header and preview rows
+SNIFF_BYTES = 256 * 1024
+
+PREVIEW_ROWS = 5
+
+
+def stream_to_disk(source: BinaryIO, filepath: str) -> Dict[str, Any]:
+    """Copy ``source`` to ``filepath`` while hashing, counting newlines and keeping the head"""
+    digest = hashlib.sha256()
+    size = 0
+    newlines = 0
+    head = bytearray()
+    last_byte = b''
+
+    with open(filepath, 'wb') as buffer:
+        while True:
+            block = source.read(COPY_CHUNK_BYTES)
+            if not block:
+                break
+            buffer.write(block)
+            digest.update(block)
+            size += len(block)
+            newlines += block.count(b'\n')
+            if len(head) < SNIFF_BYTES:
+                head += block[:SNIFF_BYTES - len(head)]
+            last_byte = block[-1:]
+
+    return {
+        'size':       size,
+        'sha256':     digest.hexdigest(),
+        'newlines':   newlines,
+        'head':       bytes(head),
+        'complete':   size <= SNIFF_BYTES,
+        'ends_clean': last_byte in (b'', b'\n'),
+    }
+
+
+def _preview_records(df: pd.DataFrame):
+    # Cast to object first — float columns would otherwise keep NaN, which isn't valid JSON
+    preview = df.head(PREVIEW_ROWS).astype(object)
+    return preview.where(pd.notnull(preview), None).to_dict(orient='records')
+
+
+def sniff_csv(stats: Dict[str, Any], filepath: str) -> Dict[str, Any]:
+    """Columns, row count and preview of a CSV from its head and newline count.
+
+    A file that fits in the head is parsed whole, so its row count is exact.
+    Otherwise the count is the number of physical lines minus the header —
+    quoted fields containing newlines and blank lines make it an
+    over-estimate — and 'rowCountEstimated' is set.
+    """
+    head = stats['head']
+    if stats['complete']:
+        df = pd.read_csv(io.BytesIO(head))
+        return {
+            'columns':           list(df.columns),
+            'rowCount':          len(df),
+            'rowCountEstimated': False,
+            'preview':           _preview_records(df),
+        }
+
+    # Don't hand pandas a half-written last line
+    head = head[:head.rfind(b'\n') + 1]
+    # A header line longer than the head — read the first rows from the file instead
+    sample = pd.read_csv(io.BytesIO(head) if head else filepath, nrows=PREVIEW_ROWS)
+    lines = stats['newlines'] + (0 if stats['ends_clean'] else 1)
+
+    return {
+        'columns':           list(sample.columns),
+        'rowCount':          max(lines - 1, 0),
+        'rowCountEstimated': True,
+        'preview':           _preview_records(sample),
+    }
+
+
+def sniff_excel(filepath: str, sheet: Optional[str] = None) -> Dict[str, Any]:
+    """Columns, row count, preview and sheet names of a workbook sheet in read-only mode"""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext != '.xlsx':
+        # Legacy .xls has no streaming reader — parse it fully
+        workbook = pd.ExcelFile(filepath)
+        df = workbook.parse(sheet if sheet is not None else 0)
+        return {
+            'columns':  list(df.columns),
+            'rowCount': len(df),
+            'preview':  _preview_records(df),
+            'sheets':   list(workbook.sheet_names),
+        }
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        rows = list(worksheet.iter_rows(min_row=1, max_row=PREVIEW_ROWS + 1, values_only=True))
+        max_row = worksheet.max_row
+        sheets = list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+    if not rows:
+        return {'columns': [], 'rowCount': 0, 'preview': [], 'sheets': sheets}
+
+    sample = frame_from_rows(rows)
+    return {
+        'columns':  list(sample.columns),
+        'rowCount': max((max_row or len(rows)) - 1, 0),
+        'preview':  _preview_records(sample),
+        'sheets':   sheets,
+    }
@@ -0,0 +1,169 @@
+"""Background job store for long-running work such as model training.
+
+Submitting returns a job ID immediately; the work runs on a small dedicated
+executor and reports progress through ``Job.report``. Finished jobs keep
+their result for ``ML_JOB_TTL_SECONDS`` before they are swept. Cancellation
+is cooperative — the next ``report`` call after a cancel request raises
+``JobCancelled`` inside the worker.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from utils.workers import PoolSaturated
+
+JOB_WORKERS = int(os.environ.get('ML_JOB_WORKERS', '2'))
+JOB_QUEUE_DEPTH = int(os.environ.get('ML_JOB_QUEUE_DEPTH', '16'))
+JOB_TTL_SECONDS = float(os.environ.get('ML_JOB_TTL_SECONDS', '3600'))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(BaseException):
+    """Raised inside a job's worker once cancellation has been requested.
+
+    Derives from BaseException (like asyncio.CancelledError) so the routes'
+    ``except Exception`` handlers don't turn a cancel into a 500.
+    """
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.state = QUEUED
+        self.progress: Dict[str, Any] = {'done': 0, 'total': None, 'stage': 'queued'}
+        self.result: Optional[Any] = None
+        self.error: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def report(self, done: int, total: Optional[int] = None, stage: Optional[str] = None) -> None:
+        """Progress callback for the worker — also the cancellation checkpoint"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = {
+            'done':  done,
+            'total': total if total is not None else self.progress['total'],
+            'stage': stage or self.progress['stage'],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        total = self.progress['total']
+        return {
+            'jobId':      self.id,
+            'kind':       self.kind,
+            'state':      self.state,
+            'progress':   {
+                **self.progress,
+                'percentage': round(self.progress['done'] / total * 100, 1) if total else None,
+            },
+            'createdAt':  self.created_at,
+            'startedAt':  self.started_at,
+            'finishedAt': self.finished_at,
+            'expiresAt':  self.finished_at + JOB_TTL_SECONDS if self.finished_at else None,
+            'result':     self.result,
+            'error':      self.error,
+        }
+
+
+class JobStore:
+    def __init__(self, max_workers: int, queue_depth: int, ttl_seconds: float):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ml-job')
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def _sweep(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, fn: Callable[[Job], Any]) -> Job:
+        """Queue ``fn(job)`` and return the job right away"""
+        with self._lock:
+            self._sweep()
+            active = sum(1 for j in self._jobs.values() if j.state in (QUEUED, RUNNING))
+            if active >= self.max_workers + self.queue_depth:
+                raise PoolSaturated(kind, retry_after=30)
+            job = Job(kind)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        # Cancelled while still queued — already finished by cancel()
+        if job.cancel_requested:
+            return
+
+        job.state = RUNNING
+        job.started_at = time.time()
+        job.progress = {**job.progress, 'stage': 'running'}
+        try:
+            job.result = fn(job)
+            self._finish(job, SUCCEEDED)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except HTTPException as e:
+            job.error = {'status': e.status_code, 'detail': e.detail}
+            self._finish(job, FAILED)
+        except ValueError as e:
+            job.error = {'status': 422, 'detail': str(e)}
+            self._finish(job, FAILED)
+        except Exception as e:
+            job.error = {'status': 500, 'detail': str(e)}
+            self._finish(job, FAILED)
+
+    @staticmethod
+    def _finish(job: Job, state: str) -> None:
+        job.state = state
+        job.finished_at = time.time()
+        if state == SUCCEEDED:
+            job.progress = {**job.progress, 'done': job.progress['total'] or job.progress['done'], 'stage': 'done'}
+        else:
+            job.progress = {**job.progress, 'stage': state}
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._sweep()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return job
+
+        job._cancel.set()
+        if job.state == QUEUED:
+            self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sweep()
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return {'max_workers': self.max_workers, 'queue_depth': self.queue_depth, 'jobs': counts}
+
+
+job_store = JobStore(JOB_WORKERS, JOB_QUEUE_DEPTH, JOB_TTL_SECONDS)
@@ -0,0 +1,261 @@
+"""Request timing, per-stage spans and a Prometheus text exposition.
+
+The HTTP middleware opens a ``RequestTimings`` for every request and stores
+it in a contextvar. ``span(stage)`` records into that request (if any) and
+into the process-wide stage histogram; worker threads see the same request
+because ``WorkerPool.run`` copies the context. Background jobs run without a
+request, so their spans only feed the process-wide metrics.
+
+Peak RSS per request is sampled — at request start/end and at every span
+boundary — so it is a lower bound on the true peak, which is enough to spot
+the endpoints that blow up memory.
+"""
+import contextvars
+import functools
+import inspect
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.routing import APIRoute
+
+# Latency buckets (seconds) for requests and stages
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Peak RSS buckets (bytes) — 64 MB to 16 GB
+RSS_BUCKETS = tuple(64 * 1024 * 1024 * 2 ** i for i in range(9))
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+LabelValues = Tuple[str, ...]
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        # No procfs — fall back to the lifetime peak (KB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.label_names, values)} {_number(total)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            series = self._series.setdefault(label_values, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, hits in zip(self.buckets, series):
+                    cumulative += hits
+                    le = _labels(self.label_names, values, f'le="{_number(bound)}"')
+                    lines.append(f'{self.name}_bucket{le} {cumulative}')
+                le = _labels(self.label_names, values, 'le="+Inf"')
+                lines.append(f'{self.name}_bucket{le} {series[-1]}')
+                lines.append(f'{self.name}_sum{_labels(self.label_names, values)} {_number(series[-2])}')
+                lines.append(f'{self.name}_count{_labels(self.label_names, values)} {series[-1]}')
+        return lines
+
+
+def gauge(name: str, help_text: str, samples: Sequence[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Gauge lines for values computed at scrape time (queue depth, cache size, ...)"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+    for labels, value in samples:
+        lines.append(f'{name}{_labels(list(labels), list(labels.values()))} {_number(value)}')
+    return lines
+
+
+REQUESTS = Counter('ml_http_requests_total', 'HTTP requests handled', ('method', 'endpoint', 'status'))
+REQUEST_SECONDS = Histogram('ml_http_request_duration_seconds', 'HTTP request latency', ('method', 'endpoint'))
+REQUEST_PEAK_RSS = Histogram('ml_http_request_peak_rss_bytes', 'Sampled peak process RSS during a request',
+                             ('method', 'endpoint'), buckets=RSS_BUCKETS)
+STAGE_SECONDS = Histogram('ml_stage_duration_seconds', 'Time spent in a processing stage', ('stage',))
+ROWS_PROCESSED = Counter('ml_rows_processed_total', 'Rows processed per stage', ('stage',))
+BYTES_PROCESSED = Counter('ml_bytes_processed_total', 'Bytes read or written per stage', ('stage',))
+
+
+class RequestTimings:
+    """Stage durations and sampled peak RSS of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.peak_rss = current_rss()
+        self.endpoint_done: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        rss = current_rss()
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            self.peak_rss = max(self.peak_rss, rss)
+
+    def server_timing(self, total: float) -> str:
+        """Value for the Server-Timing response header (durations in ms)"""
+        with self._lock:
+            entries = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in self.stages.items()]
+        return ', '.join(entries + [f'total;dur={total * 1000:.1f}'])
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar('request_timings', default=None)
+
+
+def begin_request() -> Tuple[RequestTimings, contextvars.Token]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token: contextvars.Token) -> None:
+    _current.reset(token)
+
+
+def observe_request(method: str, endpoint: str, status: int, timings: RequestTimings) -> float:
+    """Record a finished request — returns its total duration"""
+    total = time.perf_counter() - timings.start
+    timings.peak_rss = max(timings.peak_rss, current_rss())
+    REQUESTS.inc(method, endpoint, str(status))
+    REQUEST_SECONDS.observe(total, method, endpoint)
+    REQUEST_PEAK_RSS.observe(timings.peak_rss, method, endpoint)
+    return total
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block as ``stage`` for the current request and the stage histogram"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+def count(stage: str, rows: int = 0, nbytes: int = 0) -> None:
+    """Add to the rows/bytes processed by ``stage``"""
+    if rows:
+        ROWS_PROCESSED.inc(stage, amount=rows)
+    if nbytes:
+        BYTES_PROCESSED.inc(stage, amount=nbytes)
+
+
+def _timed_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a route endpoint so the time after it returns can be attributed to serialization"""
+    def mark_done() -> None:
+        timings = _current.get()
+        if timings is not None:
+            timings.endpoint_done = time.perf_counter()
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            mark_done()
+            return result
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            result = endpoint(*args, **kwargs)
+            mark_done()
+            return result
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records JSON encoding + rendering of the response as the 'serialize' stage.
+
+    FastAPI encodes the endpoint's return value inside the route handler, so
+    the serialize time is the gap between the endpoint returning and the
+    handler producing its Response.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timings = _current.get()
+            if timings is not None and timings.endpoint_done is not None:
+                record_stage('serialize', time.perf_counter() - timings.endpoint_done)
+                timings.endpoint_done = None
+            return response
+
+        return timed_handler
+
+
+def render(extra: Sequence[List[str]] = ()) -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in (REQUESTS, REQUEST_SECONDS, REQUEST_PEAK_RSS, STAGE_SECONDS, ROWS_PROCESSED, BYTES_PROCESSED):
+        lines.extend(metric.render())
+    lines.extend(gauge('ml_process_resident_memory_bytes', 'Current process RSS', [({}, current_rss())]))
+    for metric_lines in extra:
+        lines.extend(metric_lines)
+    return '\n'.join(lines) + '\n'
+
@@ -1,60 +1,145 @@
+import os
+import time
+import warnings
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.linear_model import LinearRegression, Ridge
 from sklearn.ensemble import RandomForestRegressor
+from sklearn.kernel_approximation import Nystroem
+from sklearn.pipeline import make_pipeline
 from sklearn.svm import SVR
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
-from typing import Dict, Any, List, Tuple
-
-
-def prepare_features(df: pd.DataFrame, feature_columns: List[str], target_column: str) -> Tuple[pd.DataFrame, pd.Series]:
-    """Prepare features and target for training — handles numeric-as-string columns correctly"""
-    X = df[feature_columns].copy()
-    y = df[target_column].copy()
-
-    # Step 1 — strip whitespace from all string columns first
-    for col in X.columns:
-        if X[col].dtype == object:
-            X[col] = X[col].astype(str).str.strip()
-    if y.dtype == object:
-        y = y.astype(str).str.strip()
-
-    # Step 2 — for each feature column, try numeric conversion first
-    # Only use LabelEncoder if the column is truly categorical (not numbers stored as strings)
-    for col in X.columns:
-        converted = pd.to_numeric(X[col], errors='coerce')
-        non_null_original = X[col].notna().sum()
-        non_null_converted = converted.notna().sum()
-
-        # If ≥80% converted successfully → treat as numeric
-        if non_null_original == 0 or (non_null_converted / non_null_original) >= 0.8:
-            X[col] = converted
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+from utils.metrics import count, span
+from utils.workers import cpu_budget
+
+# Trees grown per warm-start batch — also the granularity of progress reports
+RF_TREES_PER_BATCH = 25
+
+# Forest growth stops once the out-of-bag MSE improves by less than
+# RF_OOB_TOLERANCE (relative) for RF_OOB_PATIENCE batches in a row, but never
+# below RF_MIN_TREES — or when the next batch would overrun the time budget
+RF_MIN_TREES = 50
+RF_OOB_TOLERANCE = 0.005
+RF_OOB_PATIENCE = 2
+RF_TIME_BUDGET_SECONDS = float(os.environ.get('ML_RF_TIME_BUDGET_SECONDS', '300'))
+
+# Above this many training rows the exact kernel SVR (O(n²) memory) is replaced
+# by a Nyström approximation of the same RBF kernel feeding a linear solver
+SVM_EXACT_MAX_ROWS = int(os.environ.get('ML_SVM_EXACT_MAX_ROWS', '2000'))
+
+# Landmark points of the Nyström approximation
+SVM_NYSTROEM_COMPONENTS = 300
+
+# Memory budget for the approximate kernel features — the training set is
+# subsampled (stratified on the target) when its features wouldn't fit
+SVM_FEATURE_BUDGET_MB = int(os.environ.get('ML_SVM_FEATURE_MB', '256'))
+
+# Rows scored per predict() call while evaluating, so approximate-kernel
+# features are never materialized for the whole training set at once
+EVAL_BATCH_ROWS = 50_000
+
+# progress(done, total, stage) — raises to abort (e.g. JobCancelled)
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def factorize_labels(values: pd.Series) -> Tuple[np.ndarray, pd.Series]:
+    """Row codes plus the stripped string form of each distinct value.
+
+    Equivalent to ``values.astype(str).str.strip()`` (missing values become
+    'nan'/'None'), but strings are only built once per distinct value.
+    """
+    codes, uniques = pd.factorize(values)
+    labels = [str(u).strip() for u in uniques]
+
+    # factorize folds None and NaN together — str() tells them apart ('None' vs 'nan').
+    # Compact dtypes (category, string[pyarrow]) hold NaN/pd.NA, labelled 'nan' like a parsed column.
+    missing = codes < 0
+    if missing.any():
+        missing_values = values[missing].astype(object)
+        missing_codes, missing_uniques = pd.factorize(missing_values.map(lambda v: 'nan' if v is pd.NA else str(v)))
+        codes[missing] = missing_codes + len(labels)
+        labels.extend(missing_uniques)
+
+    return codes, pd.Series(labels, dtype=object)
+
+
+def _compact_float(values: np.ndarray) -> np.ndarray:
+    """float32 when that represents every value exactly, float64 otherwise"""
+    values = np.asarray(values, dtype=np.float64)
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow, values, equal_nan=True):
+        return narrow
+    return values
+
+
+def infer_encoder(values: pd.Series) -> Dict[str, Any]:
+    """How ``prepare_features`` encodes a column — numeric, or categorical with its classes.
+
+    Text columns count as numeric when ≥80% of their values parse as numbers.
+    """
+    if pd.api.types.is_numeric_dtype(values) or len(values) == 0:
+        return {'kind': 'numeric'}
+
+    codes, labels = factorize_labels(values)
+    parses = pd.to_numeric(labels, errors='coerce').notna().to_numpy()
+    converted = np.bincount(codes, minlength=len(labels))[parses].sum()
+
+    if converted / len(values) >= 0.8:
+        return {'kind': 'numeric'}
+    return {'kind': 'categorical', 'classes': sorted(set(labels))}
+
+
+def encode_column(values: pd.Series, encoder: Dict[str, Any], compact: bool = True) -> np.ndarray:
+    """Encode one column — numbers (NaN where unparseable) or int32 category codes (-1 if unseen).
+
+    With ``compact`` numeric output is float32 whenever that is lossless.
+    """
+    if encoder['kind'] == 'numeric':
+        if pd.api.types.is_numeric_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
         else:
-            # Truly categorical — safe to label encode
-            le = LabelEncoder()
-            X[col] = le.fit_transform(X[col].astype(str))
+            codes, labels = factorize_labels(values)
+            numbers = pd.to_numeric(labels, errors='coerce').to_numpy(dtype=np.float64)[codes]
+        return _compact_float(numbers) if compact else numbers
 
-    # Step 3 — convert target the same way
-    y_converted = pd.to_numeric(y, errors='coerce')
-    non_null_y = y.notna().sum()
-    non_null_y_converted = y_converted.notna().sum()
+    codes, labels = factorize_labels(values)
+    lookup = pd.Index(encoder['classes']).get_indexer(labels).astype(np.int32)
+    return lookup[codes]
 
-    if non_null_y == 0 or (non_null_y_converted / non_null_y) >= 0.8:
-        y = y_converted
-    else:
-        le = LabelEncoder()
-        y = pd.Series(le.fit_transform(y.astype(str)), index=y.index)
 
-    # Step 4 — drop remaining NaN rows after conversion
-    valid_idx = X.notna().all(axis=1) & y.notna()
-    dropped = (~valid_idx).sum()
-    X = X[valid_idx]
-    y = y[valid_idx]
+def prepare_features(df: pd.DataFrame, feature_columns: List[str], target_column: str,
+                     return_encoders: bool = False, schema: Optional[Dict[str, Dict[str, Any]]] = None):
+    """Prepare features and target for training — handles numeric-as-string columns correctly.
 
+    ``schema`` maps columns to encoders already inferred for this dataset
+    (see ``utils.schema``); anything missing is inferred here. Features come
+    back compact — float32 where lossless, int32 category codes.
+
+    With ``return_encoders`` also returns how each feature was encoded
+    ({'kind': 'numeric'} or {'kind': 'categorical', 'classes': [...]}) so the
+    same transform can be replayed at prediction time by ``encode_features``.
+    """
+    schema = schema or {}
+    encoders = {col: schema.get(col) or infer_encoder(df[col]) for col in feature_columns}
+
+    X = pd.DataFrame(
+        {col: encode_column(df[col], encoders[col]) for col in feature_columns},
+        index=df.index,
+    )
+    target_encoder = schema.get(target_column) or infer_encoder(df[target_column])
+    y = pd.Series(encode_column(df[target_column], target_encoder, compact=False), index=df.index)
+
+    # Drop rows that still have missing or unconvertible values
+    valid_idx = X.notna().all(axis=1) & y.notna()
+    dropped = int((~valid_idx).sum())
     if dropped > 0:
-        print(f"Warning: dropped {int(dropped)} rows due to unconvertible/missing values")
+        X = X[valid_idx]
+        y = y[valid_idx]
+        print(f"Warning: dropped {dropped} rows due to unconvertible/missing values")
 
     if len(X) < 10:
         raise ValueError(
@@ -62,13 +147,149 @@ def prepare_features(df: pd.DataFrame, feature_columns: List[str], target_column
             "Check that your columns contain valid numeric data."
         )
 
+    if return_encoders:
+        return X, y, encoders
     return X, y
 
 
-def train_model(df: pd.DataFrame, model_type: str, feature_columns: List[str], target_column: str) -> Dict[str, Any]:
-    """Train an ML model"""
+def encode_features(df: pd.DataFrame, feature_columns: List[str], encoders: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """Apply the encoders captured by prepare_features to new rows.
+
+    Numeric features that can't be converted become NaN and categories not
+    seen during training become -1; callers decide what to do with those rows.
+    """
+    return pd.DataFrame(
+        {col: encode_column(df[col], encoders[col]) for col in feature_columns},
+        index=df.index,
+    )
+
+
+def fit_forest(model: RandomForestRegressor, X: np.ndarray, y,
+               progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """Grow a random forest in warm-start batches until its out-of-bag error plateaus.
+
+    Seeds are drawn in the same order as a single fit, so a forest that runs to
+    ``n_estimators`` is the same as ``model.fit(X, y)``. The out-of-bag error
+    comes from sklearn's own ``oob_prediction_``, refreshed by every
+    warm-start fit. Each batch takes its threads from the shared CPU budget.
+    """
+    max_trees = model.n_estimators
+    y_values = np.asarray(y, dtype=np.float64)
 
-    X, y = prepare_features(df, feature_columns, target_column)
+    best_mse = np.inf
+    batches_without_gain = 0
+    stop_reason = 'max_trees'
+    oob_mse = None
+    threads = []
+    start = time.perf_counter()
+    last_batch_time = 0.0
+
+    model.set_params(warm_start=True, oob_score=True)
+    fitted = 0
+    while fitted < max_trees:
+        # Don't start a batch that would run past the time budget
+        elapsed = time.perf_counter() - start
+        if fitted >= RF_MIN_TREES and elapsed + last_batch_time > RF_TIME_BUDGET_SECONDS:
+            stop_reason = 'time_budget'
+            break
+
+        batch_start = time.perf_counter()
+        fitted = min(fitted + RF_TREES_PER_BATCH, max_trees)
+        with cpu_budget.reserve() as n_jobs:
+            threads.append(n_jobs)
+            model.set_params(n_estimators=fitted, n_jobs=n_jobs)
+            with warnings.catch_warnings():
+                # Early small forests may leave a few rows never out-of-bag — sklearn warns and scores them 0
+                warnings.filterwarnings('ignore', message='Some inputs do not have OOB scores')
+                model.fit(X, y)
+
+        oob_mse = float(np.mean(np.square(y_values - model.oob_prediction_)))
+        last_batch_time = time.perf_counter() - batch_start
+
+        if progress:
+            progress(fitted, max_trees, 'fitting')
+
+        if oob_mse < best_mse * (1 - RF_OOB_TOLERANCE):
+            best_mse = oob_mse
+            batches_without_gain = 0
+        else:
+            batches_without_gain += 1
+        if fitted >= RF_MIN_TREES and batches_without_gain >= RF_OOB_PATIENCE:
+            stop_reason = 'oob_plateau'
+            break
+
+    model.set_params(warm_start=False, n_estimators=fitted)
+    return {
+        'trees_used':  fitted,
+        'max_trees':   max_trees,
+        'stop_reason': stop_reason,
+        'oob_mse':     oob_mse,
+        'threads':     max(threads) if threads else 1,
+    }
+
+
+def svm_training_plan(n_rows: int) -> Tuple[str, int]:
+    """Pick the SVM path for ``n_rows`` training rows — returns (path, rows to fit on)"""
+    if n_rows <= SVM_EXACT_MAX_ROWS:
+        return 'exact_svr', n_rows
+
+    components = min(SVM_NYSTROEM_COMPONENTS, n_rows)
+    max_rows = max(SVM_EXACT_MAX_ROWS, SVM_FEATURE_BUDGET_MB * 1024 * 1024 // (components * 8))
+    if n_rows <= max_rows:
+        return 'nystroem', n_rows
+    return 'nystroem_subsample', max_rows
+
+
+def stratified_subsample(X, y, size: int, random_state: int = 42):
+    """Take ``size`` rows while keeping the target's distribution (decile strata)"""
+    strata = pd.qcut(pd.Series(np.asarray(y)).rank(method='first'), q=10, labels=False)
+    X_sub, _, y_sub, _ = train_test_split(
+        X, y, train_size=size, stratify=strata.to_numpy(), random_state=random_state
+    )
+    return X_sub, y_sub
+
+
+def build_svm(path: str, n_features: int, n_rows: int, feature_variance: float, C: float = 10):
+    """Exact RBF SVR, or a Nyström-approximated RBF kernel feeding ridge regression"""
+    if path == 'exact_svr':
+        return SVR(kernel='rbf', C=C, gamma='scale', cache_size=500)
+
+    # Same kernel width SVR(gamma='scale') would use on these features
+    gamma = 1.0 / (n_features * feature_variance) if feature_variance > 0 else 1.0
+    return make_pipeline(
+        Nystroem(kernel='rbf', gamma=gamma, n_components=min(SVM_NYSTROEM_COMPONENTS, n_rows), random_state=42),
+        # Squared loss with SVR's C — closed-form, and the intercept stays unpenalized
+        Ridge(alpha=1.0 / (2 * C)),
+    )
+
+
+def predict_in_batches(model, X) -> np.ndarray:
+    """``model.predict`` over row batches of EVAL_BATCH_ROWS"""
+    if len(X) <= EVAL_BATCH_ROWS:
+        return model.predict(X)
+    return np.concatenate([
+        model.predict(X[start:start + EVAL_BATCH_ROWS]) for start in range(0, len(X), EVAL_BATCH_ROWS)
+    ])
+
+
+def train_model(df: pd.DataFrame, model_type: str, feature_columns: List[str], target_column: str,
+                progress: Optional[ProgressCallback] = None, return_pipeline: bool = False,
+                schema: Optional[Dict[str, Dict[str, Any]]] = None):
+    """Train an ML model — ``progress`` receives (done, total, stage) updates.
+
+    With ``return_pipeline`` also returns everything needed to score new rows:
+    the feature order, encoders, scaler (if any) and the fitted estimator.
+
+    ``cpu_seconds`` in the result is process CPU time over the call, so it also
+    counts anything else the service was running meanwhile.
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+
+    if progress:
+        progress(0, 1, 'preparing')
+
+    X, y, encoders = prepare_features(df, feature_columns, target_column, return_encoders=True, schema=schema)
 
     if len(X) < 10:
         raise ValueError(f"Not enough valid data to train (got {len(X)} rows, need at least 10)")
@@ -77,14 +298,16 @@ def train_model(df: pd.DataFrame, model_type: str, feature_columns: List[str], t
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
     # Only scale for models that actually need it
+    scaler = None
     if model_type in ['linear_regression', 'svm']:
+        # Scale in float64 — the compact feature dtypes are for storage, not arithmetic
         scaler = StandardScaler()
-        X_train_final = scaler.fit_transform(X_train)
-        X_test_final = scaler.transform(X_test)
+        X_train_final = scaler.fit_transform(X_train.astype(np.float64))
+        X_test_final = scaler.transform(X_test.astype(np.float64))
     else:
-        # Random Forest — no scaling needed, use raw values
-        X_train_final = X_train.values
-        X_test_final = X_test.values
+        # Random Forest — no scaling needed; trees split on float32 internally anyway
+        X_train_final = X_train.to_numpy(dtype=np.float32)
+        X_test_final = X_test.to_numpy(dtype=np.float32)
 
     # Select and configure model
     if model_type == 'linear_regression':
@@ -98,21 +321,48 @@ def train_model(df: pd.DataFrame, model_type: str, feature_columns: List[str], t
             min_samples_leaf=2,
             max_features='sqrt',
             random_state=42,
-            n_jobs=-1
+            n_jobs=1,  # raised per batch from the shared CPU budget
         )
 
     elif model_type == 'svm':
-        model = SVR(kernel='rbf', C=10, gamma='scale', cache_size=500)
+        training_path, fit_rows = svm_training_plan(len(X_train_final))
+        model = build_svm(training_path, X_train_final.shape[1], fit_rows, float(X_train_final.var()))
 
     else:
         raise ValueError(f"Unknown model type: {model_type}")
 
+    if model_type != 'svm':
+        training_path = 'exact'
+
+    # Large SVM inputs are fitted on a target-stratified subsample
+    X_fit, y_fit = X_train_final, y_train
+    if training_path == 'nystroem_subsample':
+        X_fit, y_fit = stratified_subsample(X_train_final, y_train, fit_rows)
+
     # Train
-    model.fit(X_train_final, y_train)
+    fit_start = time.perf_counter()
+    forest = None
+    with span('fit'):
+        if isinstance(model, RandomForestRegressor):
+            forest = fit_forest(model, X_fit, y_fit, progress)
+        else:
+            if progress:
+                progress(0, 1, 'fitting')
+            model.fit(X_fit, y_fit)
+            if progress:
+                progress(1, 1, 'fitting')
+    fit_time = time.perf_counter() - fit_start
+    count('fit', rows=len(y_fit))
+
+    if progress:
+        steps = model.n_estimators if isinstance(model, RandomForestRegressor) else 1
+        progress(steps, steps, 'evaluating')
 
     # Predictions
-    y_pred_train = model.predict(X_train_final)
-    y_pred_test = model.predict(X_test_final)
+    with span('predict'):
+        y_pred_train = predict_in_batches(model, X_train_final)
+        y_pred_test = predict_in_batches(model, X_test_final)
+    count('predict', rows=len(X_train_final) + len(X_test_final))
 
     # Feature importance (Random Forest only)
     feature_importance = None
@@ -142,10 +392,13 @@ def train_model(df: pd.DataFrame, model_type: str, feature_columns: List[str], t
         for actual, pred in zip(y_test.values, y_pred_test)
     ]
 
-    return {
+    result = {
         'model_type':       model_type,
         'training_samples': len(X_train),
         'test_samples':     len(X_test),
+        'fit_samples':      len(X_fit),
+        'training_path':    training_path,
+        'fit_time':         round(fit_time, 3),
         'metrics': {
             'train': {
                 'mse':  float(train_mse),
@@ -162,4 +415,23 @@ def train_model(df: pd.DataFrame, model_type: str, feature_columns: List[str], t
         },
         'predictions':        predictions[:20],
         'feature_importance': feature_importance
-    }
\ No newline at end of file
+    }
+
+    if forest is not None:
+        result['trees_used'] = forest['trees_used']
+        result['forest'] = forest
+
+    result['wall_time'] = round(time.perf_counter() - wall_start, 3)
+    result['cpu_seconds'] = round(time.process_time() - cpu_start, 3)
+
+    if return_pipeline:
+        pipeline = {
+            'model_type': model_type,
+            'features':   list(feature_columns),
+            'target':     target_column,
+            'encoders':   encoders,
+            'scaler':     scaler,
+            'model':      model,
+        }
+        return result, pipeline
+    return result
\ No newline at end of file
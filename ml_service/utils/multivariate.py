@@ -0,0 +1,224 @@
+"""Multivariate outlier detection — Isolation Forest or robust Mahalanobis (MCD).
+
+The detector is fitted on a seeded subsample of at most OUTLIER_FIT_ROWS
+rows. Its threshold is the (1 - contamination) quantile of the subsample's
+scores. Every row is then scored in OUTLIER_BATCH_ROWS batches, which threads
+from the shared CPU budget score in parallel. Only a running top-k, an
+outlier count and the requested window of per-row scores are kept, so memory
+stays at a few batches whatever the file size.
+
+Scores are oriented so that higher means more anomalous: the negated
+``score_samples`` of the forest (about 0.5 for ordinary rows, towards 1
+for anomalies), or the squared robust Mahalanobis distance for MCD.
+"""
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.workers import cpu_budget
+
+OUTLIER_METHODS = ('isolation_forest', 'mcd')
+
+# Rows the detector is fitted on — MCD cost grows quickly with it
+OUTLIER_FIT_ROWS = int(os.environ.get('ML_OUTLIER_FIT_ROWS', '20000'))
+
+# Rows scored per batch; at most two batches per scoring thread are held at once
+OUTLIER_BATCH_ROWS = int(os.environ.get('ML_OUTLIER_BATCH_ROWS', '65536'))
+
+# Share of rows treated as outliers unless the request sets 'contamination'
+OUTLIER_CONTAMINATION = float(os.environ.get('ML_OUTLIER_CONTAMINATION', '0.01'))
+
+OUTLIER_TOP_K = 100
+
+# Boolean column added by the flag_outliers cleaning method
+FLAG_COLUMN = 'is_outlier'
+
+
+def feature_columns(frame: pd.DataFrame, columns: Optional[List[str]] = None) -> List[str]:
+    """Numeric columns the detector uses — constant ones carry no signal and make MCD singular.
+
+    Raises ``ValueError`` for unknown or non-numeric columns, or when none are usable.
+    """
+    if columns:
+        unknown = [col for col in columns if col not in frame.columns]
+        if unknown:
+            raise ValueError(f"Column(s) not found: {unknown}")
+        non_numeric = [col for col in columns if not pd.api.types.is_numeric_dtype(frame[col])
+                       or pd.api.types.is_bool_dtype(frame[col])]
+        if non_numeric:
+            raise ValueError(f"Outlier detection needs numeric columns: {non_numeric}")
+    candidates = columns or list(frame.select_dtypes(include=[np.number]).columns)
+    features = [col for col in candidates if frame[col].nunique(dropna=True) > 1]
+    if not features:
+        raise ValueError("No non-constant numeric columns to detect outliers on")
+    return features
+
+
+class OutlierScorer:
+    """A detector fitted on a sample frame, with its outlier threshold"""
+
+    def __init__(self, sample: pd.DataFrame, method: str = 'isolation_forest',
+                 columns: Optional[List[str]] = None,
+                 contamination: float = OUTLIER_CONTAMINATION, seed: int = 0):
+        if method not in OUTLIER_METHODS:
+            raise ValueError(f"Unknown outlier method: {method}")
+        self.method        = method
+        self.columns       = feature_columns(sample, columns)
+        self.contamination = contamination
+
+        # Gaps are scored at the column median — rows aren't dropped for a missing value
+        X = self._matrix(sample, fill=False)
+        with np.errstate(all='ignore'):
+            self.fill = np.nan_to_num(np.nanmedian(X, axis=0))
+        X = np.where(np.isnan(X), self.fill, X)
+
+        if method == 'isolation_forest':
+            from sklearn.ensemble import IsolationForest
+            self.model = IsolationForest(n_estimators=100, random_state=seed, n_jobs=1).fit(X)
+        else:
+            from sklearn.covariance import MinCovDet
+            self.model = MinCovDet(random_state=seed).fit(X)
+
+        self.threshold = float(np.quantile(self._score_matrix(X), 1 - contamination))
+
+    def _matrix(self, frame: pd.DataFrame, fill: bool = True) -> np.ndarray:
+        X = np.column_stack([frame[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in self.columns])
+        return np.where(np.isnan(X), self.fill, X) if fill else X
+
+    def _score_matrix(self, X: np.ndarray) -> np.ndarray:
+        if self.method == 'isolation_forest':
+            return -self.model.score_samples(X)
+        return self.model.mahalanobis(X)
+
+    def score(self, frame: pd.DataFrame) -> np.ndarray:
+        """Anomaly score per row of ``frame`` — higher is more anomalous"""
+        return self._score_matrix(self._matrix(frame))
+
+
+def iter_scores(scorer: OutlierScorer,
+                batches: Iterator[Tuple[int, pd.DataFrame]]) -> Iterator[Tuple[int, np.ndarray]]:
+    """Score ``(start row, frame)`` batches on the CPU budget's threads, yielding ``(start, scores)`` in order"""
+    with cpu_budget.reserve() as n_jobs, ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        pending = deque()
+        for start, batch in batches:
+            pending.append((start, pool.submit(scorer.score, batch)))
+            # Bounded read-ahead — the reader never gets far ahead of the scorers
+            if len(pending) >= 2 * n_jobs:
+                start, future = pending.popleft()
+                yield start, future.result()
+        while pending:
+            start, future = pending.popleft()
+            yield start, future.result()
+
+
+def _merge_top(top: Tuple[np.ndarray, np.ndarray], rows: np.ndarray, scores: np.ndarray,
+               k: int) -> Tuple[np.ndarray, np.ndarray]:
+    rows, scores = np.concatenate([top[0], rows]), np.concatenate([top[1], scores])
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[keep], scores[keep]
+    return rows, scores
+
+
+def _report(scorer: OutlierScorer, rows: int, outliers: int,
+            top: Tuple[np.ndarray, np.ndarray]) -> Dict[str, Any]:
+    order = np.argsort(-top[1], kind='stable')
+    return {
+        'method':         scorer.method,
+        'features':       scorer.columns,
+        'contamination':  scorer.contamination,
+        'threshold':      scorer.threshold,
+        'rows':           rows,
+        'total_outliers': outliers,
+        'percentage':     float(outliers / rows * 100) if rows else 0.0,
+        'top':            [{'row': int(top[0][i]), 'score': float(top[1][i])} for i in order],
+    }
+
+
+def _summarize(scorer: OutlierScorer, batches: Iterator[Tuple[int, pd.DataFrame]],
+               top_k: int, offset: int, limit: int) -> Dict[str, Any]:
+    """Score ``batches`` keeping only the top-k, the outlier count and scores of rows [offset, offset + limit)"""
+    rows, outliers = 0, 0
+    top = (np.empty(0, dtype=np.int64), np.empty(0))
+    window: List[float] = []
+    for start, scores in iter_scores(scorer, batches):
+        rows += len(scores)
+        outliers += int((scores > scorer.threshold).sum())
+        top = _merge_top(top, np.arange(start, start + len(scores)), scores, top_k)
+        lo, hi = max(offset - start, 0), min(offset + limit - start, len(scores))
+        if lo < hi:
+            window.extend(scores[lo:hi].tolist())
+
+    report = _report(scorer, rows, outliers, top)
+    report.update({'offset': offset, 'scores': window})
+    return report
+
+
+def detect_multivariate(filepath: str, method: str = 'isolation_forest',
+                        columns: Optional[List[str]] = None,
+                        contamination: float = OUTLIER_CONTAMINATION,
+                        top_k: int = OUTLIER_TOP_K, seed: int = 0,
+                        offset: int = 0, limit: int = 0) -> Dict[str, Any]:
+    """Score every row of the dataset in batches without loading it whole.
+
+    Returns the ``top_k`` highest-scoring rows (0-based row numbers, as used
+    by /rows), the number of rows above the threshold and the per-row scores
+    of rows ``[offset, offset + limit)`` under 'scores'.
+    """
+    from utils.sampling import sample_dataset
+    from utils.storage import iter_dataset_chunks
+
+    sample, _ = sample_dataset(filepath, OUTLIER_FIT_ROWS, seed)
+    scorer = OutlierScorer(sample, method, columns, contamination, seed)
+    del sample
+
+    def batches() -> Iterator[Tuple[int, pd.DataFrame]]:
+        start = 0
+        for chunk in iter_dataset_chunks(filepath, columns=scorer.columns, chunksize=OUTLIER_BATCH_ROWS):
+            yield start, chunk
+            start += len(chunk)
+
+    return _summarize(scorer, batches(), top_k, offset, limit)
+
+
+def _fit_frame(df: pd.DataFrame, method: str, columns: Optional[List[str]],
+               contamination: float, seed: int) -> OutlierScorer:
+    sample = df.sample(OUTLIER_FIT_ROWS, random_state=seed) if len(df) > OUTLIER_FIT_ROWS else df
+    return OutlierScorer(sample, method, columns, contamination, seed)
+
+
+def _frame_batches(df: pd.DataFrame) -> Iterator[Tuple[int, pd.DataFrame]]:
+    for start in range(0, len(df), OUTLIER_BATCH_ROWS):
+        yield start, df.iloc[start:start + OUTLIER_BATCH_ROWS]
+
+
+def score_frame(df: pd.DataFrame, method: str = 'isolation_forest',
+                columns: Optional[List[str]] = None,
+                contamination: float = OUTLIER_CONTAMINATION,
+                seed: int = 0) -> Tuple[np.ndarray, OutlierScorer]:
+    """Per-row anomaly scores of an in-memory frame, fitted on a subsample of it"""
+    scorer = _fit_frame(df, method, columns, contamination, seed)
+
+    scores = np.empty(len(df))
+    for start, batch_scores in iter_scores(scorer, _frame_batches(df)):
+        scores[start:start + len(batch_scores)] = batch_scores
+    return scores, scorer
+
+
+def outlier_report(df: pd.DataFrame, method: str = 'isolation_forest',
+                   top_k: int = OUTLIER_TOP_K, scores: bool = False) -> Dict[str, Any]:
+    """An in-memory frame summarized like ``detect_multivariate`` — top-k and counts.
+
+    Every row's score is only included with ``scores=True``; without it the
+    extra memory stays at a few batches however large the frame.
+    """
+    scorer = _fit_frame(df, method, None, OUTLIER_CONTAMINATION, 0)
+    report = _summarize(scorer, _frame_batches(df), top_k, 0, len(df) if scores else 0)
+    if not scores:
+        del report['scores']
+    del report['offset']
+    return report
@@ -0,0 +1,200 @@
+"""Local model registry — persisted training pipelines plus a hot-model LRU for /predict.
+
+Saved models share a disk budget (ML_MODEL_STORE_MB). When a new model
+pushes the store over it, the least recently used models are deleted; use
+is the pipeline file's mtime, bumped on every load and prediction.
+"""
+import copy
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.metrics import count, span
+from utils.models import encode_features
+
+MODEL_DIR = os.environ.get('ML_MODEL_DIR', 'models')
+
+# Fitted pipelines kept loaded in memory for low-latency scoring
+MODEL_CACHE_SIZE = int(os.environ.get('ML_MODEL_CACHE_SIZE', '8'))
+
+# Total disk the saved models may use before the least recently used are deleted
+MODEL_STORE_MAX_MB = float(os.environ.get('ML_MODEL_STORE_MB', '2048'))
+
+# Rows scored per predict() call — bounds temporaries on file scoring
+PREDICT_BATCH_ROWS = 100_000
+
+# Below this many rows, thread fan-out (n_jobs) costs more than the prediction itself
+SINGLE_THREAD_MAX_ROWS = 1000
+
+PIPELINE_FILE = 'pipeline.joblib'
+META_FILE = 'meta.json'
+
+
+def _model_path(model_id: str, name: str) -> str:
+    # Model IDs are generated hex strings — reject anything that could escape MODEL_DIR
+    if not model_id.isalnum():
+        raise KeyError(model_id)
+    return os.path.join(MODEL_DIR, model_id, name)
+
+
+def save_model(pipeline: Dict[str, Any], metadata: Dict[str, Any]) -> str:
+    """Persist a fitted pipeline and its metadata, returning the new model ID"""
+    model_id = uuid.uuid4().hex
+    os.makedirs(os.path.join(MODEL_DIR, model_id), exist_ok=True)
+
+    joblib.dump(pipeline, _model_path(model_id, PIPELINE_FILE))
+    meta = {
+        'model_id':   model_id,
+        'model_type': pipeline['model_type'],
+        'features':   pipeline['features'],
+        'target':     pipeline['target'],
+        'created_at': time.time(),
+        **metadata,
+    }
+    with open(_model_path(model_id, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    _hot_models.put(model_id, pipeline)
+    _evict_models(keep=model_id)
+    return model_id
+
+
+def get_model_meta(model_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_model_path(model_id, META_FILE)) as f:
+            return json.load(f)
+    except (KeyError, FileNotFoundError):
+        return None
+
+
+def list_models() -> List[Dict[str, Any]]:
+    if not os.path.isdir(MODEL_DIR):
+        return []
+    metas = [get_model_meta(model_id) for model_id in os.listdir(MODEL_DIR)]
+    return sorted((m for m in metas if m), key=lambda m: m['created_at'], reverse=True)
+
+
+class ModelCache:
+    """LRU of loaded pipelines so repeated predictions skip joblib deserialization"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, model_id: str, pipeline: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[model_id] = pipeline
+            self._entries.move_to_end(model_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pipeline = self._entries.get(model_id)
+            if pipeline is not None:
+                self._entries.move_to_end(model_id)
+        if pipeline is not None:
+            _touch(model_id)
+            return pipeline
+
+        try:
+            pipeline = joblib.load(_model_path(model_id, PIPELINE_FILE))
+        except (KeyError, FileNotFoundError):
+            return None
+        _touch(model_id)
+        self.put(model_id, pipeline)
+        return pipeline
+
+    def discard(self, model_id: str) -> None:
+        with self._lock:
+            self._entries.pop(model_id, None)
+
+
+_hot_models = ModelCache(MODEL_CACHE_SIZE)
+_evict_lock = threading.Lock()
+
+
+def _touch(model_id: str) -> None:
+    try:
+        os.utime(_model_path(model_id, PIPELINE_FILE))
+    except (KeyError, FileNotFoundError):
+        # Evicted meanwhile — the loaded pipeline still answers this request
+        pass
+
+
+def _evict_models(keep: str) -> None:
+    """Delete least recently used models until the store fits MODEL_STORE_MAX_MB — never ``keep``"""
+    with _evict_lock:
+        models = []
+        for entry in os.scandir(MODEL_DIR):
+            if not entry.is_dir():
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                used = os.stat(os.path.join(entry.path, PIPELINE_FILE)).st_mtime
+            except FileNotFoundError:
+                continue
+            models.append((used, size, entry.name))
+
+        total = sum(size for _, size, _ in models)
+        for _, size, model_id in sorted(models):
+            if total <= MODEL_STORE_MAX_MB * 1024 * 1024:
+                break
+            if model_id == keep:
+                continue
+            shutil.rmtree(os.path.join(MODEL_DIR, model_id), ignore_errors=True)
+            _hot_models.discard(model_id)
+            total -= size
+
+
+def load_model(model_id: str) -> Optional[Dict[str, Any]]:
+    return _hot_models.get(model_id)
+
+
+def predict(pipeline: Dict[str, Any], df: pd.DataFrame) -> np.ndarray:
+    """Score rows with a stored pipeline — NaN where a feature can't be encoded or a category is unseen"""
+    with span('predict'):
+        predictions = _predict(pipeline, df)
+    count('predict', rows=len(df))
+    return predictions
+
+
+def _predict(pipeline: Dict[str, Any], df: pd.DataFrame) -> np.ndarray:
+    X = encode_features(df, pipeline['features'], pipeline['encoders'])
+    valid = X.notna().all(axis=1).to_numpy()
+    # Categories the model never saw encode as -1 — they can't be scored either
+    for col in pipeline['features']:
+        if pipeline['encoders'][col]['kind'] == 'categorical':
+            valid &= X[col].to_numpy() != -1
+    predictions = np.full(len(X), np.nan)
+
+    X_valid = X[valid]
+    scored = np.empty(len(X_valid))
+
+    model = pipeline['model']
+    if len(X_valid) <= SINGLE_THREAD_MAX_ROWS and getattr(model, 'n_jobs', None) not in (None, 1):
+        # Shallow copy shares the fitted trees — only n_jobs differs
+        model = copy.copy(model)
+        model.n_jobs = 1
+
+    for start in range(0, len(X_valid), PREDICT_BATCH_ROWS):
+        batch = X_valid.iloc[start:start + PREDICT_BATCH_ROWS]
+        # The scaler was fitted on a DataFrame, the estimators on plain arrays
+        if pipeline['scaler'] is not None:
+            values = pipeline['scaler'].transform(batch.astype(np.float64))
+        else:
+            values = batch.to_numpy(dtype=np.float64)
+        scored[start:start + PREDICT_BATCH_ROWS] = model.predict(values)
+
+    predictions[valid] = scored
+    return predictions
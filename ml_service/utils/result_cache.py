@@ -0,0 +1,108 @@
+"""Disk-backed memo of expensive responses (/analyze, /train).
+
+Entries are JSON files named by the hash of their key, which always starts
+with the dataset's content identity (see ``snapshots.dataset_identity``), so
+a changed dataset simply stops matching old entries. Total size is bounded by
+ML_RESULT_CACHE_MB; the least recently read entries are evicted first
+(reads bump the file's mtime).
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+RESULT_CACHE_DIR = os.environ.get('ML_RESULT_CACHE_DIR', os.path.join('cache', 'results'))
+RESULT_CACHE_MAX_MB = float(os.environ.get('ML_RESULT_CACHE_MB', '256'))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+class ResultCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: Any) -> str:
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, key: Any) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        try:
+            payload = json.dumps(value, default=_json_default)
+        except (TypeError, ValueError):
+            # Not representable as JSON — just don't memoize it
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _entries(self):
+        try:
+            return [e for e in os.scandir(self.directory) if e.name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries()]
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries':   len(entries),
+                'bytes':     sum(e.stat().st_size for e in entries),
+                'max_bytes': self.max_bytes,
+                'hits':      self.hits,
+                'misses':    self.misses,
+                'evictions': self.evictions,
+                'hit_rate':  round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+result_cache = ResultCache(RESULT_CACHE_DIR, int(RESULT_CACHE_MAX_MB * 1024 * 1024))
@@ -0,0 +1,224 @@
+"""Paged access to a dataset's rows for data grids.
+
+Pages are read straight from the Parquet working copy. The footer gives each
+row group's row count, so rows ``[offset, offset + limit)`` map to the one or
+two row groups holding them, and only those are read — projected to the
+requested columns. Page N never parses the N pages before it.
+
+Filtering and sorting need the filter/sort columns of every row. Their result
+(the matching row numbers in display order) is kept in a small LRU keyed by
+dataset signature, so every further page of the same view is again a read of
+a few row groups.
+
+Datasets without a working copy (mixed-type Excel columns) are paged from the
+cached frame with the same semantics.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.dataset_cache import dataset_cache
+from utils.metrics import count, span
+from utils.storage import has_working_copy, working_path
+
+# Largest page a single request may ask for
+ROWS_MAX_LIMIT = int(os.environ.get('ML_ROWS_MAX_LIMIT', '10000'))
+
+# Memory for cached filter/sort results (row number arrays)
+ROW_INDEX_CACHE_MB = float(os.environ.get('ML_ROW_INDEX_CACHE_MB', '64'))
+
+FILTER_OPS = ('eq', 'ne', 'gt', 'ge', 'lt', 'le', 'contains', 'in', 'isnull', 'notnull')
+
+_COMPARISONS = {
+    'eq': lambda values, v: values == v,
+    'ne': lambda values, v: values != v,
+    'gt': lambda values, v: values > v,
+    'ge': lambda values, v: values >= v,
+    'lt': lambda values, v: values < v,
+    'le': lambda values, v: values <= v,
+}
+
+
+def _filter_value(values: pd.Series, column: str, value: Any) -> Any:
+    """Coerce a JSON filter value to the column's type so comparisons don't go by string"""
+    if value is None or not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Filter value for numeric column '{column}' must be a number, got {value!r}")
+
+
+def filter_mask(frame: pd.DataFrame, filters: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Boolean mask of the rows matching every filter — missing values never match a comparison"""
+    mask = np.ones(len(frame), dtype=bool)
+    for spec in filters:
+        column, op, value = spec['column'], spec['op'], spec.get('value')
+        values = frame[column]
+        if op == 'isnull':
+            matched = values.isna()
+        elif op == 'notnull':
+            matched = values.notna()
+        elif op == 'contains':
+            matched = values.astype('string').str.contains(str(value), case=False, regex=False, na=False)
+        elif op == 'in':
+            if not isinstance(value, list):
+                raise ValueError(f"Filter 'in' on '{column}' needs a list value")
+            matched = values.isin([_filter_value(values, column, v) for v in value])
+        elif op in _COMPARISONS:
+            try:
+                matched = _COMPARISONS[op](values, _filter_value(values, column, value)) & values.notna()
+            except TypeError:
+                raise ValueError(f"Can't compare column '{column}' with {value!r}")
+        else:
+            raise ValueError(f"Unknown filter op '{op}'. Use one of: {', '.join(FILTER_OPS)}")
+        mask &= np.asarray(matched, dtype=bool)
+    return mask
+
+
+def sort_order(values: pd.Series, descending: bool = False) -> np.ndarray:
+    """Positions of ``values`` in sorted order — stable, missing values last either way"""
+    ordered = values.reset_index(drop=True).sort_values(ascending=not descending, kind='stable', na_position='last')
+    return ordered.index.to_numpy()
+
+
+class RowIndexCache:
+    """LRU of filter/sort results (int64 row numbers) bounded by their total size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple, np.ndarray]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+            return rows
+
+    def put(self, key: Tuple, rows: np.ndarray) -> None:
+        with self._lock:
+            if key in self._entries or rows.nbytes > self.max_bytes:
+                return
+            while self._entries and self._bytes + rows.nbytes > self.max_bytes:
+                _, oldest = self._entries.popitem(last=False)
+                self._bytes -= oldest.nbytes
+            self._entries[key] = rows
+            self._bytes += rows.nbytes
+
+
+row_index_cache = RowIndexCache(int(ROW_INDEX_CACHE_MB * 1024 * 1024))
+
+
+class ParquetRows:
+    """Row-addressed reads from a Parquet working copy via its row-group index"""
+
+    def __init__(self, path: str):
+        import pyarrow.parquet as pq
+        self.file = pq.ParquetFile(path, memory_map=True)
+        metadata = self.file.metadata
+        sizes = [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)]
+        # starts[i] is the first row of group i; starts[-1] is the row count
+        self.starts = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+        self.columns = list(self.file.schema_arrow.names)
+
+    @property
+    def num_rows(self) -> int:
+        return int(self.starts[-1])
+
+    def read_columns(self, columns: List[str]) -> pd.DataFrame:
+        return self.file.read(columns=columns).to_pandas()
+
+    def slice(self, offset: int, limit: int, columns: List[str]) -> pd.DataFrame:
+        """Rows ``[offset, offset + limit)``, reading only the row groups that hold them"""
+        stop = min(offset + limit, self.num_rows)
+        if offset >= stop:
+            return self.file.schema_arrow.empty_table().select(columns).to_pandas()
+        first = int(np.searchsorted(self.starts, offset, side='right')) - 1
+        last = int(np.searchsorted(self.starts, stop, side='left'))
+        table = self.file.read_row_groups(list(range(first, last)), columns=columns)
+        return table.slice(offset - int(self.starts[first]), stop - offset).to_pandas()
+
+    def take(self, rows: np.ndarray, columns: List[str]) -> pd.DataFrame:
+        """Rows at the given positions, in that order, reading only the row groups that hold them"""
+        if len(rows) == 0:
+            return self.file.schema_arrow.empty_table().select(columns).to_pandas()
+        groups = np.searchsorted(self.starts, rows, side='right') - 1
+        needed = np.unique(groups)
+        table = self.file.read_row_groups(needed.tolist(), columns=columns)
+
+        # Where each needed group begins inside the concatenated table
+        sizes = self.starts[needed + 1] - self.starts[needed]
+        table_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        local = rows - self.starts[groups] + table_starts[np.searchsorted(needed, groups)]
+        return table.take(local).to_pandas()
+
+
+def _view_key(filepath: str, filters: Sequence[Dict[str, Any]], sort_by: Optional[str],
+              descending: bool) -> Tuple:
+    filter_key = tuple(
+        (f['column'], f['op'], repr(f.get('value'))) for f in filters
+    )
+    return (os.path.abspath(filepath), dataset_cache.signature(filepath), filter_key, sort_by, descending)
+
+
+def _view_rows(frame: pd.DataFrame, filters: Sequence[Dict[str, Any]], sort_by: Optional[str],
+               descending: bool) -> np.ndarray:
+    """Matching row numbers in display order"""
+    rows = np.flatnonzero(filter_mask(frame, filters)) if filters else np.arange(len(frame))
+    if sort_by is not None:
+        rows = rows[sort_order(frame[sort_by].iloc[rows], descending)]
+    return rows.astype(np.int64)
+
+
+def read_page(filepath: str, offset: int, limit: int, columns: Optional[List[str]] = None,
+              filters: Sequence[Dict[str, Any]] = (), sort_by: Optional[str] = None,
+              descending: bool = False) -> Dict[str, Any]:
+    """One page of the dataset's rows plus the counts a grid needs to size its scrollbar.
+
+    Returns ``{'frame', 'total_rows', 'matched_rows', 'columns'}``. Raises
+    ``KeyError`` for unknown columns and ``ValueError`` for malformed filters.
+    """
+    if not has_working_copy(filepath):
+        # First touch converts the raw upload; mixed-type files stay in memory only
+        dataset_cache.get(filepath)
+
+    source = ParquetRows(working_path(filepath)) if has_working_copy(filepath) else None
+    available = source.columns if source is not None else list(dataset_cache.get(filepath).columns)
+
+    wanted = list(columns) if columns else available
+    view_columns = list(dict.fromkeys([f['column'] for f in filters] + ([sort_by] if sort_by else [])))
+    unknown = [c for c in wanted + view_columns if c not in available]
+    if unknown:
+        raise KeyError(f"Columns not found: {sorted(set(unknown))}")
+
+    rows = None
+    if filters or sort_by:
+        key = _view_key(filepath, filters, sort_by, descending)
+        rows = row_index_cache.get(key)
+        if rows is None:
+            with span('filter'):
+                frame = source.read_columns(view_columns) if source is not None else dataset_cache.get(filepath)
+                rows = _view_rows(frame, filters, sort_by, descending)
+            count('filter', rows=len(frame))
+            row_index_cache.put(key, rows)
+
+    total = source.num_rows if source is not None else len(dataset_cache.get(filepath))
+    matched = total if rows is None else len(rows)
+
+    with span('load'):
+        if source is not None:
+            page = source.slice(offset, limit, wanted) if rows is None else source.take(rows[offset:offset + limit], wanted)
+        else:
+            df = dataset_cache.get(filepath)
+            positions = np.arange(offset, min(offset + limit, total)) if rows is None else rows[offset:offset + limit]
+            page = df.iloc[positions][wanted].reset_index(drop=True)
+    count('load', rows=len(page))
+
+    return {'frame': page, 'total_rows': total, 'matched_rows': matched, 'columns': wanted}
@@ -0,0 +1,294 @@
+"""Sample-based "quick" profiling with confidence intervals.
+
+A seeded uniform sample of rows is profiled with ``profile_dataset`` and
+the counts are scaled to the full row count:
+
+- with a Parquet working copy, only sampled rows are read. The sample is
+  stratified by row group (proportional allocation). Past
+  QUICK_MAX_ROW_GROUPS groups, a seeded subset of groups is drawn first
+  (two-stage sampling), so the I/O stays bounded whatever the file size
+- without one, a bottom-k reservoir keeps the rows with the k smallest
+  random keys over one streaming pass
+
+Proportions (missing and outlier shares) get Wilson intervals; under
+two-stage sampling their sample size is shrunk by the design effect
+estimated from the between-row-group variance. Mean, std, skewness and
+kurtosis get delete-a-group jackknife intervals, which stay honest on
+heavy-tailed data. Duplicates can't be scaled linearly: a pair survives
+sampling with probability f², so the estimate is sample duplicates / f².
+"""
+import math
+import os
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import ZSCORE_THRESHOLD, profile_dataset
+from utils.storage import has_working_copy, iter_dataset_chunks, working_path
+
+# Rows profiled by analysisType='quick' unless the request sets sampleSize
+QUICK_SAMPLE_ROWS = int(os.environ.get('ML_QUICK_SAMPLE_ROWS', '50000'))
+
+# Row groups read at most — above this a random subset of groups is sampled first
+QUICK_MAX_ROW_GROUPS = int(os.environ.get('ML_QUICK_MAX_ROW_GROUPS', '32'))
+
+# Random groups the moment intervals are jackknifed over
+JACKKNIFE_GROUPS = 20
+
+CONFIDENCE_LEVEL = 0.95
+_Z = NormalDist().inv_cdf(0.5 + CONFIDENCE_LEVEL / 2)
+
+Interval = Tuple[float, float]
+
+
+def _allocate(sizes: np.ndarray, total: int) -> np.ndarray:
+    """Split ``total`` across strata proportionally to ``sizes`` (largest remainder)"""
+    exact = sizes / sizes.sum() * total
+    alloc = np.floor(exact).astype(np.int64)
+    short = total - int(alloc.sum())
+    if short > 0:
+        alloc[np.argsort(alloc - exact)[:short]] += 1
+    return np.minimum(alloc, sizes)
+
+
+def _sample_parquet(filepath: str, size: int, seed: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    from utils.rows import ParquetRows
+
+    source = ParquetRows(working_path(filepath))
+    total = source.num_rows
+    sizes = np.diff(source.starts)
+    rng = np.random.default_rng(seed)
+
+    if size >= total:
+        frame = source.slice(0, total, source.columns)
+        return frame, {'total_rows': total, 'method': 'full', 'row_groups_read': len(sizes), 'clusters': None}
+
+    groups = np.arange(len(sizes))
+    method = 'stratified'
+    if len(groups) > QUICK_MAX_ROW_GROUPS:
+        groups = np.sort(rng.choice(len(sizes), QUICK_MAX_ROW_GROUPS, replace=False))
+        method = 'two-stage'
+
+    alloc = _allocate(sizes[groups], size)
+    positions = np.concatenate([
+        source.starts[g] + np.sort(rng.choice(sizes[g], k, replace=False))
+        for g, k in zip(groups, alloc) if k > 0
+    ])
+    frame = source.take(positions, source.columns)
+    clusters = np.repeat(groups, alloc) if method == 'two-stage' else None
+    return frame, {'total_rows': total, 'method': method, 'row_groups_read': int((alloc > 0).sum()), 'clusters': clusters}
+
+
+def _sample_reservoir(filepath: str, size: int, seed: int) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    held: Optional[pd.DataFrame] = None
+    keys = np.empty(0)
+    total = 0
+
+    for chunk in iter_dataset_chunks(filepath):
+        total += len(chunk)
+        chunk_keys = rng.random(len(chunk))
+        if held is None:
+            held, keys = chunk.reset_index(drop=True), chunk_keys
+        else:
+            held = pd.concat([held, chunk], ignore_index=True)
+            keys = np.concatenate([keys, chunk_keys])
+        if len(held) > size:
+            # Bottom-k: the k smallest keys are a uniform sample; keep file order
+            keep = np.sort(np.argpartition(keys, size)[:size])
+            held, keys = held.iloc[keep].reset_index(drop=True), keys[keep]
+
+    frame = held if held is not None else pd.DataFrame()
+    method = 'full' if len(frame) == total else 'reservoir'
+    return frame, {'total_rows': total, 'method': method, 'row_groups_read': None, 'clusters': None}
+
+
+def sample_dataset(filepath: str, size: int = QUICK_SAMPLE_ROWS, seed: int = 0) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """A seeded uniform sample of at most ``size`` rows plus how it was drawn"""
+    if has_working_copy(filepath):
+        return _sample_parquet(filepath, size, seed)
+    return _sample_reservoir(filepath, size, seed)
+
+
+def _design_effect(indicator: np.ndarray, clusters: Optional[np.ndarray]) -> float:
+    """Variance of a mean under the cluster sample relative to simple random sampling (>= 1)"""
+    if clusters is None or len(indicator) < 2:
+        return 1.0
+    _, codes = np.unique(clusters, return_inverse=True)
+    m = codes.max() + 1
+    if m < 2:
+        return 1.0
+    srs_var = indicator.var(ddof=1) / len(indicator)
+    if srs_var <= 0:
+        return 1.0
+    cluster_means = np.bincount(codes, weights=indicator) / np.bincount(codes)
+    return max(1.0, float(cluster_means.var(ddof=1) / m / srs_var))
+
+
+def _wilson(share: float, n_eff: float) -> Interval:
+    """Wilson score interval for a proportion — sensible at 0 and 1, unlike the normal one"""
+    if n_eff <= 0:
+        return (0.0, 1.0)
+    z2 = _Z ** 2
+    centre = (share + z2 / (2 * n_eff)) / (1 + z2 / n_eff)
+    half = _Z * math.sqrt(share * (1 - share) / n_eff + z2 / (4 * n_eff ** 2)) / (1 + z2 / n_eff)
+    return (max(0.0, centre - half), min(1.0, centre + half))
+
+
+def _proportion(indicator: np.ndarray, clusters: Optional[np.ndarray], fpc: float) -> Interval:
+    n = len(indicator)
+    if n == 0:
+        return (0.0, 1.0)
+    share = float(indicator.mean())
+    if fpc <= 0:
+        return (share, share)
+    n_eff = n / (_design_effect(indicator.astype(np.float64), clusters) * fpc)
+    return _wilson(share, n_eff)
+
+
+def _round(interval: Interval, scale: float = 1.0, digits: int = 4) -> list:
+    return [round(interval[0] * scale, digits), round(interval[1] * scale, digits)]
+
+
+def _moments(sums: np.ndarray) -> np.ndarray:
+    """(mean, std, skewness, excess kurtosis) per row of power sums [n, Σx, Σx², Σx³, Σx⁴]"""
+    n = sums[..., 0]
+    mean = sums[..., 1] / n
+    raw2, raw3, raw4 = sums[..., 2] / n, sums[..., 3] / n, sums[..., 4] / n
+    m2 = raw2 - mean ** 2
+    m3 = raw3 - 3 * mean * raw2 + 2 * mean ** 3
+    m4 = raw4 - 4 * mean * raw3 + 6 * mean ** 2 * raw2 - 3 * mean ** 4
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.sqrt(m2 * n / (n - 1))
+        return np.stack([mean, std, m3 / m2 ** 1.5, m4 / m2 ** 2 - 3], axis=-1)
+
+
+def _moment_intervals(values: np.ndarray, clusters: Optional[np.ndarray], fpc: float,
+                      stats: Dict[str, Any], seed: int) -> Dict[str, list]:
+    """Delete-a-group jackknife intervals for mean, std, skewness and kurtosis.
+
+    Normal-theory errors (sqrt(6/n) for skewness, ...) hold only for normal
+    data and are far too narrow on heavy tails; the jackknife isn't. Groups
+    are the sampled row groups under two-stage sampling, so the cluster
+    design is accounted for, and JACKKNIFE_GROUPS random groups otherwise.
+    """
+    if clusters is not None:
+        _, groups = np.unique(clusters, return_inverse=True)
+    else:
+        groups = np.random.default_rng(seed).integers(0, JACKKNIFE_GROUPS, len(values))
+    g = int(groups.max()) + 1 if len(groups) else 0
+    if g < 2 or len(values) < 2 * g:
+        return {}
+
+    # Power sums per group of values centred on the sample mean (keeps the sums well conditioned)
+    centred = values - values.mean()
+    powers = np.stack([np.ones_like(centred), centred, centred ** 2, centred ** 3, centred ** 4], axis=1)
+    group_sums = np.stack([np.bincount(groups, weights=powers[:, k], minlength=g) for k in range(5)], axis=1)
+    leave_out = _moments(group_sums.sum(axis=0) - group_sums)
+
+    with np.errstate(invalid='ignore'):
+        variance = (g - 1) / g * np.nansum((leave_out - np.nanmean(leave_out, axis=0)) ** 2, axis=0) * fpc
+    half = _Z * np.sqrt(variance)
+
+    intervals = {}
+    for i, key in enumerate(('mean', 'std', 'skewness', 'kurtosis')):
+        point = stats[key]
+        if np.isfinite(point) and np.isfinite(half[i]):
+            low = point - half[i] if key != 'std' else max(point - half[i], 0.0)
+            intervals[key] = _round((low, point + half[i]))
+    return intervals
+
+
+def quick_profile(filepath: str, size: int = QUICK_SAMPLE_ROWS, seed: int = 0) -> Dict[str, Any]:
+    """``profile_dataset`` of a uniform sample, scaled to the full dataset, with confidence intervals.
+
+    Returns the profile keys plus 'sample' (how the rows were drawn) and
+    'confidence_intervals'.
+    """
+    sample, info = sample_dataset(filepath, size, seed)
+    clusters = info['clusters']
+    n, total = len(sample), info['total_rows']
+    fraction = n / total if total else 1.0
+    # Finite population correction — intervals shrink to points as the sample becomes the data
+    fpc = max(1 - fraction, 0.0) if info['method'] != 'two-stage' else 1.0
+
+    profile = profile_dataset(sample)
+    summary = profile['summary']
+    missing = profile['missing_values']
+    scale = total / n if n else 0.0
+
+    intervals: Dict[str, Any] = {
+        'level': CONFIDENCE_LEVEL,
+        'missing_percentage': {},
+        'missing_count': {},
+        'outliers_iqr': {},
+        'outliers_zscore': {},
+        'moments': {},
+    }
+
+    # Missing values — scaled counts, intervals on every column's share
+    for col in sample.columns:
+        isnull = sample[col].isna().to_numpy()
+        low, high = _proportion(isnull, clusters, fpc)
+        if isnull.any():
+            missing['missing_count'][col] = int(round(isnull.mean() * total))
+        intervals['missing_percentage'][col] = _round((low, high), 100, 3)
+        intervals['missing_count'][col] = [int(math.floor(low * total)), int(math.ceil(high * total))]
+    missing['total_cells'] = total * len(sample.columns)
+    missing['total_missing'] = int(sum(missing['missing_count'].values()))
+
+    # Outliers and moments — the same indicators profile_dataset counts, per numeric column
+    outliers_iqr, outliers_zscore = profile['outliers_iqr'], profile['outliers_zscore']
+    for col, dist in profile['distributions'].items():
+        values = sample[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(values)
+        values = values[present]
+        col_clusters = clusters[present] if clusters is not None else None
+
+        q1, q3 = np.quantile(values, [0.25, 0.75])
+        iqr = q3 - q1
+        pop_std = values.std()
+        indicators = {
+            'outliers_iqr': (outliers_iqr, (values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)),
+            'outliers_zscore': (outliers_zscore, np.abs(values - values.mean()) / pop_std > ZSCORE_THRESHOLD
+                                if pop_std > 0 else np.zeros(len(values), dtype=bool)),
+        }
+        # Rows of this column in the full data, estimated from its missing share
+        present_total = total * present.mean()
+        for key, (report, flagged) in indicators.items():
+            low, high = _proportion(flagged, col_clusters, fpc)
+            if col in report['columns']:
+                report['columns'][col]['count'] = int(round(flagged.mean() * present_total))
+            intervals[key][col] = {
+                'count':      [int(math.floor(low * present_total)), int(math.ceil(high * present_total))],
+                'percentage': _round((low, high), 100, 3),
+            }
+
+        dist['count'] = int(round(present_total))
+        intervals['moments'][col] = _moment_intervals(values, col_clusters, fpc, dist, seed)
+
+    for report in (outliers_iqr, outliers_zscore):
+        report['total_outliers'] = sum(v['count'] for v in report['columns'].values())
+
+    # A duplicate pair survives sampling with probability ~ fraction^2
+    sample_duplicates = summary['duplicates']
+    duplicates = sample_duplicates if info['method'] == 'full' else min(int(round(sample_duplicates / fraction ** 2)), max(total - 1, 0))
+    summary.update({
+        'rows':                 total,
+        'memory_usage':         summary['memory_usage'] * scale,
+        'duplicates':           duplicates,
+        'duplicate_percentage': float(duplicates / total * 100) if total else 0.0,
+    })
+
+    profile['sample'] = {
+        'rows':            n,
+        'total_rows':      total,
+        'fraction':        round(fraction, 6),
+        'seed':            seed,
+        'method':          info['method'],
+        'row_groups_read': info['row_groups_read'],
+    }
+    profile['confidence_intervals'] = intervals
+    return profile
@@ -0,0 +1,48 @@
+"""Per-dataset cache of inferred feature encoders.
+
+Deciding whether a text column is numeric-as-string or categorical (and
+collecting its classes) scans the whole column. The answer only changes
+when the dataset does, so it is kept per column and keyed by the dataset
+signature — repeated /train calls with different feature subsets only infer
+the columns they haven't seen yet.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from utils.dataset_cache import dataset_cache
+from utils.models import infer_encoder
+
+# Datasets whose schemas are kept
+SCHEMA_CACHE_SIZE = int(os.environ.get('ML_SCHEMA_CACHE_SIZE', '32'))
+
+_schemas: 'OrderedDict[str, Tuple[Tuple, Dict[str, Dict[str, Any]]]]' = OrderedDict()
+_lock = threading.Lock()
+
+
+def feature_schema(filepath: str, df: pd.DataFrame, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Encoders for ``columns`` of the dataset at ``filepath``, inferring only unseen ones"""
+    key = os.path.abspath(filepath)
+    signature = dataset_cache.signature(filepath)
+
+    with _lock:
+        entry = _schemas.get(key)
+        if entry is None or entry[0] != signature:
+            entry = (signature, {})
+            _schemas[key] = entry
+        _schemas.move_to_end(key)
+        while len(_schemas) > SCHEMA_CACHE_SIZE:
+            _schemas.popitem(last=False)
+        known = dict(entry[1])
+
+    inferred = {col: infer_encoder(df[col]) for col in columns if col not in known}
+    if inferred:
+        with _lock:
+            entry[1].update(inferred)
+        known.update(inferred)
+
+    return {col: known[col] for col in columns}
+
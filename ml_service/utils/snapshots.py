@@ -0,0 +1,159 @@
+"""Versioned snapshots of a dataset so cleaning can be undone.
+
+Each upload gets a ``<upload>.versions/`` directory holding one file per
+version plus ``history.json``. Version 0 is the data as it was before the
+first clean. Snapshots are hard links to the file that backs the dataset
+(falling back to a copy), which is safe because every writer replaces files
+atomically instead of writing into them.
+
+A clean (load, save, ``record_version``) or an undo must hold the file's
+``write_lock`` throughout, so two of them never interleave their writes to
+the working copy and ``history.json``.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.content import content_hash
+from utils.dataset_cache import source_path
+from utils.excel import selected_sheet
+from utils.storage import link_or_copy, mark_raw_stale, working_path, STALE_SUFFIX
+
+HISTORY_FILE = 'history.json'
+
+# Fixed pool of per-file write locks — a file hashes to one, so the pool never grows
+WRITE_LOCK_STRIPES = 64
+
+_write_locks = [threading.Lock() for _ in range(WRITE_LOCK_STRIPES)]
+
+
+def write_lock(filepath: str) -> threading.Lock:
+    """The lock serializing cleans and undos of ``filepath`` (files sharing a stripe wait too)"""
+    return _write_locks[hash(os.path.abspath(filepath)) % WRITE_LOCK_STRIPES]
+
+
+def versions_dir(filepath: str) -> str:
+    return filepath + '.versions'
+
+
+def load_history(filepath: str) -> Dict[str, Any]:
+    path = os.path.join(versions_dir(filepath), HISTORY_FILE)
+    if not os.path.exists(path):
+        return {'current': None, 'versions': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_history(filepath: str, history: Dict[str, Any]) -> None:
+    path = os.path.join(versions_dir(filepath), HISTORY_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(history, f)
+    os.replace(tmp, path)
+
+
+def _snapshot(filepath: str, history: Dict[str, Any], label: str, rows: int,
+              steps: Optional[List[Dict[str, Any]]] = None) -> int:
+    source = source_path(filepath)
+    version = len(history['versions'])
+    name = f"v{version:04d}{os.path.splitext(source)[1]}"
+    link_or_copy(source, os.path.join(versions_dir(filepath), name))
+
+    history['versions'].append({
+        'version':    version,
+        'file':       name,
+        'label':      label,
+        'rows':       rows,
+        'steps':      steps or [],
+        'created_at': time.time(),
+    })
+    history['current'] = version
+    return version
+
+
+def snapshot_original(filepath: str, rows: int) -> None:
+    """Keep the pre-cleaning data as version 0 — call before the first write"""
+    os.makedirs(versions_dir(filepath), exist_ok=True)
+    history = load_history(filepath)
+    if history['versions']:
+        return
+    _snapshot(filepath, history, 'original', rows)
+    _save_history(filepath, history)
+
+
+def record_version(filepath: str, label: str, rows: int, steps: List[Dict[str, Any]]) -> int:
+    """Snapshot the freshly written dataset as a new version and make it current.
+
+    Versions after the current one (i.e. ones that were undone) are discarded,
+    like an editor's redo stack after a new edit.
+    """
+    history = load_history(filepath)
+    current = history['current']
+    if current is not None:
+        for entry in history['versions'][current + 1:]:
+            stale = os.path.join(versions_dir(filepath), entry['file'])
+            if os.path.exists(stale):
+                os.remove(stale)
+        history['versions'] = history['versions'][:current + 1]
+
+    version = _snapshot(filepath, history, label, rows, steps)
+    _save_history(filepath, history)
+    return version
+
+
+def restore_version(filepath: str, version: int) -> Dict[str, Any]:
+    """Make ``version`` the live dataset again — returns its history entry"""
+    history = load_history(filepath)
+    if not 0 <= version < len(history['versions']):
+        raise KeyError(version)
+
+    entry = history['versions'][version]
+    snapshot = os.path.join(versions_dir(filepath), entry['file'])
+
+    if snapshot.endswith('.parquet'):
+        target = working_path(filepath)
+    else:
+        # Raw-backed version — make sure no working copy shadows it
+        target = filepath
+        for path in (working_path(filepath), filepath + STALE_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+    tmp = target + '.restore'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    link_or_copy(snapshot, tmp)
+    os.replace(tmp, target)
+    if target != filepath:
+        mark_raw_stale(filepath)
+
+    history['current'] = version
+    _save_history(filepath, history)
+    return entry
+
+
+def dataset_identity(filepath: str) -> Optional[str]:
+    """Stable ID of the dataset's current contents, for memoizing results.
+
+    Cleaning is deterministic, so the upload's content hash plus the steps
+    applied up to the current version identifies the data exactly — identical
+    uploads cleaned the same way share an identity. None for files that
+    didn't come through /upload.
+    """
+    sha256 = content_hash(filepath)
+    if sha256 is None:
+        return None
+    sheet = selected_sheet(filepath)
+    if sheet is not None:
+        # Other sheets of the same workbook are different data
+        sha256 = hashlib.sha256(json.dumps([sha256, sheet]).encode()).hexdigest()
+
+    history = load_history(filepath)
+    current = history['current'] or 0
+    steps = [entry['steps'] for entry in history['versions'][1:current + 1]]
+    if not steps:
+        return sha256
+    return hashlib.sha256(json.dumps([sha256, steps], sort_keys=True).encode()).hexdigest()
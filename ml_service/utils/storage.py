@@ -0,0 +1,160 @@
+"""Columnar working copies of uploaded datasets.
+
+Every upload keeps its raw CSV/XLSX next to a typed Parquet working copy
+(``<upload>.parquet``). Analysis, cleaning and training read the working copy,
+which is memory-mapped and supports column projection. Cleaning only rewrites
+the working copy; the raw file is regenerated on demand by /download.
+"""
+import os
+import shutil
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+from utils.excel import read_excel_sheet, selected_sheet
+
+try:
+    import pyarrow  # noqa: F401 — only needed for the Parquet engine
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+WORKING_SUFFIX = '.parquet'
+STALE_SUFFIX = '.stale'
+
+# Row groups double as the unit of partial reads (see /rows and chunked scans)
+PARQUET_ROW_GROUP_SIZE = 65536
+
+# Rows per chunk for streaming scans over files that may not fit in memory
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def working_path(filepath: str) -> str:
+    return filepath + WORKING_SUFFIX
+
+
+def has_working_copy(filepath: str) -> bool:
+    return HAS_PYARROW and os.path.exists(working_path(filepath))
+
+
+def write_working_copy(filepath: str, df: pd.DataFrame) -> bool:
+    """Write ``df`` as the Parquet working copy — returns False if it can't be stored"""
+    if not HAS_PYARROW:
+        return False
+
+    target = working_path(filepath)
+    tmp = target + '.tmp'
+    try:
+        df.to_parquet(tmp, index=False, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    except Exception:
+        # Non-string headers or mixed-type object columns (common in Excel)
+        # can't be represented in Parquet — keep working from the raw file
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+
+    os.replace(tmp, target)
+    return True
+
+
+def read_working_copy(filepath: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    return pd.read_parquet(working_path(filepath), columns=columns, memory_map=True)
+
+
+def working_columns(filepath: str) -> List[str]:
+    """Column names from the Parquet footer without reading any data"""
+    import pyarrow.parquet as pq
+    return list(pq.read_schema(working_path(filepath)).names)
+
+
+def working_rows(filepath: str) -> int:
+    """Row count from the Parquet footer without reading any data"""
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(working_path(filepath)).metadata.num_rows
+
+
+def iter_dataset_chunks(filepath: str, columns: Optional[List[str]] = None,
+                        chunksize: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield the dataset in row chunks without ever holding all of it in memory.
+
+    Reads Parquet record batches when a working copy exists, otherwise CSV
+    chunks. Excel sheets are decoded whole (see ``utils.excel``) and sliced.
+    """
+    if has_working_copy(filepath):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(working_path(filepath), memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.csv':
+        yield from pd.read_csv(filepath, usecols=columns, chunksize=chunksize)
+        return
+
+    df = read_excel_sheet(filepath, selected_sheet(filepath), columns)
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Hard-link ``src`` at ``dst``, copying when the filesystem can't link.
+
+    Sharing is safe because every writer here replaces files atomically
+    (write a temp file, then ``os.replace``) instead of writing into them.
+    """
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def mark_raw_stale(filepath: str) -> None:
+    """Record that the working copy has changes the raw file doesn't have yet"""
+    with open(filepath + STALE_SUFFIX, 'w'):
+        pass
+
+
+def is_raw_stale(filepath: str) -> bool:
+    return os.path.exists(filepath + STALE_SUFFIX)
+
+
+def write_raw(filepath: str, df: pd.DataFrame) -> None:
+    """Serialize ``df`` back to the upload's own format, replacing it atomically"""
+    ext = os.path.splitext(filepath)[1].lower()
+    tmp = f"{filepath}.tmp{ext}"
+    if ext == '.csv':
+        df.to_csv(tmp, index=False)
+    else:
+        # Keep the dataset's sheet name so it still resolves when re-read
+        df.to_excel(tmp, index=False, sheet_name=selected_sheet(filepath) or 'Sheet1')
+    os.replace(tmp, filepath)
+
+
+def save_dataset(filepath: str, df: pd.DataFrame) -> None:
+    """Persist a new version of the dataset — working copy only when possible"""
+    if write_working_copy(filepath, df):
+        mark_raw_stale(filepath)
+        return
+
+    # No usable working copy — drop any old one so it can't shadow the raw file
+    for path in (working_path(filepath), filepath + STALE_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
+    write_raw(filepath, df)
+
+
+def materialize_raw(filepath: str) -> None:
+    """Bring the raw CSV/XLSX up to date with the working copy if it is stale"""
+    if not is_raw_stale(filepath) or not has_working_copy(filepath):
+        return
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext in ('.csv', '.xlsx'):
+        # Streamed from the working copy — byte-identical to what /download sends
+        from utils.export import write_export
+        write_export(filepath, filepath, ext[1:], selected_sheet(filepath) or 'Sheet1')
+    else:
+        write_raw(filepath, read_working_copy(filepath))
+    os.remove(filepath + STALE_SUFFIX)
@@ -0,0 +1,352 @@
+"""Streaming (chunked) analysis for files larger than memory.
+
+Every statistic is kept in a mergeable accumulator that is updated once per
+chunk, so memory depends on the number of columns and the sketch sizes, not
+on the number of rows:
+
+- counts and nulls are exact
+- mean / variance / skew / kurtosis use pairwise-merged central moments
+  (Welford/Chan/Pébay), exact up to rounding
+- quartiles, medians, IQR/Z-Score outlier counts and histograms come from a
+  KLL-style quantile sketch per column (approximate)
+- duplicates are counted exactly on a hash-sampled subset of rows and scaled
+  up (exact while the sample never had to shrink)
+
+``analyze_streaming`` returns the same structure as ``profile_dataset``.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import HISTOGRAM_BINS, ZSCORE_THRESHOLD, _skew_category
+
+# Items kept per sketch level — rank error is roughly O(log(n / k) / k)
+SKETCH_K = 1024
+
+# Distinct row hashes kept for duplicate estimation before the sample is thinned
+DUPLICATE_SAMPLE_CAPACITY = 1_000_000
+
+
+class MomentAccumulator:
+    """Count, mean, central moments M2..M4, min and max per column, merged chunk by chunk"""
+
+    def __init__(self, n_cols: int):
+        self.n = np.zeros(n_cols)
+        self.mean = np.zeros(n_cols)
+        self.m2 = np.zeros(n_cols)
+        self.m3 = np.zeros(n_cols)
+        self.m4 = np.zeros(n_cols)
+        self.min = np.full(n_cols, np.inf)
+        self.max = np.full(n_cols, -np.inf)
+
+    def update(self, block: np.ndarray) -> None:
+        mask = np.isnan(block)
+        nb = (~mask).sum(axis=0).astype(np.float64)
+        if not nb.any():
+            return
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mb = np.where(nb > 0, np.nansum(block, axis=0) / np.maximum(nb, 1), 0.0)
+            dev = np.where(mask, 0.0, block - mb)
+        dev2 = dev ** 2
+        m2b = dev2.sum(axis=0)
+        m3b = (dev2 * dev).sum(axis=0)
+        m4b = (dev2 ** 2).sum(axis=0)
+
+        self.min = np.fmin(self.min, np.nanmin(np.where(mask, np.inf, block), axis=0))
+        self.max = np.fmax(self.max, np.nanmax(np.where(mask, -np.inf, block), axis=0))
+        self._merge(nb, mb, m2b, m3b, m4b)
+
+    def _merge(self, nb, mb, m2b, m3b, m4b) -> None:
+        na, ma, m2a, m3a, m4a = self.n, self.mean, self.m2, self.m3, self.m4
+        n = na + nb
+        safe_n = np.maximum(n, 1)
+        delta = mb - ma
+
+        mean = ma + delta * nb / safe_n
+        m2 = m2a + m2b + delta ** 2 * na * nb / safe_n
+        m3 = (m3a + m3b
+              + delta ** 3 * na * nb * (na - nb) / safe_n ** 2
+              + 3 * delta * (na * m2b - nb * m2a) / safe_n)
+        m4 = (m4a + m4b
+              + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / safe_n ** 3
+              + 6 * delta ** 2 * (na ** 2 * m2b + nb ** 2 * m2a) / safe_n ** 2
+              + 4 * delta * (na * m3b - nb * m3a) / safe_n)
+
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+
+    def finalize(self) -> Dict[str, np.ndarray]:
+        n = self.n
+        safe_n = np.maximum(n, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pop_var = self.m2 / safe_n
+            zero = pop_var <= (np.finfo(np.float64).resolution * self.mean) ** 2
+            return {
+                'count': n.astype(np.int64),
+                'mean': self.mean,
+                'std': np.sqrt(self.m2 / (n - 1)),
+                'pop_std': np.sqrt(pop_var),
+                'skewness': np.where(zero, np.nan, (self.m3 / safe_n) / pop_var ** 1.5),
+                'kurtosis': np.where(zero, np.nan, (self.m4 / safe_n) / pop_var ** 2) - 3,
+                'min': self.min,
+                'max': self.max,
+            }
+
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch.
+
+    Level ``h`` holds items of weight 2**h. When a level overflows it is
+    sorted and every other item (random offset) is promoted to the next level.
+    """
+
+    def __init__(self, k: int = SKETCH_K, seed: int = 0):
+        self.k = k
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._compress()
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                leftover = level[len(level) - len(level) % 2:]
+                paired = level[:len(level) - len(level) % 2]
+                promoted = paired[self._rng.integers(2)::2]
+                self.levels[h] = leftover
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def rank(self, x: np.ndarray, inclusive: bool = True) -> np.ndarray:
+        """Estimated fraction of items <= x (or < x when not inclusive)"""
+        items, cum = self._weighted()
+        if len(items) == 0:
+            return np.zeros_like(np.asarray(x, dtype=np.float64))
+        idx = np.searchsorted(items, x, side='right' if inclusive else 'left')
+        cum = np.concatenate([[0.0], cum])
+        return cum[idx] / cum[-1]
+
+    def quantile(self, q: np.ndarray) -> np.ndarray:
+        items, cum = self._weighted()
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan)
+        # Midpoint ranks make the estimate symmetric around each stored item
+        positions = (cum - 0.5 * np.diff(np.concatenate([[0.0], cum]))) / cum[-1]
+        return np.interp(q, positions, items)
+
+
+class DuplicateSampler:
+    """Duplicate-row estimate from an exact count over a hash-sampled subset of rows.
+
+    All copies of a row share its hash, so sampling by hash keeps or drops them
+    together; the duplicate count within the sample divided by the sampling
+    rate is an unbiased estimate — and exact while the rate is still 1.
+    """
+
+    def __init__(self, capacity: int = DUPLICATE_SAMPLE_CAPACITY):
+        self.capacity = capacity
+        self.threshold = np.iinfo(np.uint64).max
+        self.rate = 1.0
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def update(self, row_hashes: np.ndarray) -> None:
+        sampled = row_hashes[row_hashes <= self.threshold]
+        merged = np.concatenate([self.hashes, sampled])
+        weights = np.concatenate([self.counts, np.ones(len(sampled), dtype=np.int64)])
+        self.hashes, inverse = np.unique(merged, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=weights).astype(np.int64)
+
+        while len(self.hashes) > self.capacity:
+            self.threshold //= 2
+            self.rate /= 2
+            keep = self.hashes <= self.threshold
+            self.hashes, self.counts = self.hashes[keep], self.counts[keep]
+
+    def estimate(self) -> int:
+        return int(round(int((self.counts - 1).sum()) / self.rate))
+
+    @property
+    def exact(self) -> bool:
+        return self.rate == 1.0
+
+
+def _merge_dtype(current: Optional[str], new: str) -> str:
+    if current is None or current == new:
+        return new
+    numeric = {'int64', 'float64', 'int32', 'float32'}
+    if current in numeric and new in numeric:
+        return 'float64'
+    return 'object'
+
+
+def analyze_streaming(chunks: Iterable[pd.DataFrame]) -> Dict[str, Any]:
+    """Profile a dataset chunk by chunk — same result shape as profile_dataset, approximate"""
+    columns: List[str] = []
+    column_types: Dict[str, str] = {}
+    null_counts: Optional[pd.Series] = None
+    non_numeric: set = set()
+    moments: Dict[str, MomentAccumulator] = {}
+    sketches: Dict[str, QuantileSketch] = {}
+    duplicates = DuplicateSampler()
+    n_rows = 0
+    memory_bytes = 0
+    n_chunks = 0
+
+    for chunk in chunks:
+        n_chunks += 1
+        if not columns:
+            columns = list(chunk.columns)
+
+        n_rows += len(chunk)
+        memory_bytes += int(chunk.memory_usage(deep=True, index=False).sum())
+        chunk_nulls = chunk.isnull().sum()
+        null_counts = chunk_nulls if null_counts is None else null_counts + chunk_nulls
+
+        for col in columns:
+            column_types[col] = _merge_dtype(column_types.get(col), str(chunk[col].dtype))
+
+        duplicates.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+        # A column only gets numeric statistics if it is numeric in every chunk
+        chunk_numeric = set(chunk.select_dtypes(include=[np.number]).columns)
+        for col in columns:
+            if col in non_numeric:
+                continue
+            if col not in chunk_numeric:
+                non_numeric.add(col)
+                moments.pop(col, None)
+                sketches.pop(col, None)
+                continue
+            values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            moments.setdefault(col, MomentAccumulator(1)).update(values.reshape(-1, 1))
+            sketches.setdefault(col, QuantileSketch(seed=len(sketches))).update(values)
+
+    null_counts = null_counts if null_counts is not None else pd.Series(dtype=np.int64)
+    dup_count = duplicates.estimate()
+
+    summary = {
+        'rows': n_rows,
+        'columns': len(columns),
+        'column_names': columns,
+        'column_types': column_types,
+        'memory_usage': float(memory_bytes / 1024 / 1024),  # MB if fully loaded
+        'duplicates': dup_count,
+        'duplicate_percentage': float((dup_count / n_rows) * 100) if n_rows else 0.0,
+    }
+
+    missing_values = {
+        'columns': [],
+        'missing_count': {},
+        'missing_percentage': {},
+        'total_cells': n_rows * len(columns),
+        'total_missing': int(null_counts.sum()),
+    }
+    for column, missing_count in null_counts.items():
+        if missing_count > 0:
+            missing_values['columns'].append(column)
+            missing_values['missing_count'][column] = int(missing_count)
+            missing_values['missing_percentage'][column] = float((missing_count / n_rows) * 100)
+
+    outliers_iqr = {'method': 'iqr', 'columns': {}, 'total_outliers': 0}
+    outliers_zscore = {'method': 'zscore', 'columns': {}, 'total_outliers': 0}
+    distributions = {}
+
+    for col in columns:
+        if col not in moments:
+            continue
+        m = {k: v[0] for k, v in moments[col].finalize().items()}
+        count = int(m['count'])
+        if count == 0:
+            continue
+        sketch = sketches[col]
+
+        q1, median, q3 = sketch.quantile(np.array([0.25, 0.5, 0.75]))
+        iqr = q3 - q1
+        lower, upper = q1 - 1.5 * iqr, q3 + 1.5 * iqr
+        iqr_count = int(round(count * (sketch.rank(lower, inclusive=False) + 1 - sketch.rank(upper))))
+        if iqr_count > 0:
+            outliers_iqr['columns'][col] = {
+                'count': iqr_count,
+                'percentage': float((iqr_count / count) * 100),
+                'lower_bound': float(lower),
+                'upper_bound': float(upper),
+                'method': 'IQR'
+            }
+
+        if m['pop_std'] > 0:
+            z_lo = m['mean'] - ZSCORE_THRESHOLD * m['pop_std']
+            z_hi = m['mean'] + ZSCORE_THRESHOLD * m['pop_std']
+            z_count = int(round(count * (sketch.rank(z_lo, inclusive=False) + 1 - sketch.rank(z_hi))))
+            if z_count > 0:
+                outliers_zscore['columns'][col] = {
+                    'count': z_count,
+                    'percentage': float((z_count / count) * 100),
+                    'threshold': ZSCORE_THRESHOLD,
+                    'method': 'Z-Score'
+                }
+
+        # Fixed-width bins over the exact min/max, frequencies from the sketch CDF
+        first, last = m['min'], m['max']
+        if first == last:
+            first, last = first - 0.5, last + 0.5
+        edges = np.linspace(first, last, HISTOGRAM_BINS + 1)
+        cdf = sketch.rank(edges[1:-1], inclusive=False)
+        cdf = np.concatenate([[0.0], cdf, [1.0]])
+        frequencies = np.round(np.diff(cdf) * count).astype(int)
+
+        skewness = float(m['skewness'])
+        distributions[col] = {
+            'mean': float(m['mean']),
+            'median': float(median),
+            'std': float(m['std']),
+            'min': float(m['min']),
+            'max': float(m['max']),
+            'skewness': skewness,
+            'skew_category': _skew_category(skewness),
+            'kurtosis': float(m['kurtosis']),
+            'count': count,
+            'histogram': [
+                {
+                    'range': f"{edges[i]:.1f}-{edges[i+1]:.1f}",
+                    'frequency': int(frequencies[i])
+                }
+                for i in range(HISTOGRAM_BINS)
+            ],
+        }
+
+    outliers_iqr['total_outliers'] = sum(v['count'] for v in outliers_iqr['columns'].values())
+    outliers_zscore['total_outliers'] = sum(v['count'] for v in outliers_zscore['columns'].values())
+
+    return {
+        'summary': summary,
+        'missing_values': missing_values,
+        'outliers_iqr': outliers_iqr,
+        'outliers_zscore': outliers_zscore,
+        'distributions': distributions,
+        'chunks': n_chunks,
+        'duplicates_exact': duplicates.exact,
+    }
@@ -0,0 +1,159 @@
+"""Bounded worker pool that keeps blocking pandas/sklearn work off the event loop.
+
+Each job type (upload, analyze, clean, train, ...) has its own concurrency
+limit and a bounded number of waiting requests. Once a type has
+``limit + queue_depth`` requests in flight, new ones are rejected with
+``PoolSaturated`` so the API can answer 503 instead of piling up work.
+
+The pool uses threads rather than processes: jobs share the in-process
+dataset cache, and the heavy numpy/pandas/sklearn kernels release the GIL.
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+WORKER_THREADS = int(os.environ.get('ML_WORKER_THREADS', str(min(32, (os.cpu_count() or 1) + 4))))
+WORKER_QUEUE_DEPTH = int(os.environ.get('ML_WORKER_QUEUE_DEPTH', '8'))
+
+# Concurrent jobs per type — override with e.g. ML_WORKER_LIMIT_TRAIN=4
+DEFAULT_JOB_LIMITS = {
+    'upload':   4,
+    'analyze':  4,
+    'clean':    2,
+    'train':    2,
+    'download': 4,
+    'rows':     4,
+    'outliers': 2,
+    'ingest':   2,
+}
+DEFAULT_JOB_LIMIT = 2
+
+# Cores that multi-threaded estimators (random forest n_jobs) may use in total,
+# across every request and background job in flight
+CPU_BUDGET = int(os.environ.get('ML_CPU_BUDGET', str(os.cpu_count() or 1)))
+
+
+class PoolSaturated(Exception):
+    """Raised when a job type already has its maximum number of queued requests"""
+
+    def __init__(self, kind: str, retry_after: int = 5):
+        super().__init__(f"Too many concurrent '{kind}' requests — please retry shortly")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    def __init__(self, max_workers: int, limits: Dict[str, int], queue_depth: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ml-worker')
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self._limits = dict(limits)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+
+    def limit(self, kind: str) -> int:
+        if kind not in self._limits:
+            env = os.environ.get(f'ML_WORKER_LIMIT_{kind.upper()}')
+            self._limits[kind] = int(env) if env else DEFAULT_JOB_LIMIT
+        return self._limits[kind]
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        if kind not in self._semaphores:
+            self._semaphores[kind] = asyncio.Semaphore(self.limit(kind))
+        return self._semaphores[kind]
+
+    async def run(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` in the pool under the ``kind`` limit, or raise PoolSaturated"""
+        # Counters are only touched from the event loop thread — no lock needed
+        in_flight = self._running.get(kind, 0) + self._waiting.get(kind, 0)
+        if in_flight >= self.limit(kind) + self.queue_depth:
+            self._rejected[kind] = self._rejected.get(kind, 0) + 1
+            raise PoolSaturated(kind)
+
+        self._waiting[kind] = self._waiting.get(kind, 0) + 1
+        try:
+            await self._semaphore(kind).acquire()
+        finally:
+            self._waiting[kind] -= 1
+
+        self._running[kind] = self._running.get(kind, 0) + 1
+        try:
+            # Copy the context so request-scoped contextvars are visible in the worker
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, fn, *args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        finally:
+            self._running[kind] -= 1
+            self._semaphore(kind).release()
+
+    def queue_depth_total(self) -> int:
+        return sum(self._waiting.values())
+
+    def stats(self) -> Dict[str, Any]:
+        kinds = sorted(set(self._limits) | set(self._running) | set(self._rejected))
+        return {
+            'max_workers': self.max_workers,
+            'queue_depth': self.queue_depth,
+            'jobs': {
+                kind: {
+                    'limit':    self.limit(kind),
+                    'running':  self._running.get(kind, 0),
+                    'waiting':  self._waiting.get(kind, 0),
+                    'rejected': self._rejected.get(kind, 0),
+                }
+                for kind in kinds
+            },
+        }
+
+
+class CpuBudget:
+    """Hands out estimator threads from a fixed core budget shared by all jobs.
+
+    Reservations never block: a caller gets whatever is free, but always at
+    least one thread, so a busy server trains more slowly instead of
+    oversubscribing its cores with every job asking for n_jobs=-1.
+    """
+
+    def __init__(self, total: int):
+        self.total = max(1, total)
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def reserve(self, wanted: Optional[int] = None) -> Iterator[int]:
+        """Reserve up to ``wanted`` threads (default: the whole budget) and yield the grant"""
+        with self._lock:
+            granted = max(1, min(wanted or self.total, self.total - self._in_use))
+            self._in_use += granted
+        try:
+            yield granted
+        finally:
+            with self._lock:
+                self._in_use -= granted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'total': self.total, 'in_use': self._in_use}
+
+
+def _configured_limits() -> Dict[str, int]:
+    limits = {}
+    for kind, default in DEFAULT_JOB_LIMITS.items():
+        limits[kind] = int(os.environ.get(f'ML_WORKER_LIMIT_{kind.upper()}', str(default)))
+    return limits
+
+
+worker_pool = WorkerPool(WORKER_THREADS, _configured_limits(), WORKER_QUEUE_DEPTH)
+cpu_budget = CpuBudget(CPU_BUDGET)
+
+
+async def run_in_worker(kind: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Dispatch blocking work for a route to the shared worker pool"""
+    return await worker_pool.run(kind, fn, *args, **kwargs)
@@ -5,7 +5,7 @@ const router = express.Router();
 
 router.post('/', async (req, res, next) => {
   try {
-    const { filepath, analysisType } = req.body;
+    const { filepath, analysisType, compact, sampleSize, seed } = req.body;
 
     if (!filepath) {
       return res.status(400).json({ error: 'File path is required' });
@@ -14,6 +14,9 @@ router.post('/', async (req, res, next) => {
     const mlResponse = await axios.post(`${req.mlServiceUrl}/analyze`, {
       filepath,
       analysisType: analysisType || 'full',
+      ...(typeof compact === 'boolean' ? { compact } : {}),
+      ...(Number.isInteger(sampleSize) ? { sampleSize } : {}),
+      ...(Number.isInteger(seed) ? { seed } : {}),
     }, {
       timeout: 60000,
     });
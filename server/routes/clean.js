@@ -1,12 +1,11 @@
 import express from 'express';
 import axios from 'axios';
-import path from 'path';
 
 const router = express.Router();
 
 router.post('/', async (req, res, next) => {
   try {
-    const { filepath, cleaningMethod, columns } = req.body; // ✅ added columns
+    const { filepath, cleaningMethod, columns, groupBy, neighbors, outlierMethod, contamination, compact } = req.body; // ✅ added columns
 
     if (!filepath || !cleaningMethod) {
       return res.status(400).json({ error: 'File path and cleaning method are required' });
@@ -16,6 +15,11 @@ router.post('/', async (req, res, next) => {
       filepath,
       cleaningMethod,
       ...(columns ? { columns } : {}), // 
+      ...(Array.isArray(groupBy) ? { groupBy } : {}),
+      ...(Number.isInteger(neighbors) ? { neighbors } : {}),
+      ...(outlierMethod ? { outlierMethod } : {}),
+      ...(typeof contamination === 'number' ? { contamination } : {}),
+      ...(typeof compact === 'boolean' ? { compact } : {}),
     }, {
       timeout: 60000,
       maxBodyLength: Infinity,
@@ -36,8 +40,40 @@ router.post('/', async (req, res, next) => {
   }
 });
 
-// Download endpoint — streams cleaned file back to browser
-router.get('/download', async (req, res, next) => {
+// Run several cleaning steps in one pass — the dataset is written once
+router.post('/pipeline', async (req, res, next) => {
+  try {
+    const { filepath, steps, compact } = req.body;
+
+    if (!filepath || !Array.isArray(steps) || steps.length === 0) {
+      return res.status(400).json({ error: 'File path and at least one cleaning step are required' });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/clean/pipeline`, {
+      filepath,
+      steps,
+      ...(typeof compact === 'boolean' ? { compact } : {}),
+    }, {
+      timeout: 60000,
+      maxBodyLength: Infinity,
+      maxContentLength: Infinity,
+    });
+
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Cleaning pipeline failed'
+      });
+    }
+    next(err);
+  }
+});
+
+// Cleaning versions recorded for a file
+router.get('/history', async (req, res, next) => {
   try {
     const { filepath } = req.query;
 
@@ -45,31 +81,103 @@ router.get('/download', async (req, res, next) => {
       return res.status(400).json({ error: 'filepath query param is required' });
     }
 
-    const mlResponse = await axios.get(`${req.mlServiceUrl}/download`, {
+    const mlResponse = await axios.get(`${req.mlServiceUrl}/clean/history`, {
       params: { filepath },
-      responseType: 'stream',
       timeout: 30000,
     });
 
-    const originalName = path.basename(filepath);
-    const downloadName = `cleaned_${originalName}`;
-    const ext = path.extname(filepath).toLowerCase();
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'History lookup failed'
+      });
+    }
+    next(err);
+  }
+});
+
+// Restore an earlier version — the previous one when no version is given
+router.post('/undo', async (req, res, next) => {
+  try {
+    const { filepath, version } = req.body;
+
+    if (!filepath) {
+      return res.status(400).json({ error: 'File path is required' });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/clean/undo`, {
+      filepath,
+      ...(version !== undefined ? { version } : {}),
+    }, {
+      timeout: 60000,
+    });
+
+    res.json(mlResponse.data);
 
-    res.setHeader('Content-Disposition', `attachment; filename="${downloadName}"`);
-    res.setHeader(
-      'Content-Type',
-      ext === '.csv'
-        ? 'text/csv'
-        : 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    );
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Undo failed'
+      });
+    }
+    next(err);
+  }
+});
+
+// Download endpoint — streams the dataset back to the browser. Compression,
+// byte ranges and format conversion happen in the ML service; the bytes and
+// their headers are passed through untouched.
+const DOWNLOAD_RESPONSE_HEADERS = [
+  'content-type', 'content-disposition', 'content-encoding', 'content-length',
+  'content-range', 'accept-ranges', 'etag', 'vary',
+];
+
+router.get('/download', async (req, res, next) => {
+  try {
+    const { filepath, format, compression } = req.query;
+
+    if (!filepath) {
+      return res.status(400).json({ error: 'filepath query param is required' });
+    }
+
+    const forwarded = {};
+    for (const name of ['accept-encoding', 'range', 'if-range']) {
+      if (req.headers[name]) {
+        forwarded[name] = req.headers[name];
+      }
+    }
+
+    const mlResponse = await axios.get(`${req.mlServiceUrl}/download`, {
+      params: { filepath, ...(format ? { format } : {}), ...(compression ? { compression } : {}) },
+      headers: forwarded,
+      responseType: 'stream',
+      decompress: false,
+      timeout: 0,
+      validateStatus: (status) => status === 200 || status === 206,
+    });
+
+    res.status(mlResponse.status);
+    for (const name of DOWNLOAD_RESPONSE_HEADERS) {
+      if (mlResponse.headers[name]) {
+        res.setHeader(name, mlResponse.headers[name]);
+      }
+    }
 
     mlResponse.data.pipe(res);
 
   } catch (err) {
     if (err.response) {
+      if (err.response.status === 416) {
+        res.setHeader('Content-Range', err.response.headers['content-range'] || '');
+        return res.status(416).end();
+      }
       return res.status(err.response.status).json({
         success: false,
-        error: err.response.data?.detail || 'Download failed'
+        error: 'Download failed'
       });
     }
     next(err);
@@ -0,0 +1,47 @@
+import express from 'express';
+import axios from 'axios';
+
+const router = express.Router();
+
+// Poll job state, progress and result
+router.get('/:id', async (req, res, next) => {
+  try {
+    const mlResponse = await axios.get(`${req.mlServiceUrl}/jobs/${encodeURIComponent(req.params.id)}`, {
+      timeout: 30000,
+      maxContentLength: Infinity,
+    });
+
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Job lookup failed'
+      });
+    }
+    next(err);
+  }
+});
+
+// Cancel a queued or running job
+router.delete('/:id', async (req, res, next) => {
+  try {
+    const mlResponse = await axios.delete(`${req.mlServiceUrl}/jobs/${encodeURIComponent(req.params.id)}`, {
+      timeout: 30000,
+    });
+
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Job cancellation failed'
+      });
+    }
+    next(err);
+  }
+});
+
+export default router;
@@ -0,0 +1,42 @@
+import express from 'express';
+import axios from 'axios';
+
+const router = express.Router();
+
+// Multivariate outliers — per-row anomaly scores and the most anomalous rows
+router.post('/', async (req, res, next) => {
+  try {
+    const { filepath, method, columns, contamination, topK, seed, offset, limit } = req.body;
+
+    if (!filepath) {
+      return res.status(400).json({ error: 'File path is required' });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/outliers`, {
+      filepath,
+      ...(method ? { method } : {}),
+      ...(columns ? { columns } : {}),
+      ...(contamination !== undefined ? { contamination } : {}),
+      ...(topK !== undefined ? { topK } : {}),
+      ...(seed !== undefined ? { seed } : {}),
+      ...(offset !== undefined ? { offset } : {}),
+      ...(limit !== undefined ? { limit } : {}),
+    }, {
+      timeout: 600000,
+      maxContentLength: Infinity,
+    });
+
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Outlier detection failed'
+      });
+    }
+    next(err);
+  }
+});
+
+export default router;
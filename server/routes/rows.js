@@ -0,0 +1,58 @@
+import express from 'express';
+import axios from 'axios';
+
+const router = express.Router();
+
+const FORWARDED_HEADERS = ['content-type', 'x-total-rows', 'x-matched-rows', 'x-offset'];
+
+// One page of a dataset for the data grid — json, ndjson or Arrow IPC
+router.post('/', async (req, res, next) => {
+  try {
+    const { filepath, offset, limit, columns, sortBy, descending, filters, format } = req.body;
+
+    if (!filepath) {
+      return res.status(400).json({ error: 'File path is required' });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/rows`, {
+      filepath,
+      ...(offset !== undefined ? { offset } : {}),
+      ...(limit !== undefined ? { limit } : {}),
+      ...(columns ? { columns } : {}),
+      ...(sortBy ? { sortBy } : {}),
+      ...(typeof descending === 'boolean' ? { descending } : {}),
+      ...(filters ? { filters } : {}),
+      ...(format ? { format } : {}),
+    }, {
+      // Arrow pages are binary — pass the body through untouched
+      responseType: 'arraybuffer',
+      timeout: 60000,
+      maxContentLength: Infinity,
+    });
+
+    for (const name of FORWARDED_HEADERS) {
+      if (mlResponse.headers[name]) {
+        res.setHeader(name, mlResponse.headers[name]);
+      }
+    }
+    res.setHeader('Access-Control-Expose-Headers', 'X-Total-Rows, X-Matched-Rows, X-Offset');
+    res.send(Buffer.from(mlResponse.data));
+
+  } catch (err) {
+    if (err.response) {
+      let detail;
+      try {
+        detail = JSON.parse(Buffer.from(err.response.data).toString('utf8')).detail;
+      } catch {
+        detail = undefined;
+      }
+      return res.status(err.response.status).json({
+        success: false,
+        error: detail || 'Row fetch failed'
+      });
+    }
+    next(err);
+  }
+});
+
+export default router;
@@ -5,7 +5,7 @@ const router = express.Router();
 
 router.post('/', async (req, res, next) => {
   try {
-    const { filepath, modelType, features, target } = req.body;
+    const { filepath, modelType, features, target, trainingMode, chunkSize, compact } = req.body;
 
     if (!filepath || !modelType || !features || !target) {
       return res.status(400).json({
@@ -18,6 +18,9 @@ router.post('/', async (req, res, next) => {
       modelType,
       features,
       target,
+      ...(trainingMode ? { trainingMode } : {}),
+      ...(chunkSize ? { chunkSize } : {}),
+      ...(typeof compact === 'boolean' ? { compact } : {}),
     }, {
       timeout: 120000,
       maxBodyLength: Infinity,
@@ -39,4 +42,112 @@ router.post('/', async (req, res, next) => {
   }
 });
 
+// Background training — returns a job ID at once, poll /api/jobs/:id for progress
+router.post('/jobs', async (req, res, next) => {
+  try {
+    const { filepath, modelType, features, target, trainingMode, chunkSize, compact } = req.body;
+
+    if (!filepath || !modelType || !features || !target) {
+      return res.status(400).json({
+        error: 'File path, model type, features, and target are required'
+      });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/train/jobs`, {
+      filepath,
+      modelType,
+      features,
+      target,
+      ...(trainingMode ? { trainingMode } : {}),
+      ...(chunkSize ? { chunkSize } : {}),
+      ...(typeof compact === 'boolean' ? { compact } : {}),
+    }, {
+      timeout: 30000,
+    });
+
+    res.status(mlResponse.status).json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      console.error('FastAPI error:', JSON.stringify(err.response.data, null, 2));
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Could not start training job'
+      });
+    }
+    next(err);
+  }
+});
+
+// Cross-validated leaderboard across model types and small hyperparameter grids
+router.post('/compare', async (req, res, next) => {
+  try {
+    const { filepath, features, target, models, folds } = req.body;
+
+    if (!filepath || !features || !target) {
+      return res.status(400).json({
+        error: 'File path, features, and target are required'
+      });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/train/compare`, {
+      filepath,
+      features,
+      target,
+      ...(models ? { models } : {}),
+      ...(folds ? { folds } : {}),
+    }, {
+      timeout: 600000,
+      maxContentLength: Infinity,
+    });
+
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      console.error('FastAPI error:', JSON.stringify(err.response.data, null, 2));
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Model comparison failed'
+      });
+    }
+    next(err);
+  }
+});
+
+// Background comparison — poll /api/jobs/:id for progress and the leaderboard
+router.post('/compare/jobs', async (req, res, next) => {
+  try {
+    const { filepath, features, target, models, folds } = req.body;
+
+    if (!filepath || !features || !target) {
+      return res.status(400).json({
+        error: 'File path, features, and target are required'
+      });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/train/compare/jobs`, {
+      filepath,
+      features,
+      target,
+      ...(models ? { models } : {}),
+      ...(folds ? { folds } : {}),
+    }, {
+      timeout: 30000,
+    });
+
+    res.status(mlResponse.status).json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      console.error('FastAPI error:', JSON.stringify(err.response.data, null, 2));
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Could not start comparison job'
+      });
+    }
+    next(err);
+  }
+});
+
 export default router;
\ No newline at end of file
@@ -1,4 +1,5 @@
 import express from 'express';
+import axios from 'axios';
 import { upload } from '../middleware/upload.js';
 import path from 'path';
 import XLSX from 'xlsx';
@@ -40,6 +41,21 @@ router.post('/', upload.single('file'), async (req, res, next) => {
       return res.status(400).json({ error: 'Unsupported file type' });
     }
 
+    // A specific sheet — the ML service decodes just that sheet as its own dataset
+    if (req.body?.sheet && ext !== '.csv') {
+      const mlResponse = await axios.post(`${req.mlServiceUrl}/upload/sheet`, {
+        filepath: req.file.path,
+        sheet: req.body.sheet,
+      }, { timeout: 60000 });
+
+      return res.json({
+        ...mlResponse.data,
+        filename: req.file.originalname,
+        size: req.file.size,
+        fileType: ext,
+      });
+    }
+
     const { columns, rowCount } = parseFileMeta(req.file.path);
 
     res.json({
@@ -53,6 +69,39 @@ router.post('/', upload.single('file'), async (req, res, next) => {
     });
 
   } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Upload failed'
+      });
+    }
+    next(err);
+  }
+});
+
+// Open another sheet of an uploaded workbook as its own dataset
+router.post('/sheet', async (req, res, next) => {
+  try {
+    const { filepath, sheet } = req.body;
+
+    if (!filepath || sheet === undefined || sheet === null) {
+      return res.status(400).json({ error: 'File path and sheet are required' });
+    }
+
+    const mlResponse = await axios.post(`${req.mlServiceUrl}/upload/sheet`, {
+      filepath,
+      sheet: String(sheet),
+    }, { timeout: 60000 });
+
+    res.json(mlResponse.data);
+
+  } catch (err) {
+    if (err.response) {
+      return res.status(err.response.status).json({
+        success: false,
+        error: err.response.data?.detail || 'Sheet selection failed'
+      });
+    }
     next(err);
   }
 });
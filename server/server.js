@@ -8,6 +8,9 @@ import uploadRoutes from './routes/upload.js';
 import analyzeRoutes from './routes/analyze.js';
 import cleanRoutes from './routes/clean.js';
 import trainRoutes from './routes/train.js';
+import jobRoutes from './routes/jobs.js';
+import rowRoutes from './routes/rows.js';
+import outlierRoutes from './routes/outliers.js';
 
 dotenv.config();
 
@@ -34,6 +37,9 @@ app.use('/api/upload', uploadRoutes);
 app.use('/api/analyze', analyzeRoutes);
 app.use('/api/clean', cleanRoutes);
 app.use('/api/train', trainRoutes);
+app.use('/api/jobs', jobRoutes);
+app.use('/api/rows', rowRoutes);
+app.use('/api/outliers', outlierRoutes);
 
 // Health check endpoint
 app.get('/api/health', (req, res) => {